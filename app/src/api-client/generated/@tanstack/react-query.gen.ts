@@ -1,8 +1,8 @@
 // This file is auto-generated by @hey-api/openapi-ts
 
-import { type Options, healthCheckApiGet, userInfoApiUserIdGet, postUserInfoApiUserPost, removeImageBackgroundApiImageRemoveBackgroundPost, extractTextApiImageExtractTextPost, classifyImageApiImageClassifyPost, getUsersMementosApiUserUserIdMementoGet, createNewMementoApiUserUserIdMementoPost, deleteMementoApiUserUserIdMementoIdDelete, updateMementoAndImagesApiUserUserIdMementoIdPut, getUsersImageLabelsApiUserUserIdMementoImageLabelsGet, getUsersCollectionsApiUserUserIdCollectionGet, createNewCollectionApiUserUserIdCollectionPost, deleteCollectionApiUserUserIdCollectionIdDelete, updateCollectionAndMementosApiUserUserIdCollectionIdPut, generateCollageApiUserUserIdCollectionIdCollageGet, testRecommendCollectionApiTestingRecommendCollectionUserIdPost, testCollageApiTestingCollageGet } from '../sdk.gen';
-import { queryOptions, type UseMutationOptions } from '@tanstack/react-query';
-import type { HealthCheckApiGetData, UserInfoApiUserIdGetData, PostUserInfoApiUserPostData, PostUserInfoApiUserPostError, PostUserInfoApiUserPostResponse, RemoveImageBackgroundApiImageRemoveBackgroundPostData, RemoveImageBackgroundApiImageRemoveBackgroundPostError, ExtractTextApiImageExtractTextPostData, ExtractTextApiImageExtractTextPostError, ExtractTextApiImageExtractTextPostResponse, ClassifyImageApiImageClassifyPostData, ClassifyImageApiImageClassifyPostError, ClassifyImageApiImageClassifyPostResponse, GetUsersMementosApiUserUserIdMementoGetData, CreateNewMementoApiUserUserIdMementoPostData, CreateNewMementoApiUserUserIdMementoPostError, CreateNewMementoApiUserUserIdMementoPostResponse, DeleteMementoApiUserUserIdMementoIdDeleteData, DeleteMementoApiUserUserIdMementoIdDeleteError, DeleteMementoApiUserUserIdMementoIdDeleteResponse, UpdateMementoAndImagesApiUserUserIdMementoIdPutData, UpdateMementoAndImagesApiUserUserIdMementoIdPutError, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetData, GetUsersCollectionsApiUserUserIdCollectionGetData, CreateNewCollectionApiUserUserIdCollectionPostData, CreateNewCollectionApiUserUserIdCollectionPostError, CreateNewCollectionApiUserUserIdCollectionPostResponse, DeleteCollectionApiUserUserIdCollectionIdDeleteData, DeleteCollectionApiUserUserIdCollectionIdDeleteError, DeleteCollectionApiUserUserIdCollectionIdDeleteResponse, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutData, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutError, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutResponse, GenerateCollageApiUserUserIdCollectionIdCollageGetData, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostData, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostError, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostResponse, TestCollageApiTestingCollageGetData } from '../types.gen';
+import { type Options, healthCheckApiGet, modelStatsApiModelsGet, signedUrlCacheStatsApiCacheSignedUrlsGet, collageCacheStatsApiCacheCollagesGet, recommendationStatsApiRecommendationsGet, websocketStatsApiWebsocketsGet, userInfoApiUserIdGet, postUserInfoApiUserPost, removeImageBackgroundApiImageRemoveBackgroundPost, extractTextApiImageExtractTextPost, classifyImageApiImageClassifyPost, getUsersMementosApiUserUserIdMementoGet, createNewMementoApiUserUserIdMementoPost, getUsersMementosPageApiUserUserIdMementoPageGet, deleteMementoApiUserUserIdMementoIdDelete, updateMementoAndImagesApiUserUserIdMementoIdPut, getUsersImageLabelsApiUserUserIdMementoImageLabelsGet, getUsersCollectionsApiUserUserIdCollectionGet, createNewCollectionApiUserUserIdCollectionPost, deleteCollectionApiUserUserIdCollectionIdDelete, updateCollectionAndMementosApiUserUserIdCollectionIdPut, generateCollageApiUserUserIdCollectionIdCollageGet, testRecommendCollectionApiTestingRecommendCollectionUserIdPost, testCollageApiTestingCollageGet } from '../sdk.gen';
+import { queryOptions, type UseMutationOptions, infiniteQueryOptions, type InfiniteData } from '@tanstack/react-query';
+import type { HealthCheckApiGetData, ModelStatsApiModelsGetData, SignedUrlCacheStatsApiCacheSignedUrlsGetData, CollageCacheStatsApiCacheCollagesGetData, RecommendationStatsApiRecommendationsGetData, WebsocketStatsApiWebsocketsGetData, UserInfoApiUserIdGetData, PostUserInfoApiUserPostData, PostUserInfoApiUserPostError, PostUserInfoApiUserPostResponse, RemoveImageBackgroundApiImageRemoveBackgroundPostData, RemoveImageBackgroundApiImageRemoveBackgroundPostError, ExtractTextApiImageExtractTextPostData, ExtractTextApiImageExtractTextPostError, ExtractTextApiImageExtractTextPostResponse, ClassifyImageApiImageClassifyPostData, ClassifyImageApiImageClassifyPostError, ClassifyImageApiImageClassifyPostResponse, GetUsersMementosApiUserUserIdMementoGetData, CreateNewMementoApiUserUserIdMementoPostData, CreateNewMementoApiUserUserIdMementoPostError, CreateNewMementoApiUserUserIdMementoPostResponse, GetUsersMementosPageApiUserUserIdMementoPageGetData, GetUsersMementosPageApiUserUserIdMementoPageGetError, GetUsersMementosPageApiUserUserIdMementoPageGetResponse, DeleteMementoApiUserUserIdMementoIdDeleteData, DeleteMementoApiUserUserIdMementoIdDeleteError, DeleteMementoApiUserUserIdMementoIdDeleteResponse, UpdateMementoAndImagesApiUserUserIdMementoIdPutData, UpdateMementoAndImagesApiUserUserIdMementoIdPutError, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetData, GetUsersCollectionsApiUserUserIdCollectionGetData, CreateNewCollectionApiUserUserIdCollectionPostData, CreateNewCollectionApiUserUserIdCollectionPostError, CreateNewCollectionApiUserUserIdCollectionPostResponse, DeleteCollectionApiUserUserIdCollectionIdDeleteData, DeleteCollectionApiUserUserIdCollectionIdDeleteError, DeleteCollectionApiUserUserIdCollectionIdDeleteResponse, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutData, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutError, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutResponse, GenerateCollageApiUserUserIdCollectionIdCollageGetData, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostData, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostError, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostResponse, TestCollageApiTestingCollageGetData } from '../types.gen';
 import { client as _heyApiClient } from '../client.gen';
 
 export type QueryKey<TOptions extends Options> = [
@@ -53,6 +53,91 @@ export const healthCheckApiGetOptions = (options?: Options<HealthCheckApiGetData
     });
 };
 
+export const modelStatsApiModelsGetQueryKey = (options?: Options<ModelStatsApiModelsGetData>) => createQueryKey('modelStatsApiModelsGet', options);
+
+export const modelStatsApiModelsGetOptions = (options?: Options<ModelStatsApiModelsGetData>) => {
+    return queryOptions({
+        queryFn: async ({ queryKey, signal }) => {
+            const { data } = await modelStatsApiModelsGet({
+                ...options,
+                ...queryKey[0],
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: modelStatsApiModelsGetQueryKey(options)
+    });
+};
+
+export const signedUrlCacheStatsApiCacheSignedUrlsGetQueryKey = (options?: Options<SignedUrlCacheStatsApiCacheSignedUrlsGetData>) => createQueryKey('signedUrlCacheStatsApiCacheSignedUrlsGet', options);
+
+export const signedUrlCacheStatsApiCacheSignedUrlsGetOptions = (options?: Options<SignedUrlCacheStatsApiCacheSignedUrlsGetData>) => {
+    return queryOptions({
+        queryFn: async ({ queryKey, signal }) => {
+            const { data } = await signedUrlCacheStatsApiCacheSignedUrlsGet({
+                ...options,
+                ...queryKey[0],
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: signedUrlCacheStatsApiCacheSignedUrlsGetQueryKey(options)
+    });
+};
+
+export const collageCacheStatsApiCacheCollagesGetQueryKey = (options?: Options<CollageCacheStatsApiCacheCollagesGetData>) => createQueryKey('collageCacheStatsApiCacheCollagesGet', options);
+
+export const collageCacheStatsApiCacheCollagesGetOptions = (options?: Options<CollageCacheStatsApiCacheCollagesGetData>) => {
+    return queryOptions({
+        queryFn: async ({ queryKey, signal }) => {
+            const { data } = await collageCacheStatsApiCacheCollagesGet({
+                ...options,
+                ...queryKey[0],
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: collageCacheStatsApiCacheCollagesGetQueryKey(options)
+    });
+};
+
+export const recommendationStatsApiRecommendationsGetQueryKey = (options?: Options<RecommendationStatsApiRecommendationsGetData>) => createQueryKey('recommendationStatsApiRecommendationsGet', options);
+
+export const recommendationStatsApiRecommendationsGetOptions = (options?: Options<RecommendationStatsApiRecommendationsGetData>) => {
+    return queryOptions({
+        queryFn: async ({ queryKey, signal }) => {
+            const { data } = await recommendationStatsApiRecommendationsGet({
+                ...options,
+                ...queryKey[0],
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: recommendationStatsApiRecommendationsGetQueryKey(options)
+    });
+};
+
+export const websocketStatsApiWebsocketsGetQueryKey = (options?: Options<WebsocketStatsApiWebsocketsGetData>) => createQueryKey('websocketStatsApiWebsocketsGet', options);
+
+export const websocketStatsApiWebsocketsGetOptions = (options?: Options<WebsocketStatsApiWebsocketsGetData>) => {
+    return queryOptions({
+        queryFn: async ({ queryKey, signal }) => {
+            const { data } = await websocketStatsApiWebsocketsGet({
+                ...options,
+                ...queryKey[0],
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: websocketStatsApiWebsocketsGetQueryKey(options)
+    });
+};
+
 export const userInfoApiUserIdGetQueryKey = (options: Options<UserInfoApiUserIdGetData>) => createQueryKey('userInfoApiUserIdGet', options);
 
 export const userInfoApiUserIdGetOptions = (options: Options<UserInfoApiUserIdGetData>) => {
@@ -242,6 +327,78 @@ export const createNewMementoApiUserUserIdMementoPostMutation = (options?: Parti
     return mutationOptions;
 };
 
+export const getUsersMementosPageApiUserUserIdMementoPageGetQueryKey = (options: Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>) => createQueryKey('getUsersMementosPageApiUserUserIdMementoPageGet', options);
+
+export const getUsersMementosPageApiUserUserIdMementoPageGetOptions = (options: Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>) => {
+    return queryOptions({
+        queryFn: async ({ queryKey, signal }) => {
+            const { data } = await getUsersMementosPageApiUserUserIdMementoPageGet({
+                ...options,
+                ...queryKey[0],
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: getUsersMementosPageApiUserUserIdMementoPageGetQueryKey(options)
+    });
+};
+
+const createInfiniteParams = <K extends Pick<QueryKey<Options>[0], 'body' | 'headers' | 'path' | 'query'>>(queryKey: QueryKey<Options>, page: K) => {
+    const params = queryKey[0];
+    if (page.body) {
+        params.body = {
+            ...queryKey[0].body as any,
+            ...page.body as any
+        };
+    }
+    if (page.headers) {
+        params.headers = {
+            ...queryKey[0].headers,
+            ...page.headers
+        };
+    }
+    if (page.path) {
+        params.path = {
+            ...queryKey[0].path as any,
+            ...page.path as any
+        };
+    }
+    if (page.query) {
+        params.query = {
+            ...queryKey[0].query as any,
+            ...page.query as any
+        };
+    }
+    return params as unknown as typeof page;
+};
+
+export const getUsersMementosPageApiUserUserIdMementoPageGetInfiniteQueryKey = (options: Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>): QueryKey<Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>> => createQueryKey('getUsersMementosPageApiUserUserIdMementoPageGet', options, true);
+
+export const getUsersMementosPageApiUserUserIdMementoPageGetInfiniteOptions = (options: Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>) => {
+    return infiniteQueryOptions<GetUsersMementosPageApiUserUserIdMementoPageGetResponse, GetUsersMementosPageApiUserUserIdMementoPageGetError, InfiniteData<GetUsersMementosPageApiUserUserIdMementoPageGetResponse>, QueryKey<Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>>, string | null | Pick<QueryKey<Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>>[0], 'body' | 'headers' | 'path' | 'query'>>(
+    // @ts-ignore
+    {
+        queryFn: async ({ pageParam, queryKey, signal }) => {
+            // @ts-ignore
+            const page: Pick<QueryKey<Options<GetUsersMementosPageApiUserUserIdMementoPageGetData>>[0], 'body' | 'headers' | 'path' | 'query'> = typeof pageParam === 'object' ? pageParam : {
+                query: {
+                    cursor: pageParam
+                }
+            };
+            const params = createInfiniteParams(queryKey, page);
+            const { data } = await getUsersMementosPageApiUserUserIdMementoPageGet({
+                ...options,
+                ...params,
+                signal,
+                throwOnError: true
+            });
+            return data;
+        },
+        queryKey: getUsersMementosPageApiUserUserIdMementoPageGetInfiniteQueryKey(options)
+    });
+};
+
 export const deleteMementoApiUserUserIdMementoIdDeleteMutation = (options?: Partial<Options<DeleteMementoApiUserUserIdMementoIdDeleteData>>) => {
     const mutationOptions: UseMutationOptions<DeleteMementoApiUserUserIdMementoIdDeleteResponse, DeleteMementoApiUserUserIdMementoIdDeleteError, Options<DeleteMementoApiUserUserIdMementoIdDeleteData>> = {
         mutationFn: async (localOptions) => {
@@ -1,7 +1,7 @@
 // This file is auto-generated by @hey-api/openapi-ts
 
 import { type Options as ClientOptions, type TDataShape, type Client, formDataBodySerializer } from '@hey-api/client-fetch';
-import type { HealthCheckApiGetData, UserInfoApiUserIdGetData, UserInfoApiUserIdGetResponse, UserInfoApiUserIdGetError, PostUserInfoApiUserPostData, PostUserInfoApiUserPostResponse, PostUserInfoApiUserPostError, RemoveImageBackgroundApiImageRemoveBackgroundPostData, RemoveImageBackgroundApiImageRemoveBackgroundPostError, ExtractTextApiImageExtractTextPostData, ExtractTextApiImageExtractTextPostResponse, ExtractTextApiImageExtractTextPostError, ClassifyImageApiImageClassifyPostData, ClassifyImageApiImageClassifyPostResponse, ClassifyImageApiImageClassifyPostError, GetUsersMementosApiUserUserIdMementoGetData, GetUsersMementosApiUserUserIdMementoGetResponse, GetUsersMementosApiUserUserIdMementoGetError, CreateNewMementoApiUserUserIdMementoPostData, CreateNewMementoApiUserUserIdMementoPostResponse, CreateNewMementoApiUserUserIdMementoPostError, DeleteMementoApiUserUserIdMementoIdDeleteData, DeleteMementoApiUserUserIdMementoIdDeleteResponse, DeleteMementoApiUserUserIdMementoIdDeleteError, UpdateMementoAndImagesApiUserUserIdMementoIdPutData, UpdateMementoAndImagesApiUserUserIdMementoIdPutError, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetData, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetResponse, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetError, GetUsersCollectionsApiUserUserIdCollectionGetData, GetUsersCollectionsApiUserUserIdCollectionGetResponse, GetUsersCollectionsApiUserUserIdCollectionGetError, CreateNewCollectionApiUserUserIdCollectionPostData, CreateNewCollectionApiUserUserIdCollectionPostResponse, CreateNewCollectionApiUserUserIdCollectionPostError, DeleteCollectionApiUserUserIdCollectionIdDeleteData, DeleteCollectionApiUserUserIdCollectionIdDeleteResponse, DeleteCollectionApiUserUserIdCollectionIdDeleteError, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutData, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutResponse, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutError, GenerateCollageApiUserUserIdCollectionIdCollageGetData, GenerateCollageApiUserUserIdCollectionIdCollageGetError, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostData, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostResponse, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostError, TestCollageApiTestingCollageGetData, TestCollageApiTestingCollageGetError } from './types.gen';
+import type { HealthCheckApiGetData, ModelStatsApiModelsGetData, ModelStatsApiModelsGetResponse, SignedUrlCacheStatsApiCacheSignedUrlsGetData, SignedUrlCacheStatsApiCacheSignedUrlsGetResponse, CollageCacheStatsApiCacheCollagesGetData, CollageCacheStatsApiCacheCollagesGetResponse, RecommendationStatsApiRecommendationsGetData, RecommendationStatsApiRecommendationsGetResponse, WebsocketStatsApiWebsocketsGetData, WebsocketStatsApiWebsocketsGetResponse, UserInfoApiUserIdGetData, UserInfoApiUserIdGetResponse, UserInfoApiUserIdGetError, PostUserInfoApiUserPostData, PostUserInfoApiUserPostResponse, PostUserInfoApiUserPostError, RemoveImageBackgroundApiImageRemoveBackgroundPostData, RemoveImageBackgroundApiImageRemoveBackgroundPostError, ExtractTextApiImageExtractTextPostData, ExtractTextApiImageExtractTextPostResponse, ExtractTextApiImageExtractTextPostError, ClassifyImageApiImageClassifyPostData, ClassifyImageApiImageClassifyPostResponse, ClassifyImageApiImageClassifyPostError, GetUsersMementosApiUserUserIdMementoGetData, GetUsersMementosApiUserUserIdMementoGetResponse, GetUsersMementosApiUserUserIdMementoGetError, CreateNewMementoApiUserUserIdMementoPostData, CreateNewMementoApiUserUserIdMementoPostResponse, CreateNewMementoApiUserUserIdMementoPostError, GetUsersMementosPageApiUserUserIdMementoPageGetData, GetUsersMementosPageApiUserUserIdMementoPageGetResponse, GetUsersMementosPageApiUserUserIdMementoPageGetError, DeleteMementoApiUserUserIdMementoIdDeleteData, DeleteMementoApiUserUserIdMementoIdDeleteResponse, DeleteMementoApiUserUserIdMementoIdDeleteError, UpdateMementoAndImagesApiUserUserIdMementoIdPutData, UpdateMementoAndImagesApiUserUserIdMementoIdPutError, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetData, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetResponse, GetUsersImageLabelsApiUserUserIdMementoImageLabelsGetError, GetUsersCollectionsApiUserUserIdCollectionGetData, GetUsersCollectionsApiUserUserIdCollectionGetResponse, GetUsersCollectionsApiUserUserIdCollectionGetError, CreateNewCollectionApiUserUserIdCollectionPostData, CreateNewCollectionApiUserUserIdCollectionPostResponse, CreateNewCollectionApiUserUserIdCollectionPostError, DeleteCollectionApiUserUserIdCollectionIdDeleteData, DeleteCollectionApiUserUserIdCollectionIdDeleteResponse, DeleteCollectionApiUserUserIdCollectionIdDeleteError, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutData, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutResponse, UpdateCollectionAndMementosApiUserUserIdCollectionIdPutError, GenerateCollageApiUserUserIdCollectionIdCollageGetData, GenerateCollageApiUserUserIdCollectionIdCollageGetError, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostData, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostResponse, TestRecommendCollectionApiTestingRecommendCollectionUserIdPostError, TestCollageApiTestingCollageGetData, TestCollageApiTestingCollageGetError } from './types.gen';
 import { client as _heyApiClient } from './client.gen';
 
 export type Options<TData extends TDataShape = TDataShape, ThrowOnError extends boolean = boolean> = ClientOptions<TData, ThrowOnError> & {
@@ -31,6 +31,61 @@ export const healthCheckApiGet = <ThrowOnError extends boolean = false>(options?
     });
 };
 
+/**
+ * Model Stats
+ * Load time and memory cost of ML models loaded by this worker process.
+ */
+export const modelStatsApiModelsGet = <ThrowOnError extends boolean = false>(options?: Options<ModelStatsApiModelsGetData, ThrowOnError>) => {
+    return (options?.client ?? _heyApiClient).get<ModelStatsApiModelsGetResponse, unknown, ThrowOnError>({
+        url: '/api/models',
+        ...options
+    });
+};
+
+/**
+ * Signed Url Cache Stats
+ * Hit/miss statistics and size of this worker's signed image URL cache.
+ */
+export const signedUrlCacheStatsApiCacheSignedUrlsGet = <ThrowOnError extends boolean = false>(options?: Options<SignedUrlCacheStatsApiCacheSignedUrlsGetData, ThrowOnError>) => {
+    return (options?.client ?? _heyApiClient).get<SignedUrlCacheStatsApiCacheSignedUrlsGetResponse, unknown, ThrowOnError>({
+        url: '/api/cache/signed-urls',
+        ...options
+    });
+};
+
+/**
+ * Collage Cache Stats
+ * Hit/miss statistics and size of this worker's rendered collage cache.
+ */
+export const collageCacheStatsApiCacheCollagesGet = <ThrowOnError extends boolean = false>(options?: Options<CollageCacheStatsApiCacheCollagesGetData, ThrowOnError>) => {
+    return (options?.client ?? _heyApiClient).get<CollageCacheStatsApiCacheCollagesGetResponse, unknown, ThrowOnError>({
+        url: '/api/cache/collages',
+        ...options
+    });
+};
+
+/**
+ * Recommendation Stats
+ * Queue depth and coalescing counters of this worker's recommendation jobs.
+ */
+export const recommendationStatsApiRecommendationsGet = <ThrowOnError extends boolean = false>(options?: Options<RecommendationStatsApiRecommendationsGetData, ThrowOnError>) => {
+    return (options?.client ?? _heyApiClient).get<RecommendationStatsApiRecommendationsGetResponse, unknown, ThrowOnError>({
+        url: '/api/recommendations',
+        ...options
+    });
+};
+
+/**
+ * Websocket Stats
+ * Connected users and sessions, and send metrics of this worker's WebSockets.
+ */
+export const websocketStatsApiWebsocketsGet = <ThrowOnError extends boolean = false>(options?: Options<WebsocketStatsApiWebsocketsGetData, ThrowOnError>) => {
+    return (options?.client ?? _heyApiClient).get<WebsocketStatsApiWebsocketsGetResponse, unknown, ThrowOnError>({
+        url: '/api/websockets',
+        ...options
+    });
+};
+
 /**
  * User Info
  * Gets user info for a specific user.
@@ -124,12 +179,12 @@ export const getUsersMementosApiUserUserIdMementoGet = <ThrowOnError extends boo
  *
  * Three main steps:
  * 1. Creates a memento DB record
- * 2. Uploads associated images to object storage
- * 3. Stores a metadata DB record for each image
+ * 2. Uploads associated images to object storage (concurrently)
+ * 3. Stores a metadata DB record for each image (in one insert)
  *
  * Also kicks off background tasks for:
  * 1. Image processing
- * 2. Collection recommendation
+ * 2. Collection recommendation (debounced per user by the scheduler)
  *
  * Uses multipart/form-data to upload JSON/binary payloads simultaneously.
  */
@@ -145,6 +200,21 @@ export const createNewMementoApiUserUserIdMementoPost = <ThrowOnError extends bo
     });
 };
 
+/**
+ * Get Users Mementos Page
+ * Gets a page of a user's mementos, newest first.
+ *
+ * Pass the `next_cursor` of a page as `cursor` to get the next one. Compact
+ * pages leave out the detected text of images. Only the images on the page
+ * have their URLs signed.
+ */
+export const getUsersMementosPageApiUserUserIdMementoPageGet = <ThrowOnError extends boolean = false>(options: Options<GetUsersMementosPageApiUserUserIdMementoPageGetData, ThrowOnError>) => {
+    return (options.client ?? _heyApiClient).get<GetUsersMementosPageApiUserUserIdMementoPageGetResponse, GetUsersMementosPageApiUserUserIdMementoPageGetError, ThrowOnError>({
+        url: '/api/user/{user_id}/memento/page',
+        ...options
+    });
+};
+
 /**
  * Delete Memento
  * Delete a memento
@@ -245,6 +315,9 @@ export const updateCollectionAndMementosApiUserUserIdCollectionIdPut = <ThrowOnE
 /**
  * Generate Collage
  * Generates an image representation of a collection as a collage.
+ *
+ * Collages are cached until the collection changes, and tagged with an ETag;
+ * clients revalidating with If-None-Match get a 304 while it's unchanged.
  */
 export const generateCollageApiUserUserIdCollectionIdCollageGet = <ThrowOnError extends boolean = false>(options: Options<GenerateCollageApiUserUserIdCollectionIdCollageGetData, ThrowOnError>) => {
     return (options.client ?? _heyApiClient).get<unknown, GenerateCollageApiUserUserIdCollectionIdCollageGetError, ThrowOnError>({
@@ -34,6 +34,19 @@ export type BodyUpdateMementoAndImagesApiUserUserIdMementoIdPut = {
     images?: Array<Blob | File> | null;
 };
 
+/**
+ * Hit/miss statistics for a cache (of signed URLs, or collages).
+ */
+export type CacheStats = {
+    hits?: number;
+    misses?: number;
+    evictions?: number;
+    invalidations?: number;
+    entries?: number;
+    size_bytes?: number;
+    max_bytes?: number;
+};
+
 /**
  * Collection Schema for Pydantic.
  *
@@ -121,11 +134,12 @@ export type Image = {
 };
 
 /**
- * Value and formatted label
+ * Value and formatted label, with the number of images labelled
  */
 export type ImageLabelResponse = {
     value: string;
     label: string;
+    count: number;
 };
 
 export type ImageWithUrl = {
@@ -157,6 +171,17 @@ export type Memento = {
     images?: Array<Image> | null;
 };
 
+/**
+ * A page of mementos, newest first, with the cursor of the next page.
+ */
+export type MementoPage = {
+    mementos: Array<MementoWithImages>;
+    /**
+     * Cursor of the next page; null on the last page
+     */
+    next_cursor?: string | null;
+};
+
 export type MementoWithImages = {
     id: number;
     caption?: string | null;
@@ -167,6 +192,16 @@ export type MementoWithImages = {
     images: Array<ImageWithUrl>;
 };
 
+/**
+ * Load statistics for a registered model.
+ */
+export type ModelStats = {
+    name: string;
+    loaded?: boolean;
+    load_seconds?: number | null;
+    rss_delta_mb?: number | null;
+};
+
 /**
  * Inserting a new Collection to the DB.
  *
@@ -181,6 +216,18 @@ export type NewCollection = {
     user_id?: string | null;
 };
 
+/**
+ * Counters of the recommendation scheduler, since startup.
+ */
+export type SchedulerStats = {
+    queued?: number;
+    running?: number;
+    requested?: number;
+    coalesced?: number;
+    completed?: number;
+    failed?: number;
+};
+
 /**
  * Updating an existing Collection record in the DB.
  */
@@ -217,7 +264,27 @@ export type ValidationError = {
     type: string;
 };
 
-export type WsMessageType = 'recommendation';
+/**
+ * Connections and send metrics of a worker's WebSocket sessions.
+ */
+export type WebSocketStats = {
+    users?: number;
+    sessions?: number;
+    messages_sent?: number;
+    messages_dropped?: number;
+    send_failures?: number;
+    reaped?: number;
+    outbox_users?: number | null;
+    outbox_messages?: number | null;
+    acked?: number | null;
+    replayed?: number | null;
+    expired?: number | null;
+    send_latency_p50_ms?: number;
+    send_latency_p99_ms?: number;
+    send_latency_max_ms?: number;
+};
+
+export type WsMessageType = 'recommendation' | 'ping' | 'ack';
 
 /**
  * The structure of a WebSocket message.
@@ -225,6 +292,7 @@ export type WsMessageType = 'recommendation';
 export type WebSocketMessage = {
     type: WsMessageType;
     body: unknown;
+    id?: string | null;
 };
 
 export type HealthCheckApiGetData = {
@@ -241,6 +309,86 @@ export type HealthCheckApiGetResponses = {
     200: unknown;
 };
 
+export type ModelStatsApiModelsGetData = {
+    body?: never;
+    path?: never;
+    query?: never;
+    url: '/api/models';
+};
+
+export type ModelStatsApiModelsGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: Array<ModelStats>;
+};
+
+export type ModelStatsApiModelsGetResponse = ModelStatsApiModelsGetResponses[keyof ModelStatsApiModelsGetResponses];
+
+export type SignedUrlCacheStatsApiCacheSignedUrlsGetData = {
+    body?: never;
+    path?: never;
+    query?: never;
+    url: '/api/cache/signed-urls';
+};
+
+export type SignedUrlCacheStatsApiCacheSignedUrlsGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: CacheStats;
+};
+
+export type SignedUrlCacheStatsApiCacheSignedUrlsGetResponse = SignedUrlCacheStatsApiCacheSignedUrlsGetResponses[keyof SignedUrlCacheStatsApiCacheSignedUrlsGetResponses];
+
+export type CollageCacheStatsApiCacheCollagesGetData = {
+    body?: never;
+    path?: never;
+    query?: never;
+    url: '/api/cache/collages';
+};
+
+export type CollageCacheStatsApiCacheCollagesGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: CacheStats;
+};
+
+export type CollageCacheStatsApiCacheCollagesGetResponse = CollageCacheStatsApiCacheCollagesGetResponses[keyof CollageCacheStatsApiCacheCollagesGetResponses];
+
+export type RecommendationStatsApiRecommendationsGetData = {
+    body?: never;
+    path?: never;
+    query?: never;
+    url: '/api/recommendations';
+};
+
+export type RecommendationStatsApiRecommendationsGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: SchedulerStats;
+};
+
+export type RecommendationStatsApiRecommendationsGetResponse = RecommendationStatsApiRecommendationsGetResponses[keyof RecommendationStatsApiRecommendationsGetResponses];
+
+export type WebsocketStatsApiWebsocketsGetData = {
+    body?: never;
+    path?: never;
+    query?: never;
+    url: '/api/websockets';
+};
+
+export type WebsocketStatsApiWebsocketsGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: WebSocketStats;
+};
+
+export type WebsocketStatsApiWebsocketsGetResponse = WebsocketStatsApiWebsocketsGetResponses[keyof WebsocketStatsApiWebsocketsGetResponses];
+
 export type UserInfoApiUserIdGetData = {
     body?: never;
     path: {
@@ -296,7 +444,9 @@ export type PostUserInfoApiUserPostResponse = PostUserInfoApiUserPostResponses[k
 export type RemoveImageBackgroundApiImageRemoveBackgroundPostData = {
     body: BodyRemoveImageBackgroundApiImageRemoveBackgroundPost;
     path?: never;
-    query?: never;
+    query?: {
+        output_format?: 'png' | 'png8' | 'webp';
+    };
     url: '/api/image/remove-background';
 };
 
@@ -431,10 +581,50 @@ export type CreateNewMementoApiUserUserIdMementoPostResponses = {
 
 export type CreateNewMementoApiUserUserIdMementoPostResponse = CreateNewMementoApiUserUserIdMementoPostResponses[keyof CreateNewMementoApiUserUserIdMementoPostResponses];
 
+export type GetUsersMementosPageApiUserUserIdMementoPageGetData = {
+    body?: never;
+    path: {
+        user_id: string;
+    };
+    query?: {
+        cursor?: string | null;
+        limit?: number;
+        compact?: boolean;
+        start_date?: string | null;
+        end_date?: string | null;
+        min_lat?: number | null;
+        min_long?: number | null;
+        max_lat?: number | null;
+        max_long?: number | null;
+        text?: string | null;
+        image_label?: string | null;
+    };
+    url: '/api/user/{user_id}/memento/page';
+};
+
+export type GetUsersMementosPageApiUserUserIdMementoPageGetErrors = {
+    /**
+     * Validation Error
+     */
+    422: HttpValidationError;
+};
+
+export type GetUsersMementosPageApiUserUserIdMementoPageGetError = GetUsersMementosPageApiUserUserIdMementoPageGetErrors[keyof GetUsersMementosPageApiUserUserIdMementoPageGetErrors];
+
+export type GetUsersMementosPageApiUserUserIdMementoPageGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: MementoPage;
+};
+
+export type GetUsersMementosPageApiUserUserIdMementoPageGetResponse = GetUsersMementosPageApiUserUserIdMementoPageGetResponses[keyof GetUsersMementosPageApiUserUserIdMementoPageGetResponses];
+
 export type DeleteMementoApiUserUserIdMementoIdDeleteData = {
     body?: never;
     path: {
         id: number;
+        user_id: string;
     };
     query?: never;
     url: '/api/user/{user_id}/memento/{id}';
@@ -462,6 +652,7 @@ export type UpdateMementoAndImagesApiUserUserIdMementoIdPutData = {
     body: BodyUpdateMementoAndImagesApiUserUserIdMementoIdPut;
     path: {
         id: number;
+        user_id: string;
     };
     query?: never;
     url: '/api/user/{user_id}/memento/{id}';
@@ -620,10 +811,15 @@ export type UpdateCollectionAndMementosApiUserUserIdCollectionIdPutResponse = Up
 
 export type GenerateCollageApiUserUserIdCollectionIdCollageGetData = {
     body?: never;
+    headers?: {
+        'if-none-match'?: string | null;
+    };
     path: {
         id: number;
     };
-    query?: never;
+    query?: {
+        output_format?: 'png' | 'png8' | 'webp';
+    };
     url: '/api/user/{user_id}/collection/{id}/collage';
 };
 
@@ -690,6 +886,10 @@ export type TestCollageApiTestingCollageGetData = {
          * Collection location
          */
         location?: string | null;
+        /**
+         * Encoded image format
+         */
+        output_format?: 'png' | 'png8' | 'webp';
     };
     url: '/api/testing/collage';
 };
@@ -34,8 +34,19 @@ export const useWebSocket = () => {
     wsRef.current = ws;
     console.log("WS opened");
 
-    ws.onmessage = (event) =>
-      handleMessageType(JSON.parse(event.data) as WebSocketMessage);
+    ws.onmessage = (event) => {
+      const message = JSON.parse(event.data) as WebSocketMessage;
+      // Answer heartbeats, or the server closes the connection as idle
+      if (message.type === "ping") {
+        ws.send("pong");
+        return;
+      }
+      handleMessageType(message);
+      // Acknowledge, or the server replays the message on reconnecting
+      if (message.id) {
+        ws.send(JSON.stringify({ type: "ack", body: message.id }));
+      }
+    };
 
     ws.onclose = () => {
       console.log("WS closed");
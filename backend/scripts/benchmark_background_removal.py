@@ -0,0 +1,127 @@
+"""
+@description Benchmarks background removal on a large photo, comparing
+    segmentation at full resolution against segmentation on a downscaled copy
+    (`rembg_max_side`). Each mode runs in a fresh process so peak RSS is
+    measured independently.
+
+    Usage: python -m scripts.benchmark_background_removal [--megapixels 12]
+        [--runs 5] [--max-side 1024] [--fake-model]
+
+    `--fake-model` replaces only the network forward pass with a random output,
+    keeping rembg's pre and post-processing, for machines without the weights.
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+
+class _FakeInnerSession:
+    """Stands in for the ONNX Runtime session of U2Net."""
+
+    class _Input:
+        name = "input.1"
+
+    def get_inputs(self) -> list[Any]:
+        return [self._Input()]
+
+    def run(self, _: Any, feed: dict[str, np.ndarray]) -> list[np.ndarray]:
+        (batch,) = feed.values()
+        rng = np.random.default_rng(0)
+        return [rng.random((batch.shape[0], 1, 320, 320), dtype=np.float32)]
+
+
+def _fake_session() -> Any:
+    from rembg.sessions.u2net import U2netSession
+
+    session = U2netSession.__new__(U2netSession)
+    session.model_name = "u2net"
+    session.inner_session = _FakeInnerSession()
+    return session
+
+
+def _make_photo(megapixels: float) -> Image.Image:
+    """A 4:3 noisy gradient, so resampling does real work."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 55, (height, width, 3), dtype=np.uint8)
+    pixels += np.linspace(0, 200, width, dtype=np.uint8)[None, :, None]
+    return Image.fromarray(pixels, "RGB")
+
+
+def _run_mode(
+    max_side: int,
+    megapixels: float,
+    runs: int,
+    fake_model: bool,
+) -> dict[str, float]:
+    """Times background removal in this (fresh) process."""
+    from server.config.settings import settings
+    from server.services.process_image import background
+
+    settings.rembg_max_side = max_side
+    if fake_model:
+        session = _fake_session()
+        background.get_session = lambda: session
+    else:
+        background.get_session()
+
+    image = _make_photo(megapixels)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Warm up, so the first run doesn't include one-off costs
+    asyncio.run(background.remove_background(image))
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        asyncio.run(background.remove_background(image))
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "median_ms": statistics.median(latencies) * 1000,
+        "min_ms": min(latencies) * 1000,
+        # Growth of peak RSS over the loaded process and image (Linux reports KB)
+        "peak_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before)
+        / 1024,
+    }
+
+
+def main() -> None:
+    """Runs each mode in its own process and logs the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-side", type=int, default=1024)
+    parser.add_argument("--fake-model", action="store_true")
+    args = parser.parse_args()
+
+    modes = {"full resolution": 0, f"downscaled ({args.max_side}px)": args.max_side}
+    logger.info(f"{args.megapixels} MP image, {args.runs} runs per mode")
+    for label, max_side in modes.items():
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(
+                _run_mode,
+                max_side,
+                args.megapixels,
+                args.runs,
+                args.fake_model,
+            ).result()
+        logger.info(
+            f"{label:>24}: median {result['median_ms']:7.1f} ms, "
+            f"min {result['min_ms']:7.1f} ms, "
+            f"peak RSS {result['peak_rss_mb']:7.1f} MB",
+        )
+
+
+if __name__ == "__main__":
+    main()
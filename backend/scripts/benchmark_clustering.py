@@ -0,0 +1,118 @@
+"""
+@description Benchmarks memento clustering on synthetic worldwide data,
+    comparing standardized lat/long with Euclidean distance against great-circle
+    (haversine) distance with a BallTree. Points are spread in km around cities
+    placed uniformly on the sphere, plus uniform noise, and each mode is scored
+    against those cities with the adjusted Rand index.
+
+    Usage: python -m scripts.benchmark_clustering [--sizes 10000,100000]
+        [--full] [--cities 50] [--spread-km 5] [--noise 0.1] [--selection-km 20]
+
+    --full adds a 1M point run, which takes several minutes. The haversine
+    modes run out of memory at that size: hdbscan's BallTree Boruvka computes
+    the distances between every pair of tree nodes (~128 GB for 1M points).
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+from sklearn.metrics import adjusted_rand_score
+
+from server.services.cluster_memento.hdbscan import EARTH_RADIUS_KM, fit_clusterer
+
+# Size added by --full, the largest benchmarked
+FULL_SIZE = 1_000_000
+
+
+def _uniform_on_sphere(rng: np.random.Generator, count: int) -> NDArray[np.float64]:
+    """Lat/long (in degrees) of points spread uniformly over the sphere."""
+    lat = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    long = rng.uniform(-180, 180, count)
+    return np.column_stack([lat, long])
+
+
+def _make_points(
+    size: int,
+    cities: int,
+    spread_km: float,
+    noise: float,
+    seed: int = 0,
+) -> tuple[NDArray[np.float64], NDArray[np.int_]]:
+    """Lat/long of each point, and the city it belongs to (-1 for noise)."""
+    rng = np.random.default_rng(seed)
+    centres = _uniform_on_sphere(rng, cities)
+    noise_count = int(size * noise)
+    truth = rng.integers(0, cities, size - noise_count)
+
+    # Offsets in km, converted to degrees (a degree of longitude shrinks with
+    # latitude); cities near the poles are clipped rather than wrapped
+    offsets = rng.normal(0, spread_km, (len(truth), 2)) / EARTH_RADIUS_KM
+    lat = centres[truth, 0] + np.degrees(offsets[:, 0])
+    cos_lat = np.maximum(np.cos(np.radians(centres[truth, 0])), 1e-3)
+    long = centres[truth, 1] + np.degrees(offsets[:, 1]) / cos_lat
+    points = np.column_stack(
+        [np.clip(lat, -90, 90), (long + 180) % 360 - 180],
+    )
+
+    points = np.vstack([points, _uniform_on_sphere(rng, noise_count)])
+    truth = np.concatenate([truth, np.full(noise_count, -1)])
+    return points, truth
+
+
+def main() -> None:
+    """Clusters each size with each mode and logs the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--spread-km", type=float, default=5)
+    parser.add_argument("--noise", type=float, default=0.1)
+    parser.add_argument("--min-cluster-size", type=int, default=5)
+    parser.add_argument("--selection-km", type=float, default=20)
+    args = parser.parse_args()
+    # The clusterer logs every coordinate and label at DEBUG
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+
+    modes = {
+        "euclidean": {"metric": "euclidean"},
+        "haversine": {"metric": "haversine"},
+        f"haversine ({args.selection_km:g} km)": {
+            "metric": "haversine",
+            "cluster_selection_km": args.selection_km,
+        },
+    }
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if args.full and FULL_SIZE not in sizes:
+        sizes.append(FULL_SIZE)
+    for size in sizes:
+        points, truth = _make_points(size, args.cities, args.spread_km, args.noise)
+        logger.info(f"{size} points, {args.cities} cities, {args.noise:.0%} noise")
+        for label, options in modes.items():
+            start = time.perf_counter()
+            try:
+                _, _, labels = fit_clusterer(
+                    points,
+                    min_cluster_size=args.min_cluster_size,
+                    prediction_data=False,
+                    **options,  # type: ignore[arg-type]
+                )
+            except MemoryError as e:
+                # hdbscan's BallTree Boruvka holds a distance matrix of tree nodes
+                logger.warning(f"{label:>24}: out of memory ({e})")
+                continue
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"{label:>24}: {elapsed:8.2f} s, "
+                f"ARI {adjusted_rand_score(truth, labels):.3f}, "
+                f"{labels.max() + 1:5d} clusters, "
+                f"{np.mean(labels == -1):.0%} noise",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,19 @@ def test():
     subprocess.run(["pytest", "-vv"])
 
 
+def export_onnx():
+    from server.config.settings import settings
+    from server.services.process_image.classifiers import export_resnet50_onnx
+
+    export_resnet50_onnx(settings.onnx_model_path, settings.onnx_class_index_path)
+
+
+def batch_cluster():
+    from server.background_tasks.batch_cluster import main
+
+    main()
+
+
 def sync_db_pydantic():
     db_url = os.getenv("DB_URL")
     if not db_url:
@@ -4,7 +4,9 @@
 @requirements FR-3, FR-35, FR-36, FR-37, FR-53
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from loguru import logger
 from pydantic import UUID4
 
@@ -26,10 +28,19 @@ from server.services.db.queries.collection import (
     get_has_mementos,
     update_collection,
 )
+from server.services.process_image.collage.cache import (
+    collage_cache,
+    collage_etag,
+    etag_matches,
+)
 from server.services.process_image.collage.generator import (
     CollageGenerator,
 )
-from server.services.process_image.converters import pil_to_png_bytes
+from server.services.process_image.converters import (
+    MEDIA_TYPES,
+    OutputFormat,
+    pil_to_bytes,
+)
 from server.services.storage.image import download_images
 
 router = APIRouter()
@@ -41,7 +52,7 @@ async def get_users_collections(
 ) -> list[CollectionWithMementos]:
     """Gets all the collections belonging to a user."""
     logger.info("get collection")
-    collections = get_collections(user_id)
+    collections = await get_collections(user_id)
     if not collections:
         return []
     return collections
@@ -56,7 +67,7 @@ async def create_new_collection(
     """Create a collection."""
     logger.info(f"Creating a new collection {new_collection}")
 
-    inserted_collection = create_collection(new_collection, user_id)
+    inserted_collection = await create_collection(new_collection, user_id)
     if not inserted_collection:
         raise HTTPException(status_code=400, detail="Insert Collection Failed")
 
@@ -66,7 +77,7 @@ async def create_new_collection(
             collection_id=inserted_collection.id,
             memento_id=memento_id,
         )
-        if not associate_memento(has_memento):
+        if not await associate_memento(has_memento):
             raise HTTPException(
                 status_code=400,
                 detail="Associate Memento to Collection Failed.",
@@ -83,11 +94,12 @@ async def update_collection_and_mementos(
 ) -> Collection:
     """Update a collection."""
 
-    updated_collection = update_collection(id, collection)
+    updated_collection = await update_collection(id, collection)
     if not updated_collection:
         raise HTTPException(status_code=400, detail="Update collection failed")
+    collage_cache.invalidate([id])
 
-    memento_ids_current = get_has_mementos(id)
+    memento_ids_current = await get_has_mementos(id)
     mementos_to_add = [m_id for m_id in mementos if m_id not in memento_ids_current]
     mementos_to_remove = [m_id for m_id in memento_ids_current if m_id not in mementos]
 
@@ -97,7 +109,7 @@ async def update_collection_and_mementos(
             collection_id=id,
             memento_id=memento_id,
         )
-        if not associate_memento(has_memento):
+        if not await associate_memento(has_memento):
             raise HTTPException(
                 status_code=400,
                 detail="Associate Memento to Collection Failed.",
@@ -105,7 +117,7 @@ async def update_collection_and_mementos(
 
     # Remove deleted mementos from collection
     for memento_id in mementos_to_remove:
-        if not db_delete_has_memento(id, memento_id):
+        if not await db_delete_has_memento(id, memento_id):
             raise HTTPException(
                 status_code=400,
                 detail=f"Failed to remove mementos {memento_id}",
@@ -120,27 +132,47 @@ async def delete_collection(
 ) -> Collection:
     """Delete a collection."""
 
-    deleted_collection = db_delete_collection(id)
+    deleted_collection = await db_delete_collection(id)
     if not deleted_collection:
         raise HTTPException(status_code=400, detail="Delete collection failed")
+    collage_cache.invalidate([id])
 
     return deleted_collection
 
 
 @router.get("/{id}/collage")
-async def generate_collage(id: int) -> Response:
-    """Generates an image representation of a collection as a collage."""
-    collection = get_collection(id)
+async def generate_collage(
+    id: int,
+    output_format: OutputFormat = "png",
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """Generates an image representation of a collection as a collage.
+
+    Collages are cached until the collection changes, and tagged with an ETag;
+    clients revalidating with If-None-Match get a 304 while it's unchanged.
+    """
+    collection = await get_collection(id)
     if not collection:
         raise HTTPException(status_code=404, detail=f"No collection found for id={id}")
     try:
-        image_filenames = get_collection_image_filenames(id)
-        images = download_images(image_filenames)
-        output_image = await CollageGenerator().create_collage(
-            collection,
-            images,
+        image_filenames = await get_collection_image_filenames(id)
+        generator = CollageGenerator()
+        etag = collage_etag(collection, image_filenames, generator, output_format)
+        # Clients may reuse the collage, but must revalidate it first
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        output_bytes = collage_cache.get(id, output_format, etag)
+        if output_bytes is None:
+            images = await download_images(image_filenames)
+            output_image = await generator.create_collage(collection, images)
+            output_bytes = await pil_to_bytes(output_image, output_format)
+            collage_cache.put(id, output_format, etag, output_bytes)
+        return Response(
+            content=output_bytes,
+            media_type=MEDIA_TYPES[output_format],
+            headers=headers,
         )
-        output_bytes = await pil_to_png_bytes(output_image)
-        return Response(content=output_bytes, media_type="image/png")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
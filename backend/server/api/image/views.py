@@ -11,22 +11,27 @@ from server.services.process_image.background import (
     remove_background,
 )
 from server.services.process_image.converters import (
-    pil_to_png_bytes,
+    MEDIA_TYPES,
+    OutputFormat,
+    pil_to_bytes,
     upload_file_to_pil,
 )
-from server.services.process_image.image_class import predict_class
+from server.services.process_image.image_class import predict_classes
 
 router = APIRouter()
 
 
 @router.post("/remove-background")
-async def remove_image_background(image_file: UploadFile) -> Response:
+async def remove_image_background(
+    image_file: UploadFile,
+    output_format: OutputFormat = "png",
+) -> Response:
     """Post route that takes an image and removes its background."""
     try:
         input_image = await upload_file_to_pil(image_file)
         output_image = await remove_background(input_image)
-        output_bytes = await pil_to_png_bytes(output_image)
-        return Response(content=output_bytes, media_type="image/png")
+        output_bytes = await pil_to_bytes(output_image, output_format)
+        return Response(content=output_bytes, media_type=MEDIA_TYPES[output_format])
     except BackgroundRemovalError as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
@@ -48,6 +53,6 @@ async def classify_image(image_file: UploadFile) -> str:
     """Test route for using Tensorflow/Keras to classify image"""
     try:
         input_image = await upload_file_to_pil(image_file)
-        return predict_class(input_image)
+        return predict_classes([input_image])[0]
     except Exception as e:
         return str(e)
@@ -1,10 +1,19 @@
+import base64
+import binascii
 import datetime
 import re
 from typing import Any, Optional
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
 
 from server.services.db.models.gis import BaseWithCoordinates, CoordinatesInsert
+from server.services.db.models.joins import MementoWithImages
 from server.services.db.models.schema_public_latest import (
     ImageInsert,
     Memento,
@@ -41,10 +50,11 @@ class UpdateMemento(CoordinatesInsert, BaseWithCoordinates, MementoUpdate):  # t
 
 
 class ImageLabelResponse(BaseModel):
-    """Value and formatted label"""
+    """Value and formatted label, with the number of images labelled"""
 
     value: str
     label: str
+    count: int
 
 
 class MementoFilterParams(BaseModel):
@@ -120,3 +130,35 @@ class CreateMementoSuccessResponse(BaseModel):
 
     new_memento_id: int
     message: str = "Successfully created new Memento"
+
+
+class MementoCursor(BaseModel):
+    """Position of the last memento of a page, in (date, id) order.
+
+    Sent to clients as an opaque, URL-safe string.
+    """
+
+    date: Optional[datetime.date] = None
+    id: int
+
+    def encode(self) -> str:
+        """Encodes the cursor as an opaque string."""
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "MementoCursor":
+        """Decodes a cursor string from a client, raising ValueError if invalid."""
+        try:
+            return cls.model_validate_json(base64.urlsafe_b64decode(cursor))
+        except (binascii.Error, ValidationError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class MementoPage(BaseModel):
+    """A page of mementos, newest first, with the cursor of the next page."""
+
+    mementos: list[MementoWithImages]
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Cursor of the next page; null on the last page",
+    )
@@ -7,7 +7,15 @@
 import json
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Form,
+    HTTPException,
+    Query,
+    UploadFile,
+)
 from fastapi.responses import JSONResponse
 from loguru import logger
 from pydantic import UUID4
@@ -15,61 +23,97 @@ from pydantic import UUID4
 from server.api.memento.models import (
     CreateMementoSuccessResponse,
     ImageLabelResponse,
+    MementoCursor,
     MementoFilterParams,
+    MementoPage,
     NewImageMetadata,
     NewMemento,
     UpdateMemento,
 )
 from server.api.path import get_user_id
 from server.background_tasks.process_image import process_images_in_background
-from server.background_tasks.recommend import recommend_collection
+from server.background_tasks.recommend import recommendation_scheduler
+from server.config.settings import settings
+from server.services.cluster_memento.incremental import clustering_models
 from server.services.db.models.joins import MementoWithImages
 from server.services.db.models.schema_public_latest import Memento
 from server.services.db.queries.image import (
-    create_image_metadata,
-    delete_image_metadata,
+    create_image_metadata_bulk,
+    delete_image_metadata_bulk,
     get_images_for_memento,
-    update_image,
+    update_images_bulk,
 )
 from server.services.db.queries.memento import (
     create_memento,
     db_delete_memento,
     get_image_labels,
+    get_memento_collection_ids,
     get_mementos,
+    get_mementos_page,
     update_memento,
 )
-from server.services.process_image.converters import upload_file_to_pil
+from server.services.process_image.collage.cache import collage_cache
+from server.services.process_image.converters import bytes_to_pil
 from server.services.storage.image import (
     delete_images,
     get_bulk_image_urls,
-    upload_image,
+    upload_images,
 )
 
 router = APIRouter()
 
 
-@router.get("/")
-def get_users_mementos(
-    user_id: UUID4 = Depends(get_user_id),
-    filter_query: MementoFilterParams = Depends(MementoFilterParams),
-) -> list[MementoWithImages]:
-    """Gets all the mementos belonging to a user."""
-    mementos = get_mementos(user_id, filter_query)
-    # Get all image URLs
-    image_urls = get_bulk_image_urls(
+async def _attach_image_urls(mementos: list[MementoWithImages]) -> None:
+    """Signs the URLs of the mementos' images, and sorts them in order for the UI."""
+    image_urls = await get_bulk_image_urls(
         [image.filename for memento in mementos for image in memento.images],
     )
 
-    # Assign URLs to images and sort in proper order for UI
     for memento in mementos:
         for image in memento.images:
             image.url = image_urls.get(image.filename, "")
         # Sort images by order index
         memento.images.sort(key=lambda image: image.order_index)
 
+
+@router.get("/")
+async def get_users_mementos(
+    user_id: UUID4 = Depends(get_user_id),
+    filter_query: MementoFilterParams = Depends(MementoFilterParams),
+) -> list[MementoWithImages]:
+    """Gets all the mementos belonging to a user."""
+    mementos = await get_mementos(user_id, filter_query)
+    await _attach_image_urls(mementos)
     return mementos
 
 
+@router.get("/page", response_model_exclude_unset=True)
+async def get_users_mementos_page(
+    user_id: UUID4 = Depends(get_user_id),
+    filter_query: MementoFilterParams = Depends(MementoFilterParams),
+    cursor: Optional[str] = None,
+    limit: Annotated[
+        int,
+        Query(ge=1, le=settings.memento_max_page_size),
+    ] = settings.memento_page_size,
+    compact: bool = False,
+) -> MementoPage:
+    """Gets a page of a user's mementos, newest first.
+
+    Pass the `next_cursor` of a page as `cursor` to get the next one. Compact
+    pages leave out the detected text of images. Only the images on the page
+    have their URLs signed.
+    """
+    try:
+        after = MementoCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    page = await get_mementos_page(user_id, filter_query, after, limit, compact)
+    await _attach_image_urls(page.mementos)
+    return page
+
+
 @router.post("/")
 async def create_new_memento(
     background_tasks: BackgroundTasks,
@@ -83,12 +127,12 @@ async def create_new_memento(
 
     Three main steps:
         1. Creates a memento DB record
-        2. Uploads associated images to object storage
-        3. Stores a metadata DB record for each image
+        2. Uploads associated images to object storage (concurrently)
+        3. Stores a metadata DB record for each image (in one insert)
 
     Also kicks off background tasks for:
         1. Image processing
-        2. Collection recommendation
+        2. Collection recommendation (debounced per user by the scheduler)
 
     Uses multipart/form-data to upload JSON/binary payloads simultaneously.
     """
@@ -99,27 +143,25 @@ async def create_new_memento(
     ]
 
     # Create new memento in DB
-    new_memento = create_memento(memento, user_id)
+    new_memento = await create_memento(memento, user_id)
 
-    pil_images = []
-    for i in range(len(images)):
-        # Upload image to object storage
-        path = await upload_image(images[i])
+    # Upload images to object storage
+    uploads = await upload_images(images)
 
-        # Create new image metadata records in DB
-        image_metadata[i].filename = path
+    # Create new image metadata records in DB
+    for metadata, (path, _) in zip(image_metadata, uploads):
+        metadata.filename = path
+    await create_image_metadata_bulk(image_metadata[: len(uploads)], new_memento.id)
 
-        create_image_metadata(image_metadata[i], new_memento.id)
-
-        new_image = await upload_file_to_pil(images[i])
-        pil_images.append((new_image, path))
+    # Reuse the uploaded bytes, instead of reading each file again
+    pil_images = [(bytes_to_pil(content), path) for path, content in uploads]
 
     background_tasks.add_task(process_images_in_background, pil_images)
     logger.info("Running image processing in the background...")
 
     if run_recommend:  # query param, defaults to True
-        background_tasks.add_task(recommend_collection, user_id)
-        logger.info("Running collection recommendation in the background...")
+        recommendation_scheduler.schedule(user_id)
+        logger.info("Scheduled collection recommendation in the background...")
 
     return CreateMementoSuccessResponse(new_memento_id=new_memento.id)
 
@@ -131,6 +173,7 @@ async def update_memento_and_images(
     memento_str: Annotated[str, Form()],
     image_metadata_str: Annotated[str, Form()],
     images: Optional[list[UploadFile]] = None,
+    user_id: UUID4 = Depends(get_user_id),
 ) -> JSONResponse:
     """Put route for updating a memento and its associated images.
 
@@ -149,51 +192,59 @@ async def update_memento_and_images(
     ]
 
     # Update the memento record
-    updated_memento = update_memento(id, new_memento_fields)
+    updated_memento = await update_memento(id, new_memento_fields)
     logger.info(f"Updated memento with ID={updated_memento.id}")
+    # Coordinates may have changed; recommendations will refit from scratch
+    clustering_models.invalidate(user_id)
+    # So may the images of the collages it's in
+    collage_cache.invalidate(await get_memento_collection_ids(id))
 
     # Old images
-    files_to_delete = []
-    for metadata in get_images_for_memento(id):
+    order_updates: dict[str, dict[str, str | int]] = {}
+    ids_to_delete, files_to_delete = [], []
+    for metadata in await get_images_for_memento(id):
         image_kept = next(
             (new for new in image_metadata if new.filename == metadata.filename),
             None,
         )
         if image_kept:
             # User kept old image; update DB record in case images re-ordered
-            update_image(
-                image_kept.filename,
-                {"order_index": image_kept.order_index},
-            )
-            logger.info(f"Updated image metadata for file: {image_kept.filename}")
+            order_updates[image_kept.filename] = {
+                "order_index": image_kept.order_index,
+            }
         else:
             # User removed the old image; delete from DB/storage
-            delete_image_metadata(metadata.id)
+            ids_to_delete.append(metadata.id)
             files_to_delete.append(metadata.filename)
-            logger.info(f"Removed Image[{metadata.id}] record from DB")
+    if order_updates:
+        await update_images_bulk(order_updates)
+        logger.info(f"Updated image metadata for files: {list(order_updates)}")
+    if ids_to_delete:
+        await delete_image_metadata_bulk(ids_to_delete)
+        logger.info(f"Removed Image{ids_to_delete} records from DB")
     if files_to_delete:
-        delete_images(files_to_delete)
+        await delete_images(files_to_delete)
         logger.info(f"Deleted images from storage: {files_to_delete}")
 
     # New images
     if images:
-        pil_images = []
-        for image in images:
-            # Upload image file to storage
-            path = await upload_image(image)
-            logger.info(f"Uploaded new image {path} to storage.")
-            # Create new DB record for metadata
-            new_metadata = next(
-                new for new in image_metadata if new.filename == image.filename
-            )
-            new_metadata.filename = path
-
-            # Create image metadata in DB
-            create_image_metadata(new_metadata, updated_memento.id)
-            logger.info(f"Created image metadata record for {metadata.filename}")
-
-            new_image = await upload_file_to_pil(image)
-            pil_images.append((new_image, path))
+        # Match metadata to files before the filenames are replaced by paths
+        new_metadata = [
+            next(new for new in image_metadata if new.filename == image.filename)
+            for image in images
+        ]
+
+        # Upload image files to storage
+        uploads = await upload_images(images)
+        logger.info(f"Uploaded {len(uploads)} new images to storage.")
+
+        # Create image metadata records in DB
+        for new_meta, (path, _) in zip(new_metadata, uploads):
+            new_meta.filename = path
+        await create_image_metadata_bulk(new_metadata, updated_memento.id)
+        logger.info(f"Created {len(new_metadata)} image metadata records")
+
+        pil_images = [(bytes_to_pil(content), path) for path, content in uploads]
 
         background_tasks.add_task(process_images_in_background, pil_images)
         logger.info("Running image processing in the background...")
@@ -206,18 +257,22 @@ async def update_memento_and_images(
 @router.delete("/{id}")
 async def delete_memento(
     id: int,
+    user_id: UUID4 = Depends(get_user_id),
 ) -> Memento:
     """Delete a memento"""
-    deleted_memento = db_delete_memento(id)
+    collection_ids = await get_memento_collection_ids(id)
+    deleted_memento = await db_delete_memento(id)
 
     if not deleted_memento:
         raise HTTPException(status_code=400, detail="Delete collection failed")
+    clustering_models.invalidate(user_id)
+    collage_cache.invalidate(collection_ids)
 
     return deleted_memento
 
 
 @router.get("/image_labels")
-def get_users_image_labels(
+async def get_users_image_labels(
     user_id: UUID4 = Depends(get_user_id),
 ) -> list[ImageLabelResponse]:
     """Gets each unique image label from images associated with user's mementos"""
@@ -225,7 +280,8 @@ def get_users_image_labels(
     def format_label(snake_case: str) -> str:
         return " ".join(word.capitalize() for word in snake_case.split("_"))
 
-    labels = get_image_labels(user_id)
+    labels = await get_image_labels(user_id)
     return [
-        ImageLabelResponse(value=label, label=format_label(label)) for label in labels
+        ImageLabelResponse(value=label, label=format_label(label), count=count)
+        for label, count in labels.items()
     ]
@@ -1,6 +1,13 @@
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 
+from server.api.websocket.manager import websocket_manager
+from server.api.websocket.models import WebSocketStats
+from server.background_tasks.recommend import SchedulerStats, recommendation_scheduler
+from server.services.process_image.collage.cache import collage_cache
+from server.services.process_image.model_registry import ModelStats, model_registry
+from server.services.storage.url_cache import CacheStats, signed_url_cache
+
 router = APIRouter()
 
 
@@ -12,3 +19,33 @@ def health_check() -> JSONResponse:
     It returns 200 if the project is healthy.
     """
     return JSONResponse(content={"message": "Healthy!"})
+
+
+@router.get("/models")
+def model_stats() -> list[ModelStats]:
+    """Load time and memory cost of ML models loaded by this worker process."""
+    return model_registry.stats()
+
+
+@router.get("/cache/signed-urls")
+def signed_url_cache_stats() -> CacheStats:
+    """Hit/miss statistics and size of this worker's signed image URL cache."""
+    return signed_url_cache.stats()
+
+
+@router.get("/cache/collages")
+def collage_cache_stats() -> CacheStats:
+    """Hit/miss statistics and size of this worker's rendered collage cache."""
+    return collage_cache.stats()
+
+
+@router.get("/recommendations")
+def recommendation_stats() -> SchedulerStats:
+    """Queue depth and coalescing counters of this worker's recommendation jobs."""
+    return recommendation_scheduler.stats()
+
+
+@router.get("/websockets")
+def websocket_stats() -> WebSocketStats:
+    """Connected users and sessions, and send metrics of this worker's WebSockets."""
+    return websocket_manager.stats()
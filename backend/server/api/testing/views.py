@@ -11,7 +11,11 @@ from pydantic import UUID4
 from server.background_tasks.recommend import recommend_collection
 from server.services.db.models.schema_public_latest import Collection
 from server.services.process_image.collage.generator import CollageGenerator
-from server.services.process_image.converters import pil_to_png_bytes
+from server.services.process_image.converters import (
+    MEDIA_TYPES,
+    OutputFormat,
+    pil_to_bytes,
+)
 
 router = APIRouter(prefix="/testing", tags=["testing"])
 
@@ -35,6 +39,7 @@ async def test_collage(
     title: str = Query("Test Collection", description="Collection title"),
     caption: Optional[str] = Query(None, description="Collection caption"),
     location: Optional[str] = Query(None, description="Collection location"),
+    output_format: OutputFormat = Query("png", description="Encoded image format"),
 ) -> Response:
     """Test endpoint to generate a collage from a local directory containing images."""
     logger.info(f"Testing collage generation with folder: {folder_path}")
@@ -73,7 +78,7 @@ async def test_collage(
         generator = CollageGenerator()
         collage = await generator.create_collage(collection, images)
 
-        output_bytes = await pil_to_png_bytes(collage)
-        return Response(content=output_bytes, media_type="image/png")
+        output_bytes = await pil_to_bytes(collage, output_format)
+        return Response(content=output_bytes, media_type=MEDIA_TYPES[output_format])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -14,21 +14,21 @@ router = APIRouter()
 
 
 @router.get("/{id}")
-def user_info(id: UUID4) -> UserInfo:
+async def user_info(id: UUID4) -> UserInfo:
     """Gets user info for a specific user."""
-    user_info = get_user_info(id)
+    user_info = await get_user_info(id)
     if not user_info:
         raise HTTPException(status_code=404, detail="User not found")
     return user_info
 
 
 @router.post("/")
-def post_user_info(body: UserInfoInsert) -> UserInfo:
+async def post_user_info(body: UserInfoInsert) -> UserInfo:
     """Creates a new user info record for a first time user.
 
     User should have already been registered via Supabase Auth on client.
     """
     try:
-        return create_user_info(body)
+        return await create_user_info(body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
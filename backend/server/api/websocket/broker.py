@@ -0,0 +1,370 @@
+"""
+@description Pub/sub fan-out of WebSocket messages between uvicorn workers. A
+    message for a user is published to the broker, which hands it to every
+    worker with a session of that user; each worker only delivers to its own
+    sessions. The in-memory broker only reaches the current process, the Unix
+    socket broker reaches every worker on the host. Messages with an ID are
+    also held in the broker's outbox until the client acknowledges them, and
+    replayed whenever a worker subscribes to the user again.
+@requirements FR-39
+"""
+
+import asyncio
+import fcntl
+import os
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from pathlib import Path
+from typing import IO, Awaitable, Callable, Optional
+
+from loguru import logger
+from pydantic import UUID4
+
+from server.api.websocket.outbox import Outbox
+from server.config.settings import settings
+
+# Receives each message (as JSON text) published for a subscribed user
+MessageHandler = Callable[[UUID4, str], Awaitable[None]]
+
+# Longest line (i.e. message) exchanged over the Unix socket, in bytes
+MAX_LINE = 16 * 1024 * 1024
+
+
+class Broker(ABC):
+    """Routes messages published for a user to the workers subscribed to them."""
+
+    def __init__(self) -> None:
+        self.subscriptions: set[UUID4] = set()
+        self.outbox = Outbox()
+        self._handler: Optional[MessageHandler] = None
+
+    @property
+    def holds_outbox(self) -> bool:
+        """Whether this worker's outbox is the one in use."""
+        return True
+
+    async def start(self, handler: MessageHandler) -> None:
+        """Starts receiving the messages of subscribed users."""
+        self._handler = handler
+
+    async def stop(self) -> None:  # noqa: B027
+        """Stops receiving messages."""
+
+    async def subscribe(self, user_id: UUID4) -> None:
+        """Receives the messages published for a user from now on."""
+        self.subscriptions.add(user_id)
+
+    async def unsubscribe(self, user_id: UUID4) -> None:
+        """Stops receiving the messages published for a user."""
+        self.subscriptions.discard(user_id)
+
+    async def ack(self, user_id: UUID4, message_id: str) -> None:
+        """Drops a message the client acknowledged, so it isn't replayed."""
+        self.outbox.ack(user_id, message_id)
+
+    @abstractmethod
+    async def publish(
+        self,
+        user_id: UUID4,
+        data: str,
+        message_id: Optional[str] = None,
+    ) -> None:
+        """Sends a message to every worker subscribed to the user.
+
+        Messages with an ID are held in the outbox until acknowledged.
+        """
+
+    async def _replay(self, user_id: UUID4) -> None:
+        """Hands this worker the messages the user hasn't acknowledged yet."""
+        for _, data in self.outbox.replay(user_id):
+            await self._deliver(user_id, data)
+
+    async def _deliver(self, user_id: UUID4, data: str) -> None:
+        """Hands a message to this worker, if it has sessions of the user."""
+        if self._handler is None or user_id not in self.subscriptions:
+            return
+        try:
+            await self._handler(user_id, data)
+        except Exception as e:
+            logger.error(f"Failed to deliver WS message to user[{user_id}]: {e}")
+
+
+class InMemoryBroker(Broker):
+    """Delivers messages within the current process only (a single worker)."""
+
+    async def subscribe(self, user_id: UUID4) -> None:
+        """Receives the user's messages, replaying those not acknowledged yet."""
+        if user_id not in self.subscriptions:
+            await super().subscribe(user_id)
+            await self._replay(user_id)
+
+    async def publish(
+        self,
+        user_id: UUID4,
+        data: str,
+        message_id: Optional[str] = None,
+    ) -> None:
+        """Delivers a message to this process's sessions of the user."""
+        if message_id is not None:
+            self.outbox.add(user_id, message_id, data)
+        await self._deliver(user_id, data)
+
+
+class UnixSocketBroker(Broker):
+    """Fans messages out between the workers on a host, over a Unix socket.
+
+    Whichever worker holds a lock on `<path>.lock` hosts the hub: it listens
+    on `path` and forwards each published message to the workers subscribed to
+    its user. The other workers connect to it, and take over once it's gone
+    (the lock is released when its process exits).
+
+    Only the hub's outbox is used: it holds the messages published with an ID,
+    and replays them to each worker subscribing to their user. The outbox goes
+    with the hub, so messages waiting when its worker exits are lost.
+
+    Lines over the socket are `SUB <user>`, `UNSUB <user>`, `ACK <user> <ID>`
+    and `PUB <user> <ID or -> <JSON text>`; the hub forwards PUB lines as they
+    are.
+    """
+
+    def __init__(self, path: str, retry_delay: float = 0.2) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.retry_delay = retry_delay
+        self._lock_file: Optional[IO[bytes]] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Hub only: the connected workers, and those subscribed to each user
+        self._workers: set[asyncio.StreamWriter] = set()
+        self._routes: dict[UUID4, set[asyncio.StreamWriter]] = {}
+        # Client only: the connection to the hub
+        self._hub: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def is_hub(self) -> bool:
+        """Whether this worker hosts the hub."""
+        return self._server is not None
+
+    @property
+    def holds_outbox(self) -> bool:
+        """Whether this worker's outbox is the one in use, i.e. it hosts the hub."""
+        return self.is_hub
+
+    async def start(self, handler: MessageHandler) -> None:
+        """Starts hosting or connecting to the hub, in the background."""
+        await super().start(handler)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Disconnects from (or shuts down) the hub."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def subscribe(self, user_id: UUID4) -> None:
+        """Receives the messages published for a user, from any worker."""
+        if user_id not in self.subscriptions:
+            await super().subscribe(user_id)
+            if self.is_hub:
+                await self._replay(user_id)
+            else:
+                await self._send_to_hub(f"SUB {user_id}\n".encode())
+
+    async def unsubscribe(self, user_id: UUID4) -> None:
+        """Stops receiving the messages published for a user."""
+        if user_id in self.subscriptions:
+            await super().unsubscribe(user_id)
+            await self._send_to_hub(f"UNSUB {user_id}\n".encode())
+
+    async def ack(self, user_id: UUID4, message_id: str) -> None:
+        """Drops a message the client acknowledged from the hub's outbox."""
+        if self.is_hub:
+            await super().ack(user_id, message_id)
+        else:
+            await self._send_to_hub(f"ACK {user_id} {message_id}\n".encode())
+
+    async def publish(
+        self,
+        user_id: UUID4,
+        data: str,
+        message_id: Optional[str] = None,
+    ) -> None:
+        """Sends a message to the workers subscribed to the user, via the hub.
+
+        Messages published while no hub is reachable (i.e. while another worker
+        takes over from one that exited) are dropped.
+        """
+        line = _pub_line(user_id, message_id, data)
+        if self.is_hub:
+            await self._route(user_id, message_id, data, line)
+        elif not await self._send_to_hub(line):
+            logger.warning(f"No WS broker hub, dropped message for user[{user_id}]")
+
+    async def _run(self) -> None:
+        """Hosts the hub if no other worker does, otherwise connects to it."""
+        try:
+            while True:
+                if self._try_lock():
+                    await self._host_hub()
+                    return
+                with suppress(ConnectionError, FileNotFoundError):
+                    await self._connect_to_hub()
+                await asyncio.sleep(self.retry_delay)
+        finally:
+            await self._close()
+
+    def _try_lock(self) -> bool:
+        lock_file = self.path.with_name(f"{self.path.name}.lock").open("wb")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _host_hub(self) -> None:
+        # Holding the lock, so any socket file left is from a hub that exited
+        self.path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._serve_worker,
+            path=str(self.path),
+            limit=MAX_LINE,
+        )
+        logger.info(f"Hosting WS broker hub at {self.path} (pid {os.getpid()})")
+        await asyncio.Future()
+
+    async def _serve_worker(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Hub: reads the subscriptions and messages of a connected worker."""
+        subscribed: set[UUID4] = set()
+        self._workers.add(writer)
+        try:
+            while line := await reader.readline():
+                command, _, rest = line.rstrip(b"\n").decode().partition(" ")
+                if command == "PUB":
+                    await self._route(*_parse_pub(rest), line)
+                elif command == "SUB":
+                    subscribed.add(uuid.UUID(rest))
+                    self._routes.setdefault(uuid.UUID(rest), set()).add(writer)
+                    await self._replay_to(writer, uuid.UUID(rest))
+                elif command == "ACK":
+                    user, _, message_id = rest.partition(" ")
+                    self.outbox.ack(uuid.UUID(user), message_id)
+                elif command == "UNSUB":
+                    subscribed.discard(uuid.UUID(rest))
+                    self._remove_route(uuid.UUID(rest), writer)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Dropping WS broker connection: {e}")
+        finally:
+            for user_id in subscribed:
+                self._remove_route(user_id, writer)
+            self._workers.discard(writer)
+            writer.close()
+
+    def _remove_route(self, user_id: UUID4, writer: asyncio.StreamWriter) -> None:
+        writers = self._routes.get(user_id)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self._routes[user_id]
+
+    async def _replay_to(self, writer: asyncio.StreamWriter, user_id: UUID4) -> None:
+        """Hub: resends a worker the messages the user hasn't acknowledged yet."""
+        writer.writelines(
+            _pub_line(user_id, message_id, data)
+            for message_id, data in self.outbox.replay(user_id)
+        )
+        await writer.drain()
+
+    async def _route(
+        self,
+        user_id: UUID4,
+        message_id: Optional[str],
+        data: str,
+        line: bytes,
+    ) -> None:
+        """Hub: forwards a message to the subscribed workers, itself included."""
+        if message_id is not None:
+            self.outbox.add(user_id, message_id, data)
+        writers = list(self._routes.get(user_id, ()))
+        for writer in writers:
+            writer.write(line)
+        await asyncio.gather(
+            *(writer.drain() for writer in writers),
+            return_exceptions=True,
+        )
+        await self._deliver(user_id, data)
+
+    async def _connect_to_hub(self) -> None:
+        """Client: receives messages from the hub until it goes away."""
+        reader, writer = await asyncio.open_unix_connection(
+            str(self.path),
+            limit=MAX_LINE,
+        )
+        self._hub = writer
+        try:
+            # (Re)subscribe to every user with sessions on this worker
+            writer.writelines(
+                f"SUB {user_id}\n".encode() for user_id in self.subscriptions
+            )
+            await writer.drain()
+            while line := await reader.readline():
+                command, _, rest = line.rstrip(b"\n").decode().partition(" ")
+                if command == "PUB":
+                    user_id, _, data = _parse_pub(rest)
+                    await self._deliver(user_id, data)
+        finally:
+            self._hub = None
+            writer.close()
+
+    async def _send_to_hub(self, line: bytes) -> bool:
+        """Client: sends a line to the hub, if connected. Returns whether it was."""
+        if self._hub is None:
+            return self.is_hub
+        try:
+            self._hub.write(line)
+            await self._hub.drain()
+        except ConnectionError:
+            return False
+        return True
+
+    async def _close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in self._workers:
+                writer.close()
+            self._workers.clear()
+            self._routes.clear()
+            self._server = None
+        if self._hub is not None:
+            self._hub.close()
+            self._hub = None
+        if self._lock_file is not None:
+            self.path.unlink(missing_ok=True)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def _pub_line(user_id: UUID4, message_id: Optional[str], data: str) -> bytes:
+    return f"PUB {user_id} {message_id or '-'} {data}\n".encode()
+
+
+def _parse_pub(rest: str) -> tuple[UUID4, Optional[str], str]:
+    """The user, message ID and data of a PUB line (after the command)."""
+    user, message_id, data = rest.split(" ", 2)
+    return uuid.UUID(user), None if message_id == "-" else message_id, data
+
+
+def create_broker() -> Broker:
+    """The broker set in settings ("auto" uses Unix sockets for multiple workers)."""
+    kind = settings.websocket_broker
+    if kind == "unix" or (kind == "auto" and settings.workers_count > 1):
+        return UnixSocketBroker(settings.websocket_broker_path)
+    return InMemoryBroker()
@@ -1,20 +1,78 @@
+import asyncio
+import time
+import uuid
+from contextlib import suppress
+from typing import Optional
+
 from fastapi import WebSocket
 from loguru import logger
-from pydantic import UUID4
+from pydantic import UUID4, ValidationError
 
+from server.api.websocket.broker import Broker, create_broker
 from server.api.websocket.models import (
     UserConnections,
     WebSocketMessage,
     WebSocketState,
+    WebSocketStats,
+    WSMessageType,
 )
+from server.api.websocket.session import SendMetrics, WebSocketSession
+from server.config.settings import settings
+
+# Close codes: the client stopped answering heartbeats, sending to it failed,
+# or it fell too far behind
+CLOSE_IDLE = 1001
+CLOSE_SEND_FAILED = 1011
+CLOSE_TOO_SLOW = 1013
+
+# Heartbeat sent to every session, serialized once
+PING = WebSocketMessage(type=WSMessageType.PING, body=None).model_dump_json()
 
 
 class WebSocketManager:
-    """Abstracts logic for managing and utilizing WebSocket connections"""
+    """Abstracts logic for managing and utilizing WebSocket connections
+
+    Messages are published to a broker, which hands them to every worker with a
+    session of the user; each worker then queues them for its own sessions.
+    Sessions that fail to send, or (per settings) fall too far behind, are
+    disconnected. Every session is pinged periodically, and reaped once it
+    hasn't been heard from within the idle timeout. Messages are kept in the
+    broker's outbox until acknowledged, so users who were offline get them
+    once they reconnect.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        broker: Optional[Broker] = None,
+        heartbeat_interval: float = settings.websocket_heartbeat_interval,
+        idle_timeout: float = settings.websocket_idle_timeout,
+    ) -> None:
         """Initiliaze with no connections."""
         self.state = WebSocketState(connections={})
+        self.broker = broker or create_broker()
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.metrics = SendMetrics()
+        self.reaped = 0
+        self._heartbeat_task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        """Starts receiving messages for this worker's sessions, and heartbeats."""
+        await self.broker.start(self._send_to_sessions)
+        if self.heartbeat_interval > 0:
+            self._heartbeat_task = asyncio.create_task(self._run_heartbeats())
+
+    async def stop(self) -> None:
+        """Stops receiving messages from the broker, and sending to sessions."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._heartbeat_task
+            self._heartbeat_task = None
+        await self.broker.stop()
+        for connections in self.state.connections.values():
+            for session in connections.sessions.values():
+                await session.stop()
 
     async def connect(
         self,
@@ -27,26 +85,159 @@ class WebSocketManager:
             f"Accepting WS connection for user[{user_id}] session[{session_id}]",
         )
         await websocket.accept()
-        if user_id not in self.state.connections:
+        first_session = user_id not in self.state.connections
+        if first_session:
             self.state.connections[user_id] = UserConnections(sessions={})
-        self.state.connections[user_id].sessions[session_id] = websocket
+
+        async def on_failure(reason: str) -> None:
+            await self._close(user_id, session_id, CLOSE_SEND_FAILED, reason)
+
+        self.state.connections[user_id].sessions[session_id] = WebSocketSession(
+            websocket,
+            on_failure,
+            metrics=self.metrics,
+        )
+        # Once the session can receive the messages replayed on subscribing
+        if first_session:
+            await self.broker.subscribe(user_id)
+
+    def touch(self, user_id: UUID4, session_id: UUID4) -> None:
+        """Records that a session's client was just heard from (e.g. a pong)."""
+        connections = self.state.connections.get(user_id)
+        session = connections.sessions.get(session_id) if connections else None
+        if session is not None:
+            session.touch()
 
     async def disconnect(self, user_id: UUID4, session_id: UUID4) -> None:
         """Removes a WebSocket connection for a specific session."""
         logger.info(f"Disconnecting WS for user[{user_id}] session[{session_id}]")
         if user_id in self.state.connections:
-            self.state.connections[user_id].sessions.pop(session_id, None)
+            session = self.state.connections[user_id].sessions.pop(session_id, None)
+            if session is not None:
+                await session.stop()
 
             # Remove user_id if no more sessions remain
             if not self.state.connections[user_id].sessions:
                 self.state.connections.pop(user_id, None)
+                await self.broker.unsubscribe(user_id)
 
     async def send_message(self, user_id: UUID4, message: WebSocketMessage) -> None:
-        """Sends a message to all sessions for a specific user."""
+        """Sends a message to all sessions for a specific user, on any worker.
+
+        The message is replayed to the user when they next connect, until a
+        session acknowledges it (or it expires).
+        """
+        message = message.model_copy(update={"id": message.id or uuid.uuid4().hex})
         logger.info(f"Sending message to client via WS: {message}")
-        if user_id in self.state.connections:
-            for ws in self.state.connections[user_id].sessions.values():
-                await ws.send_json(message.model_dump(mode="json"))
+        await self.broker.publish(user_id, message.model_dump_json(), message.id)
+
+    async def receive(self, user_id: UUID4, data: str) -> None:
+        """Handles text received from a client, i.e. acknowledgements.
+
+        Anything other than a message (e.g. a pong) only shows the client is alive.
+        """
+        try:
+            message = WebSocketMessage.model_validate_json(data)
+        except ValidationError:
+            return
+        if message.type == WSMessageType.ACK:
+            await self.broker.ack(user_id, str(message.body))
+
+    async def heartbeat(self) -> None:
+        """Reaps idle sessions (and expired outbox messages), and pings the others.
+
+        A ping is only queued for sessions with nothing else queued, so it never
+        displaces a message; those being sent to are pinged once they catch up.
+        """
+        self.broker.outbox.prune()
+        now = time.monotonic()
+        for user_id, connections in list(self.state.connections.items()):
+            for session_id, session in list(connections.sessions.items()):
+                idle = now - session.last_seen
+                if self.idle_timeout > 0 and idle > self.idle_timeout:
+                    self.reaped += 1
+                    await self._close(
+                        user_id,
+                        session_id,
+                        CLOSE_IDLE,
+                        f"not heard from in {idle:.0f}s",
+                    )
+                elif not session.pending and not session.send(PING):
+                    await self._close(
+                        user_id,
+                        session_id,
+                        CLOSE_TOO_SLOW,
+                        "send queue full",
+                    )
+
+    def stats(self) -> WebSocketStats:
+        """Connections and send metrics of this worker (and outbox counters, if
+        it holds the outbox in use).
+        """
+        p50, p99, top = self.metrics.latency_percentiles_ms()
+        stats = WebSocketStats(
+            users=len(self.state.connections),
+            sessions=sum(
+                len(connections.sessions)
+                for connections in self.state.connections.values()
+            ),
+            messages_sent=self.metrics.sent,
+            messages_dropped=self.metrics.dropped,
+            send_failures=self.metrics.failed,
+            reaped=self.reaped,
+            send_latency_p50_ms=p50,
+            send_latency_p99_ms=p99,
+            send_latency_max_ms=top,
+        )
+        # Other workers' outboxes are unused (and empty), so say nothing
+        if self.broker.holds_outbox:
+            outbox = self.broker.outbox
+            stats.outbox_users = outbox.users
+            stats.outbox_messages = len(outbox)
+            stats.acked = outbox.acked
+            stats.replayed = outbox.replayed
+            stats.expired = outbox.expired
+        return stats
+
+    async def _run_heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"WS heartbeat failed: {e}")
+
+    async def _send_to_sessions(self, user_id: UUID4, data: str) -> None:
+        """Queues a message (JSON text) for this worker's sessions of a user."""
+        if user_id not in self.state.connections:
+            return
+        sessions = self.state.connections[user_id].sessions
+        for session_id, session in list(sessions.items()):
+            if not session.send(data):
+                await self._close(
+                    user_id,
+                    session_id,
+                    CLOSE_TOO_SLOW,
+                    "send queue full",
+                )
+
+    async def _close(
+        self,
+        user_id: UUID4,
+        session_id: UUID4,
+        code: int,
+        reason: str,
+    ) -> None:
+        """Disconnects a session the server can't send to (anymore)."""
+        connections = self.state.connections.get(user_id)
+        session = connections.sessions.get(session_id) if connections else None
+        if session is None:
+            return
+        logger.warning(f"Closing WS of user[{user_id}] session[{session_id}]: {reason}")
+        await self.disconnect(user_id, session_id)
+        # The client may well be gone already
+        with suppress(Exception):
+            await session.websocket.close(code=code)
 
 
 websocket_manager = WebSocketManager()
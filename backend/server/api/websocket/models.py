@@ -1,14 +1,15 @@
 from enum import Enum
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import WebSocket
 from pydantic import UUID4, BaseModel, ConfigDict
 
+from server.api.websocket.session import WebSocketSession
+
 
 class UserConnections(BaseModel):
     """Active WebSocket sessions for a specific user."""
 
-    sessions: dict[UUID4, WebSocket]
+    sessions: dict[UUID4, WebSocketSession]
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -23,9 +24,13 @@ class WSMessageType(str, Enum):
     """
     Enum for different types of WebSocket messages:
         RECOMMENDATION: for sending collection recommendations to client.
+        PING: heartbeat, which the client answers (with any text) to stay connected.
+        ACK: from the client, acknowledging the message whose ID is the body.
     """
 
     RECOMMENDATION = "recommendation"
+    PING = "ping"
+    ACK = "ack"
 
 
 class WebSocketMessage(BaseModel):
@@ -33,3 +38,30 @@ class WebSocketMessage(BaseModel):
 
     type: WSMessageType
     body: Any
+    # Set on messages sent to users, which the client acknowledges by this ID
+    id: Optional[str] = None
+
+
+class WebSocketStats(BaseModel):
+    """Connections and send metrics of a worker's WebSocket sessions."""
+
+    users: int = 0
+    sessions: int = 0
+    messages_sent: int = 0
+    # Messages dropped from full send queues
+    messages_dropped: int = 0
+    send_failures: int = 0
+    # Sessions closed for not answering heartbeats
+    reaped: int = 0
+    # Messages waiting for an acknowledgement, and those acknowledged, replayed,
+    # or dropped unacknowledged once expired. Only reported by the worker holding
+    # the outbox (the broker hub, with several workers); None on the others.
+    outbox_users: Optional[int] = None
+    outbox_messages: Optional[int] = None
+    acked: Optional[int] = None
+    replayed: Optional[int] = None
+    expired: Optional[int] = None
+    # Time from queueing a message to sending it, over the recent messages
+    send_latency_p50_ms: float = 0
+    send_latency_p99_ms: float = 0
+    send_latency_max_ms: float = 0
@@ -0,0 +1,88 @@
+"""
+@description Per-user outbox of the WebSocket messages not yet acknowledged by
+    the client, so that those published while a user is offline (or lost on
+    a dropped connection) are replayed when they reconnect, instead of being
+    recomputed. Each user's outbox is bounded, and messages expire after a TTL.
+@requirements FR-39
+"""
+
+import time
+from collections import OrderedDict
+
+from pydantic import UUID4
+
+from server.config.settings import settings
+
+
+class Outbox:
+    """Unacknowledged messages (as JSON text) of each user, by message ID."""
+
+    def __init__(
+        self,
+        max_messages: int = settings.websocket_outbox_size,
+        ttl: float = settings.websocket_outbox_ttl,
+    ) -> None:
+        self.max_messages = max_messages
+        self.ttl = ttl
+        # Oldest first, with the time each message expires (time.monotonic)
+        self._messages: dict[UUID4, OrderedDict[str, tuple[str, float]]] = {}
+        self.acked = 0
+        self.replayed = 0
+        # Messages dropped unacknowledged, once expired or evicted by newer ones
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._messages.values())
+
+    @property
+    def users(self) -> int:
+        """Users with messages waiting."""
+        return len(self._messages)
+
+    def add(self, user_id: UUID4, message_id: str, data: str) -> None:
+        """Holds a message until the user acknowledges it (or it expires)."""
+        if self.max_messages <= 0:
+            return
+        messages = self._messages.setdefault(user_id, OrderedDict())
+        messages[message_id] = (data, time.monotonic() + self.ttl)
+        while len(messages) > self.max_messages:
+            messages.popitem(last=False)
+            self.evicted += 1
+
+    def ack(self, user_id: UUID4, message_id: str) -> bool:
+        """Drops an acknowledged message. Returns whether it was waiting."""
+        messages = self._messages.get(user_id)
+        if messages is None or messages.pop(message_id, None) is None:
+            return False
+        self.acked += 1
+        if not messages:
+            del self._messages[user_id]
+        return True
+
+    def replay(self, user_id: UUID4) -> list[tuple[str, str]]:
+        """The user's unexpired messages (ID and data), oldest first, to resend."""
+        self._prune(user_id)
+        messages: OrderedDict[str, tuple[str, float]] = self._messages.get(
+            user_id,
+            OrderedDict(),
+        )
+        self.replayed += len(messages)
+        return [(message_id, data) for message_id, (data, _) in messages.items()]
+
+    def prune(self) -> None:
+        """Drops the expired messages of every user."""
+        for user_id in list(self._messages):
+            self._prune(user_id)
+
+    def _prune(self, user_id: UUID4) -> None:
+        messages = self._messages.get(user_id)
+        if messages is None:
+            return
+        now = time.monotonic()
+        # Messages expire in the order they were added
+        while messages and next(iter(messages.values()))[1] <= now:
+            messages.popitem(last=False)
+            self.expired += 1
+        if not messages:
+            del self._messages[user_id]
@@ -0,0 +1,121 @@
+"""
+@description A client's WebSocket session, with a bounded queue of outgoing
+    messages drained by its own writer task. Sending to a user only queues the
+    message for each session, so a slow or dead client never holds up the
+    others (or the background task sending). Sessions also track when the
+    client was last heard from, and record send metrics for the worker.
+@requirements FR-39
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Awaitable, Callable, Literal, Optional
+
+import numpy as np
+from fastapi import WebSocket
+from loguru import logger
+
+from server.config.settings import settings
+
+# What to do when a session's queue is full: drop its oldest queued message to
+# make room, or disconnect the client
+OverflowPolicy = Literal["drop", "disconnect"]
+
+# Called with the reason, once sending to the session has failed
+FailureHandler = Callable[[str], Awaitable[None]]
+
+
+class SendMetrics:
+    """Send counters shared by a worker's sessions, kept after they close."""
+
+    def __init__(self, latency_window: int = 1024) -> None:
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        # Seconds from queueing to sending, of the most recent messages
+        self.latencies: deque[float] = deque(maxlen=latency_window)
+
+    def latency_percentiles_ms(self) -> tuple[float, float, float]:
+        """p50, p99 and max of the recent send latencies, in ms."""
+        if not self.latencies:
+            return 0, 0, 0
+        p50, p99, top = np.percentile(self.latencies, [50, 99, 100]) * 1000
+        return float(p50), float(p99), float(top)
+
+
+class WebSocketSession:
+    """A client's WebSocket, sending queued messages from a writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_failure: FailureHandler,
+        queue_size: int = settings.websocket_queue_size,
+        overflow: OverflowPolicy = settings.websocket_overflow,
+        send_timeout: float = settings.websocket_send_timeout,
+        metrics: Optional[SendMetrics] = None,
+    ) -> None:
+        self.websocket = websocket
+        self.overflow = overflow
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.metrics = metrics or SendMetrics()
+        # When the client was last heard from (time.monotonic)
+        self.last_seen = time.monotonic()
+        self._on_failure = on_failure
+        self._queue: asyncio.Queue[tuple[str, float]] = asyncio.Queue(queue_size)
+        self._writer = asyncio.create_task(self._write())
+
+    @property
+    def pending(self) -> int:
+        """Messages queued, not yet being sent."""
+        return self._queue.qsize()
+
+    def touch(self) -> None:
+        """Records that the client was just heard from."""
+        self.last_seen = time.monotonic()
+
+    def send(self, data: str) -> bool:
+        """Queues a message (JSON text) without waiting for it to be sent.
+
+        Returns False if the queue was full and the client should be
+        disconnected, as per the overflow policy.
+        """
+        if self._queue.full():
+            if self.overflow == "disconnect":
+                return False
+            self._queue.get_nowait()
+            self.dropped += 1
+            self.metrics.dropped += 1
+            logger.warning(f"WS send queue full, dropped a message ({self.dropped})")
+        self._queue.put_nowait((data, time.monotonic()))
+        return True
+
+    async def stop(self) -> None:
+        """Stops sending, dropping any queued messages."""
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._writer
+
+    async def _write(self) -> None:
+        while True:
+            data, queued_at = await self._queue.get()
+            # Not wait_for, which can swallow a cancel that races the send (3.11)
+            send = asyncio.ensure_future(self.websocket.send_text(data))
+            try:
+                done, _ = await asyncio.wait({send}, timeout=self.send_timeout)
+            finally:
+                send.cancel()
+            if not done:
+                self.metrics.failed += 1
+                await self._on_failure(f"send timed out after {self.send_timeout}s")
+                return
+            if send.exception() is not None:
+                self.metrics.failed += 1
+                await self._on_failure(f"send failed: {send.exception()!r}")
+                return
+            self.metrics.sent += 1
+            self.metrics.latencies.append(time.monotonic() - queued_at)
@@ -33,9 +33,11 @@ async def websocket_endpoint(
     session_id = uuid.uuid4()
     await websocket_manager.connect(user_id, session_id, websocket)
     try:
-        # Keep connection alive
+        # Keep connection alive; any text (e.g. a pong) shows the client is there
         while True:
-            await websocket.receive_text()
+            data = await websocket.receive_text()
+            websocket_manager.touch(user_id, session_id)
+            await websocket_manager.receive(user_id, data)
     except WebSocketDisconnect:
         await websocket_manager.disconnect(user_id, session_id)
     except Exception as e:
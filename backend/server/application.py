@@ -1,9 +1,44 @@
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from server.api.router import api_router
+from server.api.websocket.manager import websocket_manager
+from server.background_tasks.process_image import image_worker
+from server.background_tasks.recommend import recommendation_scheduler
 from server.config.log import configure_logging
 from server.config.openapi import add_openapi_models
+from server.config.settings import settings
+from server.services import db
+from server.services.process_image.background import REMBG_SESSION
+from server.services.process_image.image_class import CLASSIFIERS
+from server.services.process_image.model_registry import model_registry
+
+
+def warmup_models() -> threading.Thread:
+    """Loads the models in use in the background, i.e. only the classifier of
+    the configured backend rather than every registered one.
+    """
+    return model_registry.warmup(
+        [CLASSIFIERS[settings.classification_backend], REMBG_SESSION],
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Starts long-running background workers alongside the app."""
+    image_worker.start()
+    await websocket_manager.start()
+    if settings.warmup_models:
+        warmup_models()
+    yield
+    await recommendation_scheduler.stop()
+    await websocket_manager.stop()
+    await image_worker.stop()
+    await db.close()
 
 
 def get_app() -> FastAPI:
@@ -11,6 +46,7 @@ def get_app() -> FastAPI:
     configure_logging()
     app = FastAPI(
         title="Memento Backend",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -0,0 +1,227 @@
+"""
+@description Offline job refitting the clustering model of every user, so that
+    recommendations only have to place new mementos into an up to date model.
+    Users are streamed from the DB in pages and their mementos fetched here,
+    while a process pool fits and persists the models. The estimated memory of
+    the fits in flight is kept under a ceiling.
+
+    Usage: poetry run batch-cluster [--workers 8] [--page-size 500]
+        [--max-memory-mb 2048]
+@requirements FR-38
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import AsyncIterator, Optional
+
+import numpy as np
+from loguru import logger
+from pydantic import UUID4, BaseModel
+
+from server.background_tasks.recommend import MIN_CLUSTER_SIZE
+from server.config.log import configure_logging
+from server.config.settings import settings
+from server.services.cluster_memento.hdbscan import MementoPoints
+from server.services.cluster_memento.incremental import (
+    ClusteringModel,
+    ClusteringModelStore,
+)
+from server.services.db.queries.clustering import get_mementos_for_clustering
+from server.services.db.queries.user import get_user_ids
+
+# Estimated peak memory of fitting a model, per memento (measured at ~500 bytes
+# for HDBSCAN with prediction data, doubled for headroom)
+BYTES_PER_POINT = 1024
+
+# Workers only write models, so they don't keep them in memory
+model_store = ClusteringModelStore(max_cached=0)
+
+
+class BatchReport(BaseModel):
+    """Outcome of clustering every user."""
+
+    clustered: int = 0
+    # Users with fewer mementos than a cluster
+    skipped: int = 0
+    failed: int = 0
+    # Users whose mementos were edited while their model was fit, so it's dropped
+    invalidated: int = 0
+    mementos: int = 0
+    seconds: float = 0
+    # Users clustered per second, over the whole run
+    throughput: float = 0
+    # Percentiles of the time taken to fit each user's model, in ms
+    p50_ms: float = 0
+    p90_ms: float = 0
+    p99_ms: float = 0
+    max_ms: float = 0
+
+
+def fit_user_model(
+    user_id: UUID4,
+    points: MementoPoints,
+    generation: int,
+) -> Optional[float]:
+    """Fits and persists a user's model (in a worker). Returns the seconds taken.
+
+    Given the user's generation from before their mementos were fetched, returns
+    None without saving the model if it was invalidated since (e.g. by the API).
+    """
+    start = time.perf_counter()
+    model = ClusteringModel(points, MIN_CLUSTER_SIZE)
+    if not model_store.save(user_id, model, generation):
+        return None
+    return time.perf_counter() - start
+
+
+def record_fit(
+    report: BatchReport,
+    durations: list[float],
+    user_id: UUID4,
+    future: asyncio.Future[Optional[float]],
+) -> None:
+    """Counts the outcome of a user's (finished) fit in the report."""
+    try:
+        duration = future.result()
+    except Exception as e:
+        logger.error(f"Failed to cluster mementos of user {user_id}: {e}")
+        report.failed += 1
+        return
+    if duration is None:
+        logger.info(f"Mementos of user {user_id} edited while clustering")
+        report.invalidated += 1
+        return
+    durations.append(duration)
+    report.clustered += 1
+
+
+async def iter_user_ids(page_size: int) -> AsyncIterator[UUID4]:
+    """Yields the ID of every user, fetching a page of them at a time."""
+    after_id = None
+    while True:
+        user_ids = await get_user_ids(after_id=after_id, limit=page_size)
+        for user_id in user_ids:
+            yield user_id
+        if len(user_ids) < page_size:
+            return
+        after_id = user_ids[-1]
+
+
+async def cluster_all_users(
+    executor: Executor,
+    page_size: int = settings.batch_cluster_page_size,
+    max_memory_mb: float = settings.batch_cluster_max_memory_mb,
+    max_pending: int = 16,
+) -> BatchReport:
+    """Fits every user's model on the executor, and reports on the run.
+
+    A user is only submitted once the estimated memory of the fits in flight
+    leaves room for it (a user over the whole ceiling is fit on their own), and
+    at most max_pending fits are queued, so mementos aren't fetched too far ahead.
+    """
+    loop = asyncio.get_running_loop()
+    max_bytes = max_memory_mb * 1024 * 1024
+    report = BatchReport()
+    durations: list[float] = []
+    pending: dict[asyncio.Future[Optional[float]], tuple[UUID4, int]] = {}
+    pending_bytes = 0
+
+    async def wait_for_one() -> None:
+        nonlocal pending_bytes
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            user_id, size = pending.pop(future)
+            pending_bytes -= size
+            record_fit(report, durations, user_id, future)
+
+    start = time.perf_counter()
+    async for user_id in iter_user_ids(page_size):
+        generation = model_store.generation(user_id)
+        points = await get_mementos_for_clustering(user_id)
+        if len(points.ids) < MIN_CLUSTER_SIZE:
+            report.skipped += 1
+            continue
+
+        size = len(points.ids) * BYTES_PER_POINT
+        while pending and (
+            pending_bytes + size > max_bytes or len(pending) >= max_pending
+        ):
+            await wait_for_one()
+        future = loop.run_in_executor(
+            executor,
+            fit_user_model,
+            user_id,
+            points,
+            generation,
+        )
+        pending[future] = (user_id, size)
+        pending_bytes += size
+        report.mementos += len(points.ids)
+
+    while pending:
+        await wait_for_one()
+
+    report.seconds = time.perf_counter() - start
+    if report.seconds > 0:
+        report.throughput = report.clustered / report.seconds
+    if durations:
+        p50, p90, p99, top = np.percentile(durations, [50, 90, 99, 100]) * 1000
+        report.p50_ms, report.p90_ms, report.p99_ms, report.max_ms = (
+            float(p50),
+            float(p90),
+            float(p99),
+            float(top),
+        )
+    return report
+
+
+def main() -> None:
+    """Clusters every user across a process pool and logs the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=settings.batch_cluster_workers)
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=settings.batch_cluster_page_size,
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=settings.batch_cluster_max_memory_mb,
+    )
+    args = parser.parse_args()
+    configure_logging()
+
+    workers = args.workers or os.cpu_count() or 1
+    # Spawned workers don't inherit the parent's DB connections and threads
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=get_context("spawn"),
+        initializer=configure_logging,
+    ) as executor:
+        report = asyncio.run(
+            cluster_all_users(
+                executor,
+                page_size=args.page_size,
+                max_memory_mb=args.max_memory_mb,
+                max_pending=workers * 2,
+            ),
+        )
+    logger.info(
+        f"Clustered {report.clustered} users ({report.mementos} mementos) in "
+        f"{report.seconds:.1f} s with {workers} workers: "
+        f"{report.throughput:.1f} users/s; skipped {report.skipped}, "
+        f"failed {report.failed}, invalidated {report.invalidated}",
+    )
+    logger.info(
+        f"Per user: p50 {report.p50_ms:.0f} ms, p90 {report.p90_ms:.0f} ms, "
+        f"p99 {report.p99_ms:.0f} ms, max {report.max_ms:.0f} ms",
+    )
+
+
+if __name__ == "__main__":
+    main()
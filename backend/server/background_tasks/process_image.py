@@ -1,34 +1,198 @@
+"""
+@description Background worker for image processing (OCR + classification).
+    The API process only enqueues jobs; the work itself runs in a pool of
+    separate processes, with classification batched across images and users.
+@requirements FR-8, FR-11
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import suppress
+from typing import Optional
+
 import pytesseract
 from loguru import logger
 from PIL import Image
 
-from server.services.db.queries.image import update_image
-from server.services.process_image.image_class import predict_class
+from server.config.settings import settings
+from server.services.db.queries.image import update_images_bulk
+from server.services.process_image.image_class import get_classifier, predict_classes
 
+# An image to process, along with its filename in storage
+ImageJob = tuple[Image.Image, str]
 
-def process_images_in_background(
-    images: list[tuple[Image.Image, str]],
-) -> None:
-    """Handles image processing in the background.
 
-    Performs both image classifcation and OCR text extraction.
+def extract_text(image: Image.Image) -> str:
+    """Extracts text from an image using OCR. Ran inside a worker process."""
+    return pytesseract.image_to_string(image)
+
+
+def load_classifier() -> None:
+    """Loads the configured classifier into a worker process as it starts."""
+    get_classifier()
+
+
+class ImageProcessingWorker:
+    """Processes queued images in a dedicated pool of worker processes.
 
-    Ran when new images uploaded during create/edit memento.
+    Jobs are pulled off a bounded queue in batches. Each batch runs OCR as one
+    task per image (in parallel) and classification as a single task, then
+    writes the results back to the DB.
     """
-    for image, filename in images:  # Accessing each tuple's Image and filename
-        try:
-            # Extract text from the image
-            extracted_text = pytesseract.image_to_string(image)
 
-            # Classify label
-            predicted_class = predict_class(image)
+    def __init__(
+        self,
+        processes: int = settings.image_worker_processes,
+        queue_size: int = settings.image_worker_queue_size,
+        batch_size: int = settings.image_worker_batch_size,
+        batch_wait: float = settings.image_worker_batch_wait,
+    ) -> None:
+        self.processes = processes
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue: Optional[asyncio.Queue[ImageJob]] = None
+        self._executor: Optional[Executor] = None
+        self._dispatcher: Optional[asyncio.Task[None]] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the dispatcher task is currently running."""
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    def start(self, executor: Optional[Executor] = None) -> None:
+        """Starts the dispatcher on the running event loop.
+
+        Worker processes are spawned lazily by the pool on first use, unless
+        models are warmed up: then they're all spawned now, each loading the
+        classifier before it takes any batch.
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = executor or self._create_pool()
+        self._dispatcher = asyncio.create_task(self._run())
+        logger.info(f"Started image processing worker ({self.processes} processes)")
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            # TensorFlow is not fork-safe, so always start fresh interpreters
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=load_classifier if settings.warmup_models else None,
+        )
+        if settings.warmup_models:
+            # Each submission spawns a process while none is idle
+            for _ in range(self.processes):
+                pool.submit(load_classifier)
+        return pool
+
+    async def stop(self) -> None:
+        """Stops the dispatcher and shuts down the worker pool."""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._dispatcher
+        if self._queue and not self._queue.empty():
+            logger.warning(f"Dropping {self._queue.qsize()} unprocessed image jobs")
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._queue = None
+        self._executor = None
+        self._dispatcher = None
+
+    async def enqueue(self, images: list[ImageJob]) -> None:
+        """Adds images to the queue, waiting for space if the queue is full."""
+        self.start()
+        if self._queue is None:
+            raise RuntimeError("Image processing worker failed to start")
+        for job in images:
+            await self._queue.put(job)
+        logger.info(f"Queued {len(images)} images ({self._queue.qsize()} pending)")
+
+    async def join(self) -> None:
+        """Waits until every queued image has been processed."""
+        if self._queue:
+            await self._queue.join()
 
-            update_image(
-                filename,
-                {"detected_text": extracted_text, "image_label": predicted_class},
-            )
-            logger.info(f"Adding detected text: {extracted_text}")
-            logger.info(f"Adding predicted class: {predicted_class}")
+    async def _run(self) -> None:
+        """Dispatcher loop that feeds batches of jobs to the worker pool."""
+        if self._queue is None:
+            return
+        while True:
+            batch = await self._next_batch(self._queue)
+            try:
+                await self.process_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to process batch of {len(batch)} images: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
 
+    async def _next_batch(self, queue: asyncio.Queue[ImageJob]) -> list[ImageJob]:
+        """Waits for a job, then collects more until the batch is full or times out."""
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def process_batch(self, batch: list[ImageJob]) -> None:
+        """Runs OCR and classification for a batch, then stores the results."""
+        loop = asyncio.get_running_loop()
+        images = [image for image, _ in batch]
+
+        ocr_tasks = [
+            loop.run_in_executor(self._executor, extract_text, image)
+            for image in images
+        ]
+        classify_task = loop.run_in_executor(self._executor, predict_classes, images)
+
+        texts = await asyncio.gather(*ocr_tasks, return_exceptions=True)
+        try:
+            labels: list[Optional[str]] = list(await classify_task)
         except Exception as e:
-            logger.error(f"Failed to process image {filename}: {e}")
+            logger.error(f"Failed to classify batch of {len(images)} images: {e}")
+            labels = [None] * len(images)
+
+        batch_updates: dict[str, dict[str, str | int]] = {}
+        for (_, filename), text, label in zip(batch, texts, labels):
+            updates: dict[str, str | int] = {}
+            if isinstance(text, BaseException):
+                logger.error(f"Failed to extract text from image {filename}: {text}")
+            else:
+                updates["detected_text"] = text
+                logger.info(f"Adding detected text: {text}")
+            if label:
+                updates["image_label"] = label
+                logger.info(f"Adding predicted class: {label}")
+            if updates:
+                batch_updates[filename] = updates
+
+        # One DB request for the whole batch
+        if batch_updates:
+            await update_images_bulk(batch_updates)
+
+
+image_worker = ImageProcessingWorker()
+
+
+async def process_images_in_background(
+    images: list[ImageJob],
+) -> None:
+    """Handles image processing in the background.
+
+    Performs both image classifcation and OCR text extraction.
+
+    Ran when new images uploaded during create/edit memento. Only queues the
+    images; the processing itself happens in the image worker's process pool.
+    """
+    await image_worker.enqueue(images)
@@ -1,38 +1,81 @@
 """
 @description Background task for recommending collection based on results of
-    HDBSCAN clustering algorithm, sends recommendation via websocket.
+    HDBSCAN clustering algorithm, sends recommendation via websocket. Requests
+    are debounced and coalesced per user by the recommendation scheduler.
 @requirements FR-38, FR-39, FR-40
 """
 
+import asyncio
+import time
 from random import choice
+from typing import Awaitable, Callable
 
 from loguru import logger
-from pydantic import UUID4
+from pydantic import UUID4, BaseModel
 
 from server.api.websocket.manager import websocket_manager
 from server.api.websocket.models import WebSocketMessage, WSMessageType
-from server.services.cluster_memento.hdbscan import cluster_mementos
+from server.config.settings import settings
+from server.services.cluster_memento.incremental import (
+    ClusteringModel,
+    clustering_models,
+)
 from server.services.db.models.schema_public_latest import RejectedRecommendationsInsert
 from server.services.db.queries.clustering import (
     create_rejected_collection,
+    filter_rejected_collections,
     get_mementos_for_clustering,
-    is_collection_rejected,
 )
 
+MIN_CLUSTER_SIZE = 3
+
+
+async def cluster_user_mementos(user_id: UUID4) -> dict[int, list[int]]:
+    """Clusters a user's mementos, reusing their persisted model where possible.
+
+    Only mementos created since the model was last updated are fetched and
+    placed into its clusters; all of them are refetched and refit once the
+    model needs it (or when there's no model yet).
+    """
+    # Mementos edited while clustering invalidate the model fit from them
+    generation = clustering_models.generation(user_id)
+    model = clustering_models.load(user_id)
+    if model is not None:
+        new_points = await get_mementos_for_clustering(
+            user_id,
+            after_id=model.last_memento_id,
+        )
+        if not model.add(new_points):
+            return model.clusters()
+        if model.needs_refit():
+            logger.info(f"Refitting clustering model of user {user_id}")
+            model = None
+
+    if model is None:
+        points = await get_mementos_for_clustering(user_id)
+        if len(points.ids) < MIN_CLUSTER_SIZE:
+            logger.info("Less mementos than minimum cluster size!")
+            return {}
+        # Fitting is CPU bound; keep it off the event loop
+        model = await asyncio.to_thread(ClusteringModel, points, MIN_CLUSTER_SIZE)
+
+    saved = await asyncio.to_thread(clustering_models.save, user_id, model, generation)
+    if not saved:
+        logger.info(f"Mementos of user {user_id} changed while clustering, not saved")
+    return model.clusters()
+
 
 async def recommend_collection(user_id: UUID4) -> None:
     """Background task for recommeding a new collection via clustering."""
-    mementos = get_mementos_for_clustering(user_id)
-    clustered_memento_ids = cluster_mementos(mementos, min_cluster_size=3)
+    clustered_memento_ids = await cluster_user_mementos(user_id)
 
     logger.info(f"Clustered memento ids: {clustered_memento_ids}")
 
-    # Check DB for previously rejected collections
-    valid_recommendations = [
-        memento_ids
-        for memento_ids in clustered_memento_ids.values()
-        if not is_collection_rejected(user_id, memento_ids)
-    ]
+    # Check DB for previously rejected collections (all clusters at once)
+    valid_recommendations = await filter_rejected_collections(
+        user_id,
+        list(clustered_memento_ids.values()),
+    )
     logger.info(f"Valid recommendation: {valid_recommendations}")
 
     # No valid recommendations
@@ -50,7 +93,7 @@ async def recommend_collection(user_id: UUID4) -> None:
     )
 
     # Store recommendation to prevent repeated suggestions
-    rejected_collection = create_rejected_collection(
+    rejected_collection = await create_rejected_collection(
         user_id,
         RejectedRecommendationsInsert(
             user_id=user_id,
@@ -58,3 +101,101 @@ async def recommend_collection(user_id: UUID4) -> None:
         ),
     )
     logger.info(f"Added already used recommendation: {rejected_collection}")
+
+
+class SchedulerStats(BaseModel):
+    """Counters of the recommendation scheduler, since startup."""
+
+    # Users waiting for their debounce window to close
+    queued: int = 0
+    # Jobs running right now (at most one per user)
+    running: int = 0
+    requested: int = 0
+    # Requests merged into a job that was already queued
+    coalesced: int = 0
+    completed: int = 0
+    failed: int = 0
+
+
+class RecommendationScheduler:
+    """Coalesces recommendation requests per user, running at most one job each.
+
+    A request starts a debounce window for the user; further requests in the
+    window are merged into the same job, and push it back (up to max_delay from
+    the first request). Requests that arrive while the user's job is running
+    queue a single follow-up job, so the latest mementos are always considered.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[UUID4], Awaitable[None]],
+        debounce: float = settings.recommend_debounce,
+        max_delay: float = settings.recommend_max_delay,
+    ) -> None:
+        self.job = job
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # First and latest request times of the users waiting for a job
+        self._queued: dict[UUID4, tuple[float, float]] = {}
+        self._tasks: dict[UUID4, asyncio.Task[None]] = {}
+        self._stats = SchedulerStats()
+
+    def schedule(self, user_id: UUID4) -> None:
+        """Requests a recommendation job for a user (on the running event loop)."""
+        now = time.monotonic()
+        self._stats.requested += 1
+        if user_id in self._queued:
+            first, _ = self._queued[user_id]
+            self._queued[user_id] = (first, now)
+            self._stats.coalesced += 1
+            return
+
+        self._queued[user_id] = (now, now)
+        if user_id not in self._tasks:
+            self._tasks[user_id] = asyncio.create_task(self._run(user_id))
+
+    async def _run(self, user_id: UUID4) -> None:
+        """Runs the user's jobs one after another, while there are requests."""
+        try:
+            while user_id in self._queued:
+                first, latest = self._queued[user_id]
+                deadline = min(latest + self.debounce, first + self.max_delay)
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+
+                del self._queued[user_id]
+                self._stats.running += 1
+                try:
+                    await self.job(user_id)
+                    self._stats.completed += 1
+                except Exception:
+                    self._stats.failed += 1
+                    logger.exception(f"Recommendation job failed for user {user_id}")
+                finally:
+                    self._stats.running -= 1
+        finally:
+            self._tasks.pop(user_id, None)
+
+    async def join(self) -> None:
+        """Waits until every queued and running job is done."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Cancels queued and running jobs, i.e. on shutdown."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._queued:
+            logger.warning(f"Dropping {len(self._queued)} queued recommendation jobs")
+        self._queued.clear()
+
+    def stats(self) -> SchedulerStats:
+        """Current statistics of the scheduler."""
+        return self._stats.model_copy(update={"queued": len(self._queued)})
+
+
+recommendation_scheduler = RecommendationScheduler(recommend_collection)
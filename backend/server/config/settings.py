@@ -2,7 +2,9 @@ import enum
 import os
 from pathlib import Path
 from tempfile import gettempdir
+from typing import Literal, Optional
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 TEMP_DIR = Path(gettempdir())
@@ -44,11 +46,120 @@ class Settings(BaseSettings):
     supabase_url: str = os.getenv("SUPABASE_URL", "")
     supabase_key: str = os.getenv("SUPABASE_KEY", "")
     db_url: str = os.getenv("DB_URL", "")
+    # Connection pool of the async Supabase client (DB and Storage requests)
+    supabase_max_connections: int = 20
+    supabase_max_keepalive_connections: int = 10
+    # Seconds an idle keep-alive connection is kept open
+    supabase_keepalive_expiry: float = 30
+    supabase_http2: bool = True
+    # Request timeout in seconds
+    supabase_timeout: float = 30
+    # Max concurrent uploads to Supabase Storage per request
+    storage_upload_concurrency: int = 4
+    # Mementos per page of the paginated memento listing, by default and at most
+    memento_page_size: int = 50
+    memento_max_page_size: int = 200
+    # Memory budget of the signed image URL cache (0 disables caching)
+    signed_url_cache_max_mb: float = 16
+    # Cached signed URLs are only reused while they're valid for this many more
+    # seconds, so clients never get a URL about to expire
+    signed_url_min_remaining: int = 6 * 3600
+    # Memory budget of the rendered collage cache (0 disables caching)
+    collage_cache_max_mb: float = 64
+
+    # Image processing worker (OCR + classification)
+    image_worker_processes: int = 2
+    image_worker_queue_size: int = 256
+    image_worker_batch_size: int = 16
+    # Seconds to wait for more jobs before running a partially filled batch
+    image_worker_batch_wait: float = 0.5
+    # Max images per forward pass of the classification model
+    classification_batch_size: int = 32
+    # Load ML models after startup (in the API and each image worker process),
+    # instead of on first use
+    warmup_models: bool = False
+    # Classification backend; "onnx" needs the graph from `poetry run export-onnx`
+    classification_backend: Literal["keras", "onnx"] = "keras"
+    onnx_model_path: Path = ROOT_DIR / "assets" / "models" / "resnet50.onnx"
+    onnx_class_index_path: Path = (
+        ROOT_DIR / "assets" / "models" / "imagenet_class_index.json"
+    )
+    # ONNX Runtime thread pool sizes (0 lets ONNX Runtime decide)
+    onnx_intra_op_threads: int = 0
+    onnx_inter_op_threads: int = 0
+
+    # Background removal (rembg)
+    rembg_model: str = "u2net"
+    # Max images segmented at once
+    rembg_workers: int = 2
+    # ONNX Runtime threads per inference (0 lets ONNX Runtime decide)
+    rembg_threads: int = 0
+    # Images larger than this (longest side, in px) are segmented on a downscaled
+    # copy, with the mask upsampled to full size. 0 always uses the full image.
+    rembg_max_side: int = 1024
+    # Filter used to upsample the mask; higher quality filters are slower
+    rembg_mask_resample: Literal["bilinear", "bicubic", "lanczos"] = "bilinear"
+
+    # Collection recommendations (incremental clustering)
+    # Directory of each user's persisted clustering model
+    clustering_model_dir: Path = ROOT_DIR / ".cache" / "clustering"
+    # Max models kept in memory per process
+    clustering_max_cached_models: int = 256
+    # Distance between coordinates: "euclidean" (standardized lat/long) or
+    # "haversine" (great-circle distance)
+    clustering_metric: Literal["euclidean", "haversine"] = "euclidean"
+    # Haversine only: merge clusters closer than this many km (None to disable)
+    clustering_selection_km: Optional[float] = None
+    # Refit after this many new mementos were placed into a user's model
+    clustering_refit_points: int = 20
+    # ...or sooner, once this share of the new mementos fall outside every cluster
+    clustering_drift_noise_ratio: float = 0.5
+    # Seconds to wait for more requests from a user before recommending, and the
+    # longest a request can be pushed back by newer ones
+    recommend_debounce: float = 5
+    recommend_max_delay: float = 30
+
+    # Fan-out of WebSocket messages between workers: "memory" only reaches the
+    # sessions of the worker sending, "unix" reaches every worker on the host
+    # through a Unix socket, and "auto" picks "unix" for more than one worker
+    websocket_broker: Literal["auto", "memory", "unix"] = "auto"
+    websocket_broker_path: str = str(TEMP_DIR / "memento-ws.sock")
+    # Messages queued per WebSocket session; once a slow client's queue is full,
+    # its oldest message is dropped ("drop") or it's disconnected ("disconnect")
+    websocket_queue_size: int = 32
+    websocket_overflow: Literal["drop", "disconnect"] = "drop"
+    # Seconds a single send may take before the client is considered dead
+    websocket_send_timeout: float = 10
+    # Seconds between heartbeat pings to each client (0 disables heartbeats)
+    websocket_heartbeat_interval: float = 30
+    # Sessions not heard from (i.e. no pong) for this many seconds are closed
+    websocket_idle_timeout: float = 90
+    # Unacknowledged messages kept per user, and the seconds they're kept for, to
+    # replay to users who were offline (0 messages disables replaying)
+    websocket_outbox_size: int = 16
+    websocket_outbox_ttl: float = 24 * 3600
+
+    # Offline batch clustering of every user (`poetry run batch-cluster`)
+    # Processes fitting models in parallel (0 for one per CPU)
+    batch_cluster_workers: int = 0
+    # Users fetched from the DB per page
+    batch_cluster_page_size: int = 500
+    # Ceiling on the estimated memory of the models being fit at once, in MB
+    batch_cluster_max_memory_mb: int = 2048
 
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
     )
 
+    @model_validator(mode="after")
+    def check_clustering_selection(self) -> "Settings":
+        """Fails at startup, rather than in the first recommendation job."""
+        if self.clustering_selection_km and self.clustering_metric != "haversine":
+            raise ValueError(
+                "CLUSTERING_SELECTION_KM needs CLUSTERING_METRIC=haversine",
+            )
+        return self
+
 
 settings = Settings()
@@ -1,39 +1,49 @@
 """
-@description Clusters mementos based on geographical location
+@description Clusters mementos based on geographical location. Coordinates are
+    either standardized and compared by Euclidean distance, or compared by
+    great-circle (haversine) distance, using a BallTree.
 @requirements FR-38
 """
 
 from collections import defaultdict
-from typing import List, Optional, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    cast,
+)
 
 import numpy as np
 from hdbscan import HDBSCAN
 from loguru import logger
 from numpy.typing import NDArray
-from sklearn.preprocessing import StandardScaler
+from sklearn.base import TransformerMixin
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
 
-from server.api.memento.models import MementoWithCoordinates
 from server.services.db.models.gis import Coordinates
 
+if TYPE_CHECKING:
+    # The API package imports the background tasks, which import this module
+    from server.api.memento.models import MementoWithCoordinates
 
-def cluster_mementos(
-    mementos: List[MementoWithCoordinates],
-    min_cluster_size: int = 5,
-    min_samples: Optional[int] = None,
-    allow_single_cluster: bool = True,
-    prediction_data: bool = True,
-) -> dict[int, List[int]]:
-    """Cluster Mementos based on geographical coordinates and return recommended IDs."""
+# "euclidean" on standardized lat/long, or "haversine" on lat/long in radians
+ClusteringMetric = Literal["euclidean", "haversine"]
 
-    # Extract coordinates and IDs
-    ids = [memento.id for memento in mementos]
-    if len(mementos) < min_cluster_size:
-        logger.warning("Less mementos than minimum cluster size!")
-        return {}
+# Mean radius of the Earth; haversine distances are in radians of it
+EARTH_RADIUS_KM = 6371.0088
 
+
+def memento_coordinates(
+    mementos: List["MementoWithCoordinates"],
+) -> NDArray[np.float64]:
+    """Lat/long of each memento, as an (n, 2) array."""
     # The mementos in passed into this function should always have
     # not None coordinates. Mypy requires either define another model or cast field.
-    coordinates: NDArray[np.float64] = np.array(
+    return np.array(
         [
             [
                 cast(Coordinates, memento.coordinates).lat,
@@ -42,26 +52,111 @@ def cluster_mementos(
             for memento in mementos
         ],
         dtype=np.float64,
-    )
-    scaler = StandardScaler()
-    scaled_coordinates = scaler.fit_transform(coordinates)
+    ).reshape(-1, 2)
+
+
+class MementoPoints(NamedTuple):
+    """Memento IDs and their lat/long, as columns rather than a model per memento."""
+
+    ids: NDArray[np.int64]
+    # (n, 2) array of lat/long
+    coordinates: NDArray[np.float64]
+
+    @classmethod
+    def from_mementos(cls, mementos: List["MementoWithCoordinates"]) -> "MementoPoints":
+        """Columns of mementos that were already loaded as models."""
+        ids = np.array([memento.id for memento in mementos], dtype=np.int64)
+        return cls(ids, memento_coordinates(mementos))
+
+
+def group_clusters(ids: List[int], labels: Iterable[int]) -> dict[int, List[int]]:
+    """Groups memento IDs by cluster label, leaving out noise (-1)."""
+    clusters = defaultdict(list)
+    for memento_id, label in zip(ids, labels):
+        if label == -1:
+            continue
+        clusters[int(label)].append(memento_id)
+    return dict(clusters)
+
+
+def fit_clusterer(
+    coordinates: NDArray[np.float64],
+    min_cluster_size: int = 5,
+    min_samples: Optional[int] = None,
+    allow_single_cluster: bool = True,
+    prediction_data: bool = True,
+    metric: ClusteringMetric = "euclidean",
+    cluster_selection_km: Optional[float] = None,
+) -> tuple[TransformerMixin, HDBSCAN, NDArray[np.int_]]:
+    """Fits HDBSCAN on transformed lat/long coordinates.
+
+    With the "euclidean" metric, coordinates are standardized. With "haversine",
+    they're converted to radians and clustered by great-circle distance, using
+    a BallTree; clusters closer than cluster_selection_km are then merged.
+
+    Returns the fitted transformer and clusterer (to place new points later),
+    along with the cluster label of each point.
+    """
+    options: dict[str, Any] = {}
+    transformer: TransformerMixin
+    if metric == "haversine":
+        transformer = FunctionTransformer(np.radians)
+        options = {"metric": "haversine", "algorithm": "boruvka_balltree"}
+        if cluster_selection_km:
+            epsilon = cluster_selection_km / EARTH_RADIUS_KM
+            options["cluster_selection_epsilon"] = epsilon
+    elif cluster_selection_km:
+        raise ValueError("cluster_selection_km needs the haversine metric")
+    else:
+        transformer = StandardScaler()
+    scaled_coordinates = transformer.fit_transform(coordinates)
 
     clusterer = HDBSCAN(
         min_cluster_size=min_cluster_size,
         min_samples=min_samples,
         allow_single_cluster=allow_single_cluster,
         prediction_data=prediction_data,
+        **options,
     )
     cluster_labels = clusterer.fit_predict(scaled_coordinates)
 
-    clusters = defaultdict(list)
-    for i, label in enumerate(cluster_labels):
-        if label == -1:
-            continue
-        clusters[int(label)].append(ids[i])
-
     logger.debug(f"Scaled Coordinates: {scaled_coordinates}")
     logger.debug(f"Cluster Labels: {cluster_labels}")
+    return transformer, clusterer, cluster_labels
+
+
+def cluster_mementos(
+    mementos: List["MementoWithCoordinates"] | MementoPoints,
+    min_cluster_size: int = 5,
+    min_samples: Optional[int] = None,
+    allow_single_cluster: bool = True,
+    prediction_data: bool = True,
+    metric: ClusteringMetric = "euclidean",
+    cluster_selection_km: Optional[float] = None,
+) -> dict[int, List[int]]:
+    """Cluster Mementos based on geographical coordinates and return recommended IDs.
+
+    See fit_clusterer for the metrics; cluster_selection_km needs "haversine".
+    """
+
+    # Extract coordinates and IDs
+    if not isinstance(mementos, MementoPoints):
+        mementos = MementoPoints.from_mementos(mementos)
+    if len(mementos.ids) < min_cluster_size:
+        logger.warning("Less mementos than minimum cluster size!")
+        return {}
+
+    _, _, cluster_labels = fit_clusterer(
+        mementos.coordinates,
+        min_cluster_size=min_cluster_size,
+        min_samples=min_samples,
+        allow_single_cluster=allow_single_cluster,
+        prediction_data=prediction_data,
+        metric=metric,
+        cluster_selection_km=cluster_selection_km,
+    )
+    clusters = group_clusters(mementos.ids.tolist(), cluster_labels)
+
     logger.debug(f"Clusters: {clusters}")
 
-    return dict(clusters)
+    return clusters
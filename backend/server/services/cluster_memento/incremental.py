@@ -0,0 +1,203 @@
+"""
+@description Incremental clustering of a user's mementos for recommendations.
+    A fitted HDBSCAN model is persisted per user; new mementos are placed into
+    its existing clusters with `approximate_predict`, and the model is only
+    refit after enough new mementos, or when they stop fitting its clusters.
+@requirements FR-38
+"""
+
+import fcntl
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+import joblib
+import numpy as np
+from hdbscan import approximate_predict
+from loguru import logger
+from pydantic import UUID4
+
+from server.config.settings import settings
+from server.services.cluster_memento.hdbscan import (
+    MementoPoints,
+    fit_clusterer,
+    group_clusters,
+)
+
+
+class ClusteringModel:
+    """A user's fitted clusterer, plus the mementos placed into it since."""
+
+    def __init__(self, points: MementoPoints, min_cluster_size: int) -> None:
+        """Fits the clusterer on all of a user's mementos (min_cluster_size or more)."""
+        self.min_cluster_size = min_cluster_size
+        self.transformer, self.clusterer, labels = fit_clusterer(
+            points.coordinates,
+            min_cluster_size=min_cluster_size,
+            metric=settings.clustering_metric,
+            cluster_selection_km=settings.clustering_selection_km,
+        )
+        self.memento_ids = points.ids.copy()
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.last_memento_id = int(points.ids.max())
+        # Mementos placed since the fit, and how many of those were noise
+        self.new_count = 0
+        self.new_noise_count = 0
+
+    def add(self, points: MementoPoints) -> bool:
+        """Places new mementos into the existing clusters (or noise).
+
+        Mementos the model already has are skipped. Returns whether any were added.
+        """
+        new = points.ids > self.last_memento_id
+        if not new.any():
+            return False
+        ids = points.ids[new]
+        scaled = self.transformer.transform(points.coordinates[new])
+        labels, _ = approximate_predict(self.clusterer, scaled)
+
+        self.memento_ids = np.concatenate([self.memento_ids, ids])
+        self.labels = np.concatenate([self.labels, labels])
+        self.last_memento_id = max(self.last_memento_id, int(ids.max()))
+        self.new_count += len(ids)
+        self.new_noise_count += int(np.count_nonzero(labels == -1))
+        return True
+
+    def needs_refit(
+        self,
+        refit_points: int = settings.clustering_refit_points,
+        drift_noise_ratio: float = settings.clustering_drift_noise_ratio,
+    ) -> bool:
+        """Whether enough mementos were added since the fit to warrant a refit.
+
+        Besides a fixed number of new mementos, a refit is needed once many of
+        them land outside every cluster: approximate_predict can't form new
+        clusters, so that's where the fitted clusters have drifted from the data.
+        """
+        if self.new_count >= refit_points:
+            return True
+        return (
+            self.new_count >= self.min_cluster_size
+            and self.new_noise_count / self.new_count >= drift_noise_ratio
+        )
+
+    def clusters(self) -> dict[int, list[int]]:
+        """Memento IDs by cluster label, leaving out noise."""
+        return group_clusters(self.memento_ids.tolist(), self.labels.tolist())
+
+
+class ClusteringModelStore:
+    """Persists each user's clustering model to disk, with an LRU cache in memory.
+
+    Files are shared by every process on the host (API workers and the batch
+    job); a cached model is only reused while its file is unchanged. Each user's
+    generation is kept in a file next to their model and bumped when the model is
+    invalidated, so that a model fit before that (i.e. on stale mementos), in any
+    process, isn't saved back over it. Both are only changed under an exclusive
+    lock of the generation file.
+    """
+
+    def __init__(
+        self,
+        directory: Path = settings.clustering_model_dir,
+        max_cached: int = settings.clustering_max_cached_models,
+    ) -> None:
+        self.directory = directory
+        self.max_cached = max_cached
+        self._cache: OrderedDict[str, tuple[int, ClusteringModel]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, user_id: UUID4) -> Path:
+        return self.directory / f"{user_id}.joblib"
+
+    @contextmanager
+    def _locked_generation(self, user_id: UUID4) -> Iterator[IO[bytes]]:
+        """Opens a user's generation file, holding an exclusive lock on it."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / f"{user_id}.generation").open("a+b") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            file.seek(0)
+            yield file
+
+    @staticmethod
+    def _read_generation(file: IO[bytes]) -> int:
+        return int(file.read() or 0)
+
+    def generation(self, user_id: UUID4) -> int:
+        """The user's generation, to pass to `save` for a model about to be fit."""
+        with self._locked_generation(user_id) as file:
+            return self._read_generation(file)
+
+    def load(self, user_id: UUID4) -> Optional[ClusteringModel]:
+        """Returns a user's model, or None if there's none (or it can't be read)."""
+        path = self._path(user_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        key = str(user_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == mtime:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Failed to load clustering model {path}: {e}")
+            return None
+        with self._lock:
+            self._remember(key, mtime, model)
+        return model
+
+    def save(
+        self,
+        user_id: UUID4,
+        model: ClusteringModel,
+        generation: Optional[int] = None,
+    ) -> bool:
+        """Persists a user's model (atomically, so readers never see partial files).
+
+        Given the generation from before the model was fit, the model isn't saved
+        if it was invalidated since. Returns whether the model was saved.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(user_id)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        joblib.dump(model, tmp_path)
+        with self._locked_generation(user_id) as file:
+            if generation is not None and self._read_generation(file) != generation:
+                tmp_path.unlink(missing_ok=True)
+                return False
+            tmp_path.replace(path)
+            mtime = path.stat().st_mtime_ns
+        with self._lock:
+            self._remember(str(user_id), mtime, model)
+        return True
+
+    def invalidate(self, user_id: UUID4) -> None:
+        """Drops a user's model, i.e. when mementos are edited or deleted."""
+        with self._locked_generation(user_id) as file:
+            generation = self._read_generation(file) + 1
+            file.seek(0)
+            file.truncate()
+            file.write(str(generation).encode())
+            file.flush()
+            self._path(user_id).unlink(missing_ok=True)
+        with self._lock:
+            self._cache.pop(str(user_id), None)
+
+    def _remember(self, key: str, mtime: int, model: ClusteringModel) -> None:
+        """Caches a model in memory (with the lock held)."""
+        self._cache[key] = (mtime, model)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+
+clustering_models = ClusteringModelStore()
@@ -1,11 +1,37 @@
 from typing import cast
 
-from supabase import Client, create_client
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
 
 from server.config.settings import settings
 
 url: str = settings.supabase_url
 key: str = settings.supabase_key
 
+
+def create_http_client() -> httpx.AsyncClient:
+    """Creates the HTTP connection pool shared by async DB and Storage requests."""
+    return httpx.AsyncClient(
+        http2=settings.supabase_http2,
+        limits=httpx.Limits(
+            max_connections=settings.supabase_max_connections,
+            max_keepalive_connections=settings.supabase_max_keepalive_connections,
+            keepalive_expiry=settings.supabase_keepalive_expiry,
+        ),
+        timeout=settings.supabase_timeout,
+        follow_redirects=True,
+    )
+
+
 # No URL/key for CI; just set to None (casted to avoid MyPy error)
-supabase = create_client(url, key) if url and key else cast(Client, None)
+async_supabase = (
+    AsyncClient(url, key, AsyncClientOptions(httpx_client=create_http_client()))
+    if url and key
+    else cast(AsyncClient, None)
+)
+
+
+async def close() -> None:
+    """Closes the async client's connection pool, on app shutdown."""
+    if async_supabase is not None and async_supabase.options.httpx_client:
+        await async_supabase.options.httpx_client.aclose()
@@ -150,6 +150,176 @@ $$;
 
 ALTER FUNCTION public.mementos_in_bounds(min_lat double precision, min_long double precision, max_lat double precision, max_long double precision) OWNER TO postgres;
 
+--
+-- Name: update_images(jsonb); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.update_images(updates jsonb) RETURNS TABLE(id bigint)
+    LANGUAGE sql
+    AS $$
+    -- updates: [{"filename": ..., "order_index"?: ..., "detected_text"?: ..., "image_label"?: ...}]
+    -- Only the fields present for an image are changed
+    update public.image as i
+    set
+        order_index = case when u.value ? 'order_index'
+            then (u.value->>'order_index')::smallint else i.order_index end,
+        detected_text = case when u.value ? 'detected_text'
+            then u.value->>'detected_text' else i.detected_text end,
+        image_label = case when u.value ? 'image_label'
+            then u.value->>'image_label' else i.image_label end
+    from jsonb_array_elements(updates) as u(value)
+    where i.filename = u.value->>'filename'
+    returning i.id
+$$;
+
+
+ALTER FUNCTION public.update_images(updates jsonb) OWNER TO postgres;
+
+--
+-- Name: search_mementos(uuid, date, date, text, double precision, double precision, double precision, double precision, text); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.search_mementos(user_id uuid, start_date date DEFAULT NULL::date, end_date date DEFAULT NULL::date, search_text text DEFAULT NULL::text, min_lat double precision DEFAULT NULL::double precision, min_long double precision DEFAULT NULL::double precision, max_lat double precision DEFAULT NULL::double precision, max_long double precision DEFAULT NULL::double precision, image_label text DEFAULT NULL::text) RETURNS SETOF public.memento
+    LANGUAGE sql STABLE
+    AS $$
+    -- A user's mementos matching every filter given (null filters are ignored).
+    -- Returns memento rows, so callers can embed images and order/page the result.
+    -- Arguments are qualified by the function name, as columns share their names.
+    select m.*
+    from public.memento as m
+    where m.user_id = search_mementos.user_id
+        and (search_mementos.start_date is null or m.date >= search_mementos.start_date)
+        and (search_mementos.end_date is null or m.date <= search_mementos.end_date)
+        -- Same expression as memento_search_idx, so the index is used
+        and (search_mementos.search_text is null
+            or to_tsvector('english'::regconfig, public.memento_searchable_content(m.*))
+                @@ to_tsquery('english'::regconfig, search_mementos.search_text))
+        and (search_mementos.min_lat is null or m.coordinates && ST_SetSRID(
+            ST_MakeBox2D(
+                ST_Point(search_mementos.min_long, search_mementos.min_lat),
+                ST_Point(search_mementos.max_long, search_mementos.max_lat)
+            ),
+            4326
+        ))
+        and (search_mementos.image_label is null or exists (
+            select 1
+            from public.image as i
+            where i.memento_id = m.id
+                and i.image_label like search_mementos.image_label
+        ))
+$$;
+
+
+ALTER FUNCTION public.search_mementos(user_id uuid, start_date date, end_date date, search_text text, min_lat double precision, min_long double precision, max_lat double precision, max_long double precision, image_label text) OWNER TO postgres;
+
+--
+-- Name: count_image_labels(); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.count_image_labels() RETURNS trigger
+    LANGUAGE plpgsql SECURITY DEFINER
+    SET search_path TO ''
+    AS $$
+begin
+    -- Statement-level trigger on image: applies the net change in labelled
+    -- images per (user, label) to image_label_count. Only the transition tables
+    -- of the operation exist, hence a branch per operation.
+    if TG_OP = 'INSERT' then
+        insert into public.image_label_count as c (user_id, image_label, count)
+        select m.user_id, n.image_label, count(*)
+        from new_images as n
+        join public.memento as m on m.id = n.memento_id
+        where n.image_label <> ''
+        group by m.user_id, n.image_label
+        on conflict (user_id, image_label) do update set count = c.count + excluded.count;
+    elsif TG_OP = 'UPDATE' then
+        insert into public.image_label_count as c (user_id, image_label, count)
+        select m.user_id, d.image_label, sum(d.delta)
+        from (
+            select o.memento_id, o.image_label, -1 as delta
+            from old_images as o
+            join new_images as n on n.id = o.id
+            where o.image_label is distinct from n.image_label
+                or o.memento_id <> n.memento_id
+            union all
+            select n.memento_id, n.image_label, 1
+            from old_images as o
+            join new_images as n on n.id = o.id
+            where o.image_label is distinct from n.image_label
+                or o.memento_id <> n.memento_id
+        ) as d
+        join public.memento as m on m.id = d.memento_id
+        where d.image_label <> ''
+        group by m.user_id, d.image_label
+        on conflict (user_id, image_label) do update set count = c.count + excluded.count;
+    else
+        -- Images deleted along with their memento are no longer joined to it;
+        -- those are uncounted by uncount_memento_image_labels instead
+        update public.image_label_count as c
+        set count = c.count - d.count
+        from (
+            select m.user_id, o.image_label, count(*) as count
+            from old_images as o
+            join public.memento as m on m.id = o.memento_id
+            where o.image_label <> ''
+            group by m.user_id, o.image_label
+        ) as d
+        where c.user_id = d.user_id and c.image_label = d.image_label;
+    end if;
+    return null;
+end;
+$$;
+
+
+ALTER FUNCTION public.count_image_labels() OWNER TO postgres;
+
+--
+-- Name: uncount_memento_image_labels(); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.uncount_memento_image_labels() RETURNS trigger
+    LANGUAGE plpgsql SECURITY DEFINER
+    SET search_path TO ''
+    AS $$
+begin
+    -- Row-level trigger before a memento is deleted: uncounts its images' labels
+    -- while they can still be joined to the memento's user
+    update public.image_label_count as c
+    set count = c.count - d.count
+    from (
+        select i.image_label, count(*) as count
+        from public.image as i
+        where i.memento_id = old.id and i.image_label <> ''
+        group by i.image_label
+    ) as d
+    where c.user_id = old.user_id and c.image_label = d.image_label;
+    return old;
+end;
+$$;
+
+
+ALTER FUNCTION public.uncount_memento_image_labels() OWNER TO postgres;
+
+--
+-- Name: rebuild_image_label_counts(); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.rebuild_image_label_counts() RETURNS void
+    LANGUAGE sql
+    AS $$
+    -- Recounts every user's image labels from scratch (i.e. to backfill the table)
+    delete from public.image_label_count;
+    insert into public.image_label_count (user_id, image_label, count)
+    select m.user_id, i.image_label, count(*)
+    from public.image as i
+    join public.memento as m on m.id = i.memento_id
+    where i.image_label <> ''
+    group by m.user_id, i.image_label;
+$$;
+
+
+ALTER FUNCTION public.rebuild_image_label_counts() OWNER TO postgres;
+
 --
 -- Name: collection; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -270,6 +440,26 @@ ALTER TABLE public.memento ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY
 );
 
 
+--
+-- Name: image_label_count; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.image_label_count (
+    user_id uuid NOT NULL,
+    image_label text NOT NULL,
+    count integer DEFAULT 0 NOT NULL
+);
+
+
+ALTER TABLE public.image_label_count OWNER TO postgres;
+
+--
+-- Name: TABLE image_label_count; Type: COMMENT; Schema: public; Owner: postgres
+--
+
+COMMENT ON TABLE public.image_label_count IS 'Number of images with each label, per user. Maintained by triggers on image and memento';
+
+
 --
 -- Name: rejected_recommendations; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -339,6 +529,14 @@ ALTER TABLE ONLY public.image
     ADD CONSTRAINT image_pkey PRIMARY KEY (id, memento_id);
 
 
+--
+-- Name: image_label_count image_label_count_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.image_label_count
+    ADD CONSTRAINT image_label_count_pkey PRIMARY KEY (user_id, image_label);
+
+
 --
 -- Name: memento mementos_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
@@ -377,6 +575,62 @@ ALTER TABLE ONLY public.user_info
 CREATE INDEX memento_search_idx ON public.memento USING gin (to_tsvector('english'::regconfig, public.memento_searchable_content(memento.*)));
 
 
+--
+-- Name: memento_user_date_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX memento_user_date_id_idx ON public.memento USING btree (user_id, date DESC NULLS LAST, id DESC);
+
+
+--
+-- Name: memento_coordinates_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX memento_coordinates_idx ON public.memento USING gist (coordinates);
+
+
+--
+-- Name: image_memento_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX image_memento_id_idx ON public.image USING btree (memento_id);
+
+
+--
+-- Name: rejected_recommendations_user_id_idx; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX rejected_recommendations_user_id_idx ON public.rejected_recommendations USING btree (user_id);
+
+
+--
+-- Name: image count_image_labels_delete; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER count_image_labels_delete AFTER DELETE ON public.image REFERENCING OLD TABLE AS old_images FOR EACH STATEMENT EXECUTE FUNCTION public.count_image_labels();
+
+
+--
+-- Name: image count_image_labels_insert; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER count_image_labels_insert AFTER INSERT ON public.image REFERENCING NEW TABLE AS new_images FOR EACH STATEMENT EXECUTE FUNCTION public.count_image_labels();
+
+
+--
+-- Name: image count_image_labels_update; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER count_image_labels_update AFTER UPDATE ON public.image REFERENCING OLD TABLE AS old_images NEW TABLE AS new_images FOR EACH STATEMENT EXECUTE FUNCTION public.count_image_labels();
+
+
+--
+-- Name: memento uncount_memento_image_labels; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER uncount_memento_image_labels BEFORE DELETE ON public.memento FOR EACH ROW EXECUTE FUNCTION public.uncount_memento_image_labels();
+
+
 --
 -- Name: collection collection_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
@@ -409,6 +663,14 @@ ALTER TABLE ONLY public.image
     ADD CONSTRAINT image_memento_id_fkey FOREIGN KEY (memento_id) REFERENCES public.memento(id) ON UPDATE CASCADE ON DELETE CASCADE;
 
 
+--
+-- Name: image_label_count image_label_count_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.image_label_count
+    ADD CONSTRAINT image_label_count_user_id_fkey FOREIGN KEY (user_id) REFERENCES auth.users(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
 --
 -- Name: memento mementos_user_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
@@ -456,6 +718,12 @@ ALTER TABLE public.has_memento ENABLE ROW LEVEL SECURITY;
 
 ALTER TABLE public.image ENABLE ROW LEVEL SECURITY;
 
+--
+-- Name: image_label_count; Type: ROW SECURITY; Schema: public; Owner: postgres
+--
+
+ALTER TABLE public.image_label_count ENABLE ROW LEVEL SECURITY;
+
 --
 -- Name: memento; Type: ROW SECURITY; Schema: public; Owner: postgres
 --
@@ -501,6 +769,15 @@ GRANT ALL ON TABLE public.image TO authenticated;
 GRANT ALL ON TABLE public.image TO service_role;
 
 
+--
+-- Name: TABLE image_label_count; Type: ACL; Schema: public; Owner: postgres
+--
+
+GRANT ALL ON TABLE public.image_label_count TO anon;
+GRANT ALL ON TABLE public.image_label_count TO authenticated;
+GRANT ALL ON TABLE public.image_label_count TO service_role;
+
+
 --
 -- Name: TABLE mementos_with_images; Type: ACL; Schema: public; Owner: postgres
 --
@@ -527,6 +804,48 @@ GRANT ALL ON FUNCTION public.mementos_in_bounds(min_lat double precision, min_lo
 GRANT ALL ON FUNCTION public.mementos_in_bounds(min_lat double precision, min_long double precision, max_lat double precision, max_long double precision) TO authenticated;
 GRANT ALL ON FUNCTION public.mementos_in_bounds(min_lat double precision, min_long double precision, max_lat double precision, max_long double precision) TO service_role;
 
+--
+-- Name: FUNCTION update_images(updates jsonb); Type: ACL; Schema: public; Owner: postgres
+--
+
+GRANT ALL ON FUNCTION public.update_images(updates jsonb) TO anon;
+GRANT ALL ON FUNCTION public.update_images(updates jsonb) TO authenticated;
+GRANT ALL ON FUNCTION public.update_images(updates jsonb) TO service_role;
+
+--
+-- Name: FUNCTION search_mementos(user_id uuid, start_date date, end_date date, search_text text, min_lat double precision, min_long double precision, max_lat double precision, max_long double precision, image_label text); Type: ACL; Schema: public; Owner: postgres
+--
+
+GRANT ALL ON FUNCTION public.search_mementos(user_id uuid, start_date date, end_date date, search_text text, min_lat double precision, min_long double precision, max_lat double precision, max_long double precision, image_label text) TO anon;
+GRANT ALL ON FUNCTION public.search_mementos(user_id uuid, start_date date, end_date date, search_text text, min_lat double precision, min_long double precision, max_lat double precision, max_long double precision, image_label text) TO authenticated;
+GRANT ALL ON FUNCTION public.search_mementos(user_id uuid, start_date date, end_date date, search_text text, min_lat double precision, min_long double precision, max_lat double precision, max_long double precision, image_label text) TO service_role;
+
+
+--
+-- Name: FUNCTION count_image_labels(); Type: ACL; Schema: public; Owner: postgres
+--
+
+GRANT ALL ON FUNCTION public.count_image_labels() TO anon;
+GRANT ALL ON FUNCTION public.count_image_labels() TO authenticated;
+GRANT ALL ON FUNCTION public.count_image_labels() TO service_role;
+
+
+--
+-- Name: FUNCTION uncount_memento_image_labels(); Type: ACL; Schema: public; Owner: postgres
+--
+
+GRANT ALL ON FUNCTION public.uncount_memento_image_labels() TO anon;
+GRANT ALL ON FUNCTION public.uncount_memento_image_labels() TO authenticated;
+GRANT ALL ON FUNCTION public.uncount_memento_image_labels() TO service_role;
+
+
+--
+-- Name: FUNCTION rebuild_image_label_counts(); Type: ACL; Schema: public; Owner: postgres
+--
+
+GRANT ALL ON FUNCTION public.rebuild_image_label_counts() TO service_role;
+
+
 --
 -- Name: TABLE collection; Type: ACL; Schema: public; Owner: postgres
 --
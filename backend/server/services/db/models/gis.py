@@ -1,6 +1,9 @@
 import binascii
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
 
+import numpy as np
+import shapely
+from numpy.typing import NDArray
 from pydantic import BaseModel, Field, field_validator
 from shapely import wkb
 from typing_extensions import Self
@@ -42,6 +45,23 @@ class Coordinates(BaseModel):
             raise ValueError(f"Invalid Postgis binary format: {hex_string}") from e
 
 
+def points_from_postgis_binary(
+    hex_strings: Sequence[Optional[str]],
+) -> NDArray[np.float64]:
+    """Decodes PostGIS binary hex strings into an (n, 2) array of lat/long.
+
+    All points are decoded at once, without creating a Coordinates model for
+    each. Values that aren't valid points (or are None) become NaN rows.
+    """
+    geometries = shapely.from_wkb(
+        np.asarray(hex_strings, dtype=object),
+        on_invalid="ignore",
+    )
+    return np.column_stack(
+        [shapely.get_y(geometries), shapely.get_x(geometries)],
+    ).astype(np.float64, copy=False)
+
+
 class BaseWithCoordinates(BaseModel):
     """A convenience model that can be inherited from to ensure coordinates are included as a Coordinates model."""
 
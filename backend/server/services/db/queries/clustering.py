@@ -1,50 +1,100 @@
+from typing import Iterable
+
+import numpy as np
 from pydantic import UUID4
 
-from server.api.memento.models import (
-    MementoWithCoordinates,
-)
 from server.services import db
+from server.services.cluster_memento.hdbscan import MementoPoints
+from server.services.db.models.gis import points_from_postgis_binary
 from server.services.db.models.schema_public_latest import (
     RejectedRecommendations,
     RejectedRecommendationsInsert,
 )
 
 
-def get_mementos_for_clustering(user_id: UUID4) -> list[MementoWithCoordinates]:
-    """Retrieves mementos with a non-null coordinates field"""
+async def get_mementos_for_clustering(
+    user_id: UUID4,
+    after_id: int | None = None,
+) -> MementoPoints:
+    """Retrieves the IDs and lat/long of mementos with a non-null coordinates field.
+
+    Only mementos created after the one with after_id are retrieved, if given.
+    Coordinates are decoded as columns, rather than as a model per memento;
+    mementos whose coordinates aren't valid points are left out.
+    """
     query = (
-        db.supabase.table("memento")
-        .select("user_id, id, coordinates")
+        db.async_supabase.table("memento")
+        .select("id, coordinates")
         .eq("user_id", str(user_id))
         .neq("coordinates", None)
     )
-    response = query.execute()
-    return [MementoWithCoordinates(**item) for item in response.data]
+    if after_id is not None:
+        query.gt("id", after_id)
+    response = await query.execute()
+    ids = np.fromiter((row["id"] for row in response.data), dtype=np.int64)
+    coordinates = points_from_postgis_binary(
+        [row["coordinates"] for row in response.data],
+    )
+    valid = ~np.isnan(coordinates).any(axis=1)
+    return MementoPoints(ids[valid], coordinates[valid])
 
 
-def create_rejected_collection(
+async def create_rejected_collection(
     user_id: UUID4,
     recommendation: RejectedRecommendationsInsert,
 ) -> RejectedRecommendations:
     """Adds a rejected collection to the db"""
-    response = (
-        db.supabase.table("rejected_recommendations")
+    response = await (
+        db.async_supabase.table("rejected_recommendations")
         .insert({**recommendation.model_dump(mode="json"), "user_id": str(user_id)})
         .execute()
     )
     return RejectedRecommendations(**response.data[0])
 
 
-def is_collection_rejected(user_id: UUID4, memento_ids: list[int]) -> bool:
+def _pg_array(memento_ids: Iterable[int]) -> str:
+    """Formats IDs as a PostgreSQL array literal, as array filters expect."""
+    return "{" + ",".join(map(str, memento_ids)) + "}"
+
+
+async def is_collection_rejected(user_id: UUID4, memento_ids: list[int]) -> bool:
     """Checks if a set of memento_ids have been rejected before"""
-    # cs expects PostgreSQL array format
-    pg_array = "{" + ",".join(map(str, memento_ids)) + "}"
+    pg_array = _pg_array(memento_ids)
 
-    response = (
-        db.supabase.table("rejected_recommendations")
+    response = await (
+        db.async_supabase.table("rejected_recommendations")
         .select("id")
         .filter("user_id", "eq", str(user_id))
         .filter("memento_ids", "cs", pg_array)
         .execute()
     )
     return len(response.data) > 0
+
+
+async def filter_rejected_collections(
+    user_id: UUID4,
+    collections: list[list[int]],
+) -> list[list[int]]:
+    """Returns the collections (memento_ids) that haven't been rejected before.
+
+    Checks every collection with a single query: only rejections that share a
+    memento with some collection are fetched, then a collection counts as
+    rejected if a rejection contains all of its mementos (as with `cs`).
+    """
+    if not collections:
+        return []
+
+    candidate_ids = sorted({id_ for memento_ids in collections for id_ in memento_ids})
+    response = await (
+        db.async_supabase.table("rejected_recommendations")
+        .select("memento_ids")
+        .filter("user_id", "eq", str(user_id))
+        .filter("memento_ids", "ov", _pg_array(candidate_ids))
+        .execute()
+    )
+    rejected = [set(row["memento_ids"]) for row in response.data]
+    return [
+        memento_ids
+        for memento_ids in collections
+        if not any(rejection.issuperset(memento_ids) for rejection in rejected)
+    ]
@@ -4,6 +4,8 @@
 @requirements FR-3, FR-35, FR-36, FR-37
 """
 
+from typing import Any
+
 from pydantic import UUID4
 
 from server.api.collection.models import NewCollection, UpdateCollection
@@ -17,10 +19,10 @@ from server.services.db.models.schema_public_latest import (
 )
 
 
-def get_collection(collection_id: int) -> Collection | None:
+async def get_collection(collection_id: int) -> Collection | None:
     """Fetch a single collection by its ID, if it exists."""
-    response = (
-        db.supabase.from_("collection")
+    response = await (
+        db.async_supabase.from_("collection")
         .select("*")
         .eq("id", collection_id)
         .single()
@@ -29,12 +31,12 @@ def get_collection(collection_id: int) -> Collection | None:
     return Collection(**response.data) if response.data is not None else None
 
 
-def get_collections(
+async def get_collections(
     user_id: UUID4,
 ) -> list[CollectionWithMementos]:
     """Gets collections and associated mementos for a user."""
-    response = (
-        db.supabase.table("collection")
+    response = await (
+        db.async_supabase.table("collection")
         .select("*, mementos:has_memento(*)")
         .eq("user_id", str(user_id))
         .execute()
@@ -42,10 +44,10 @@ def get_collections(
     return [CollectionWithMementos(**collection) for collection in response.data]
 
 
-def get_has_mementos(collection_id: int) -> list[int]:
+async def get_has_mementos(collection_id: int) -> list[int]:
     """Gets the mementos associated with a collection"""
-    response = (
-        db.supabase.table("has_memento")
+    response = await (
+        db.async_supabase.table("has_memento")
         .select("memento_id")
         .eq("collection_id", collection_id)
         .execute()
@@ -54,10 +56,10 @@ def get_has_mementos(collection_id: int) -> list[int]:
     return [item["memento_id"] for item in response.data]
 
 
-def db_delete_has_memento(collection_id: int, memento_id: int) -> HasMemento:
+async def db_delete_has_memento(collection_id: int, memento_id: int) -> HasMemento:
     """Deletes a memento association from the DB"""
-    response = (
-        db.supabase.table("has_memento")
+    response = await (
+        db.async_supabase.table("has_memento")
         .delete()
         .eq("collection_id", collection_id)
         .eq("memento_id", memento_id)
@@ -66,20 +68,26 @@ def db_delete_has_memento(collection_id: int, memento_id: int) -> HasMemento:
     return HasMemento(**response.data[0])
 
 
-def create_collection(new_collection: NewCollection, user_id: UUID4) -> Collection:
+async def create_collection(
+    new_collection: NewCollection,
+    user_id: UUID4,
+) -> Collection:
     """Creates a new collection for a user."""
-    response = (
-        db.supabase.table("collection")
+    response = await (
+        db.async_supabase.table("collection")
         .insert({**new_collection.model_dump(mode="json"), "user_id": str(user_id)})
         .execute()
     )
     return Collection(**response.data[0])
 
 
-def update_collection(id: int, updated_collection: UpdateCollection) -> Collection:
+async def update_collection(
+    id: int,
+    updated_collection: UpdateCollection,
+) -> Collection:
     """Updates an existing collection record."""
-    response = (
-        db.supabase.table("collection")
+    response = await (
+        db.async_supabase.table("collection")
         .update({**updated_collection.model_dump(mode="json", exclude={"user_id"})})
         .eq("id", id)
         .execute()
@@ -87,16 +95,18 @@ def update_collection(id: int, updated_collection: UpdateCollection) -> Collecti
     return Collection(**response.data[0])
 
 
-def db_delete_collection(id: int) -> Collection:
+async def db_delete_collection(id: int) -> Collection:
     """Deletes a collection from the DB."""
-    response = db.supabase.table("collection").delete().eq("id", id).execute()
+    response = (
+        await db.async_supabase.table("collection").delete().eq("id", id).execute()
+    )
     return Collection(**response.data[0])
 
 
-def associate_memento(has_memento: HasMementoInsert) -> HasMemento:
+async def associate_memento(has_memento: HasMementoInsert) -> HasMemento:
     """Associated a memento with a collection."""
-    response = (
-        db.supabase.table("has_memento")
+    response = await (
+        db.async_supabase.table("has_memento")
         .insert({**has_memento.model_dump(mode="json")})
         .execute()
     )
@@ -107,10 +117,10 @@ def associate_memento(has_memento: HasMementoInsert) -> HasMemento:
     return HasMemento(**response.data[0])
 
 
-def update_associate_memento(updated_has_memento: HasMementoUpdate) -> HasMemento:
+async def update_associate_memento(updated_has_memento: HasMementoUpdate) -> HasMemento:
     """Updates a memento collection association"""
-    response = (
-        db.supabase.table("has_memento")
+    response = await (
+        db.async_supabase.table("has_memento")
         .update({**updated_has_memento.model_dump(mode="json")})
         .eq("id", id)
         .execute()
@@ -118,18 +128,23 @@ def update_associate_memento(updated_has_memento: HasMementoUpdate) -> HasMement
     return HasMemento(**response.data[0])
 
 
-def get_collection_image_filenames(collection_id: int) -> list[str]:
-    """Fetch all image filenames for mementos in a specific collection."""
-    response = (
-        db.supabase.from_("has_memento")
-        .select("memento:memento_id(images:image(filename))")
+async def get_collection_image_filenames(collection_id: int) -> list[str]:
+    """Fetch all image filenames for mementos in a specific collection.
+
+    Ordered by memento, then by each memento's image order, as rows come back in
+    no particular order (and the collage, and its ETag, depend on it).
+    """
+    response = await (
+        db.async_supabase.from_("has_memento")
+        .select("memento_id, memento:memento_id(images:image(filename, order_index))")
         .eq("collection_id", collection_id)
         .execute()
     )
 
-    return [
-        image["filename"]
-        for record in response.data or []
-        for image in record.get("memento", {}).get("images", [])
-        if "filename" in image
-    ]
+    records: list[Any] = response.data or []
+    filenames: list[str] = []
+    for record in sorted(records, key=lambda record: record.get("memento_id") or 0):
+        images: list[dict[str, Any]] = record.get("memento", {}).get("images", [])
+        images.sort(key=lambda image: image.get("order_index") or 0)
+        filenames += [image["filename"] for image in images if "filename" in image]
+    return filenames
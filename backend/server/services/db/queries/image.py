@@ -10,33 +10,86 @@ from server.services import db
 from server.services.db.models.joins import ImageWithUrl
 
 
-def create_image_metadata(metadata: NewImageMetadata, memento_id: int) -> bool:
+async def create_image_metadata(metadata: NewImageMetadata, memento_id: int) -> bool:
     """Creates a new image metadata record for an image asssociated with a memento."""
-    response = (
-        db.supabase.table("image")
+    response = await (
+        db.async_supabase.table("image")
         .insert({**metadata.model_dump(mode="json"), "memento_id": memento_id})
         .execute()
     )
     return len(response.data) == 1
 
 
-def get_images_for_memento(memento_id: int) -> list[ImageWithUrl]:
+async def create_image_metadata_bulk(
+    metadata: list[NewImageMetadata],
+    memento_id: int,
+) -> bool:
+    """Creates the image metadata records for a memento's images in one insert."""
+    if not metadata:
+        return True
+    response = await (
+        db.async_supabase.table("image")
+        .insert(
+            [
+                {**item.model_dump(mode="json"), "memento_id": memento_id}
+                for item in metadata
+            ],
+        )
+        .execute()
+    )
+    return len(response.data) == len(metadata)
+
+
+async def get_images_for_memento(memento_id: int) -> list[ImageWithUrl]:
     """Gets all the images belonging to a memento."""
-    response = (
-        db.supabase.table("image").select("*").eq("memento_id", memento_id).execute()
+    response = await (
+        db.async_supabase.table("image")
+        .select("*")
+        .eq("memento_id", memento_id)
+        .execute()
     )
     return [ImageWithUrl(**item) for item in response.data]
 
 
-def delete_image_metadata(id: int) -> bool:
+async def delete_image_metadata(id: int) -> bool:
     """Deletes an image metadata record for specific id."""
-    response = db.supabase.table("image").delete().eq("id", id).execute()
+    response = await db.async_supabase.table("image").delete().eq("id", id).execute()
     return len(response.data) == 1
 
 
-def update_image(filename: str, updates: Dict[str, str | int]) -> bool:
+async def delete_image_metadata_bulk(ids: list[int]) -> bool:
+    """Deletes the image metadata records for several ids in one request."""
+    if not ids:
+        return True
+    response = await db.async_supabase.table("image").delete().in_("id", ids).execute()
+    return len(response.data) == len(ids)
+
+
+async def update_image(filename: str, updates: Dict[str, str | int]) -> bool:
     """Updates the detected text of an image"""
-    response = (
-        db.supabase.table("image").update(updates).eq("filename", filename).execute()
+    response = await (
+        db.async_supabase.table("image")
+        .update(updates)
+        .eq("filename", filename)
+        .execute()
     )
     return len(response.data) == 1
+
+
+async def update_images_bulk(updates: Dict[str, Dict[str, str | int]]) -> bool:
+    """Updates many images, keyed by filename, in a single request.
+
+    Only the given fields of each image (order_index, detected_text and/or
+    image_label) are changed, through the `update_images` DB function.
+    """
+    if not updates:
+        return True
+    response = await db.async_supabase.rpc(
+        "update_images",
+        {
+            "updates": [
+                {"filename": filename, **fields} for filename, fields in updates.items()
+            ],
+        },
+    ).execute()
+    return len(response.data) == len(updates)
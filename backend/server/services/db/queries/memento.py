@@ -3,94 +3,131 @@
 @requirements FR-16, FR-17, FR-19, FR-26, FR-27, FR-30, FR-33, FR-34
 """
 
+from typing import Any
+
 from pydantic import UUID4
 
 from server.api.memento.models import (
+    MementoCursor,
     MementoFilterParams,
+    MementoPage,
     NewMemento,
     UpdateMemento,
 )
+from server.config.settings import settings
 from server.services import db
 from server.services.db.models.joins import MementoWithImages
 from server.services.db.models.schema_public_latest import Memento
 
 
-def create_memento(new_memento: NewMemento, user_id: UUID4) -> Memento:
+async def create_memento(new_memento: NewMemento, user_id: UUID4) -> Memento:
     """Creates a new memento for a user."""
-    response = (
-        db.supabase.table("memento")
+    response = await (
+        db.async_supabase.table("memento")
         .insert({**new_memento.model_dump(mode="json"), "user_id": str(user_id)})
         .execute()
     )
     return Memento(**response.data[0])
 
 
-def get_mementos(
+# Image columns of the compact projection, which leaves out (long) detected text
+COMPACT_IMAGE_COLUMNS = (
+    "id, memento_id, filename, mime_type, order_index, image_label, date, coordinates"
+)
+
+
+def _select_mementos(
+    user_id: UUID4,
+    filter_query: MementoFilterParams | None,
+    columns: str,
+) -> Any:
+    """Builds the query for a user's mementos that match the filters.
+
+    Filtered queries go through the `search_mementos` DB function, which applies
+    every filter in a single query using the date, full-text and GIS indexes.
+    """
+    filters = (
+        filter_query.model_dump(mode="json", exclude_none=True) if filter_query else {}
+    )
+    if not filters:
+        return (
+            db.async_supabase.table("memento")
+            .select(columns)
+            .eq("user_id", str(user_id))
+        )
+
+    if "text" in filters:
+        filters["search_text"] = filters.pop("text")
+    return db.async_supabase.rpc(
+        "search_mementos",
+        {"user_id": str(user_id), **filters},
+    ).select(columns)
+
+
+async def get_mementos(
     user_id: UUID4,
     filter_query: MementoFilterParams | None = None,
 ) -> list[MementoWithImages]:
     """Gets all the mementos belonging to a user."""
-    query = (
-        db.supabase.table("memento")
-        .select("*, images:image(*)")
-        .eq("user_id", str(user_id))
+    query = _select_mementos(user_id, filter_query, "*, images:image(*)")
+    response = await query.execute()
+    return [MementoWithImages(**item) for item in response.data]
+
+
+def _after_cursor(cursor: MementoCursor) -> str:
+    """PostgREST filter for the mementos after a cursor.
+
+    Mementos are ordered by date (newest first, undated last), then id.
+    """
+    if cursor.date is None:
+        # Undated mementos come last, so only those with a lower id are left
+        return f"and(date.is.null,id.lt.{cursor.id})"
+    date = cursor.date.isoformat()
+    return f"date.lt.{date},and(date.eq.{date},id.lt.{cursor.id}),date.is.null"
+
+
+async def get_mementos_page(
+    user_id: UUID4,
+    filter_query: MementoFilterParams | None = None,
+    cursor: MementoCursor | None = None,
+    limit: int = settings.memento_page_size,
+    compact: bool = False,
+) -> MementoPage:
+    """Gets a page of a user's mementos, newest first, starting after the cursor.
+
+    Pages are keyset paginated on (date, id), so each page is an index range
+    scan, no matter how deep. The compact projection leaves out images'
+    detected text.
+    """
+    image_columns = COMPACT_IMAGE_COLUMNS if compact else "*"
+    query = _select_mementos(
+        user_id,
+        filter_query,
+        f"*, images:image({image_columns})",
+    )
+    if cursor:
+        query.or_(_after_cursor(cursor))
+
+    # One extra row tells whether there's another page
+    response = await (
+        query.order("date", desc=True, nullsfirst=False)
+        .order("id", desc=True)
+        .limit(limit + 1)
+        .execute()
     )
+    mementos = [MementoWithImages(**item) for item in response.data[:limit]]
 
-    if filter_query:
-        if filter_query.start_date:
-            query.gte("date", filter_query.start_date.isoformat())
-        if filter_query.end_date:
-            query.lte("date", filter_query.end_date.isoformat())
-        if filter_query.text:
-            query.text_search("memento_searchable_content", filter_query.text)
-
-        # Bounding box filtering using the RPC function
-        if all(
-            [
-                filter_query.min_lat,
-                filter_query.min_long,
-                filter_query.max_lat,
-                filter_query.max_long,
-            ],
-        ):
-            bbox_response = db.supabase.rpc(
-                "mementos_in_bounds",
-                {
-                    "min_lat": filter_query.min_lat,
-                    "min_long": filter_query.min_long,
-                    "max_lat": filter_query.max_lat,
-                    "max_long": filter_query.max_long,
-                },
-            ).execute()
-
-            bbox_memento_ids = [item["id"] for item in bbox_response.data]
-            if bbox_memento_ids:
-                # rest of query mementos must be in bounding box mementos
-                query.in_("id", bbox_memento_ids)
-            else:
-                # If no mementos are in the bounding box, return an empty list early
-                return []
-
-        # Filter by mementos with associated images labels
-        if filter_query.image_label:
-            image_query = (
-                db.supabase.table("image")
-                .select("memento_id")
-                .like("image_label", filter_query.image_label)
-                .execute()
-            )
-            labeled_memento_ids = [item["memento_id"] for item in image_query.data]
-            if labeled_memento_ids:
-                query.in_("id", labeled_memento_ids)
-
-    response = query.execute()
-    return [MementoWithImages(**item) for item in response.data]
+    next_cursor = None
+    if len(response.data) > limit:
+        last = mementos[-1]
+        next_cursor = MementoCursor(date=last.date, id=last.id).encode()
+    return MementoPage(mementos=mementos, next_cursor=next_cursor)
 
 
-def update_memento(id: int, updated_memento: UpdateMemento) -> Memento:
+async def update_memento(id: int, updated_memento: UpdateMemento) -> Memento:
     """Updates an existing memento record."""
-    response = (
-        db.supabase.table("memento")
+    response = await (
+        db.async_supabase.table("memento")
         .update({**updated_memento.model_dump(mode="json", exclude={"user_id"})})
         .eq("id", id)
         .execute()
@@ -98,30 +135,35 @@ def update_memento(id: int, updated_memento: UpdateMemento) -> Memento:
     return Memento(**response.data[0])
 
 
-def db_delete_memento(id: int) -> Memento:
+async def db_delete_memento(id: int) -> Memento:
     """Deletes a memento from the DB"""
-    response = db.supabase.table("memento").delete().eq("id", id).execute()
+    response = await db.async_supabase.table("memento").delete().eq("id", id).execute()
     return Memento(**response.data[0])
 
 
-def get_image_labels(user_id: UUID4) -> list[str]:
-    """Gets all image labels from associated images of users mementos"""
-    response = (
-        db.supabase.table("memento")
-        .select("user_id, images:image(image_label)")
-        .eq("user_id", str(user_id))
-        .neq("image.image_label", None)
-        .neq("image.image_label", "")
+async def get_memento_collection_ids(id: int) -> list[int]:
+    """Gets the IDs of the collections a memento belongs to."""
+    response = await (
+        db.async_supabase.table("has_memento")
+        .select("collection_id")
+        .eq("memento_id", id)
         .execute()
     )
-    labels = list(
-        {
-            image["image_label"]
-            for memento in response.data
-            for image in memento["images"]
-            if image["image_label"]
-        },
-    )
-    labels.sort()
+    return [item["collection_id"] for item in response.data]
+
+
+async def get_image_labels(user_id: UUID4) -> dict[str, int]:
+    """Gets each image label of a user's mementos, with its number of images.
 
-    return labels
+    Reads the per-user counts that DB triggers keep up to date as images are
+    added, labelled and deleted, so the cost doesn't grow with the library.
+    """
+    response = await (
+        db.async_supabase.table("image_label_count")
+        .select("image_label, count")
+        .eq("user_id", str(user_id))
+        .gt("count", 0)
+        .order("image_label")
+        .execute()
+    )
+    return {row["image_label"]: row["count"] for row in response.data}
@@ -1,3 +1,6 @@
+from typing import Optional
+from uuid import UUID
+
 from pydantic import UUID4
 
 from server.services import db
@@ -7,17 +10,31 @@ from server.services.db.models.schema_public_latest import (
 )
 
 
-def get_user_info(id: UUID4) -> UserInfo:
+async def get_user_info(id: UUID4) -> UserInfo:
     """Gets user info from DB table for specific user id."""
-    response = db.supabase.table("user_info").select("*").eq("id", id).execute()
+    response = (
+        await db.async_supabase.table("user_info").select("*").eq("id", id).execute()
+    )
     return UserInfo(**response.data[0])
 
 
-def create_user_info(user_info: UserInfoInsert) -> UserInfo:
+async def create_user_info(user_info: UserInfoInsert) -> UserInfo:
     """Creates a new user info record."""
-    response = (
-        db.supabase.table("user_info")
+    response = await (
+        db.async_supabase.table("user_info")
         .insert({**user_info.model_dump(mode="json")})
         .execute()
     )
     return UserInfo(**response.data[0])
+
+
+async def get_user_ids(
+    after_id: Optional[UUID4] = None,
+    limit: int = 1000,
+) -> list[UUID4]:
+    """Gets a page of user IDs, in ID order, starting after after_id if given."""
+    query = db.async_supabase.table("user_info").select("id").order("id").limit(limit)
+    if after_id is not None:
+        query.gt("id", str(after_id))
+    response = await query.execute()
+    return [UUID(item["id"]) for item in response.data]
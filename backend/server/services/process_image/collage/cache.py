@@ -0,0 +1,134 @@
+"""
+@description In-memory cache of rendered collages. A collage is keyed by a hash
+    of everything it's rendered from (the collection's fields, its image
+    filenames in order, the generator's parameters and the output format), which
+    doubles as its ETag: clients revalidating with If-None-Match skip the
+    download and render entirely, and any change to the collection yields a new
+    key. Entries are evicted least recently used first, to keep the cache under
+    a memory budget, and dropped once their collection is edited.
+@requirements FR-53
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from server.config.settings import settings
+from server.services.db.models.schema_public_latest import Collection
+from server.services.process_image.collage.generator import CollageGenerator
+from server.services.process_image.converters import OutputFormat
+from server.services.storage.url_cache import CacheStats
+
+
+class _Entry(NamedTuple):
+    etag: str
+    content: bytes
+
+
+def collage_etag(
+    collection: Collection,
+    image_filenames: list[str],
+    generator: CollageGenerator,
+    output_format: OutputFormat,
+) -> str:
+    """The (strong, quoted) ETag of a collage rendered from these inputs."""
+    digest = hashlib.sha256()
+    for part in (
+        collection.model_dump_json(),
+        *image_filenames,
+        repr(generator.parameters()),
+        output_format,
+    ):
+        digest.update(part.encode())
+        # Separator, so that adjacent parts can't run into each other
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weakly, as per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+class CollageCache:
+    """LRU cache of encoded collages, keyed by (collection ID, output format).
+
+    Only the latest render of a collection is kept: a lookup with a different
+    ETag (i.e. the collection changed since) misses. The event loop runs every
+    access to completion, so no locking is needed.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[int, OutputFormat], _Entry] = OrderedDict()
+        self._size = 0
+        self._stats = CacheStats(max_bytes=max_bytes)
+
+    def get(
+        self,
+        collection_id: int,
+        output_format: OutputFormat,
+        etag: str,
+    ) -> Optional[bytes]:
+        """The cached collage, if it was rendered from the inputs with this ETag."""
+        key = (collection_id, output_format)
+        entry = self._entries.get(key)
+        if entry is None or entry.etag != etag:
+            self._stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return entry.content
+
+    def put(
+        self,
+        collection_id: int,
+        output_format: OutputFormat,
+        etag: str,
+        content: bytes,
+    ) -> None:
+        """Caches a collage that was just rendered, replacing any older render."""
+        # Not worth evicting the whole cache for
+        if len(content) > self.max_bytes:
+            return
+        key = (collection_id, output_format)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(etag, content)
+        self._size += len(content)
+
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._stats.evictions += 1
+
+    def invalidate(self, collection_ids: list[int]) -> None:
+        """Drops the collages of collections, i.e. after they're edited."""
+        for key in list(self._entries):
+            if key[0] in collection_ids:
+                self._remove(key)
+                self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        """Drops every cached collage (statistics are kept)."""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> CacheStats:
+        """Current statistics of the cache."""
+        return self._stats.model_copy(
+            update={"entries": len(self._entries), "size_bytes": self._size},
+        )
+
+    def _remove(self, key: tuple[int, OutputFormat]) -> None:
+        self._size -= len(self._entries.pop(key).content)
+
+
+collage_cache = CollageCache(
+    max_bytes=int(settings.collage_cache_max_mb * 1024 * 1024),
+)
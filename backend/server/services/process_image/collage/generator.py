@@ -49,6 +49,20 @@ class CollageGenerator:
         self.text_bg_color = text_bg_color
         self.max_images_used = max_images_used
 
+    def parameters(self) -> tuple[object, ...]:
+        """The parameters affecting the collages rendered, i.e. for cache keys."""
+        return (
+            self.canvas_size,
+            self.canvas_color,
+            self.max_images_used,
+            self.image_radius,
+            self.image_coverage,
+            self.margin,
+            self.text_color,
+            self.text_bg_color,
+            self.text_padding,
+        )
+
     async def create_collage(
         self,
         collection: Collection,
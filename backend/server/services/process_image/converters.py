@@ -1,41 +1,135 @@
+import asyncio
+import math
 from io import BytesIO
+from typing import Literal
 
 from fastapi import UploadFile
 from loguru import logger
 from PIL import Image
 
+# "png8" is a PNG quantized to a 256 colour palette
+OutputFormat = Literal["png", "png8", "webp"]
+
+MEDIA_TYPES: dict[OutputFormat, str] = {
+    "png": "image/png",
+    "png8": "image/png",
+    "webp": "image/webp",
+}
+
+# Images are never scaled down past this size to fit the size budget
+MIN_SIDE = 200
+
+# Encoded size doesn't shrink quite as fast as the pixel count, so aim a little
+# under the budget when estimating the scale
+SCALE_MARGIN = 0.95
+
+# Output that fills less of the budget than this is worth scaling back up
+FILL_RATIO = 0.8
+
 
 async def upload_file_to_pil(image: UploadFile) -> Image.Image:
     """Converts a FastAPI UploadFile to a PIL Image."""
     image_bytes = await image.read()
     await image.seek(0)
+    return bytes_to_pil(image_bytes)
+
+
+def bytes_to_pil(image_bytes: bytes) -> Image.Image:
+    """Opens encoded image bytes as a (lazily decoded) PIL Image."""
     return Image.open(BytesIO(image_bytes))
 
 
-async def pil_to_png_bytes(
+def _encode(
+    image: Image.Image,
+    output_format: OutputFormat,
+    compress_level: int,
+    quality: int,
+) -> bytes:
+    """Encodes an image once, in the given format."""
+    buffer = BytesIO()
+    if output_format == "webp":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        if output_format == "png8":
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            # Fast octree is the only quantizer that keeps the alpha channel
+            image = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        image.save(buffer, format="PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+def encode_image(
     image: Image.Image,
+    output_format: OutputFormat = "png",
     max_size_kb: int = 500,
     compress_level: int = 6,
+    quality: int = 80,
+    max_encodes: int = 3,
 ) -> bytes:
-    """Converts a PIL Image to a compressed PNG."""
-    buffer = BytesIO()
-    width, height = image.size
-    while True:
-        buffer.seek(0)
-        buffer.truncate()
+    """Encodes an image, scaling it down if needed to fit under max_size_kb.
 
-        # Save with current compression level
-        image.save(buffer, format="PNG", compress_level=compress_level)
+    Encoded size is roughly proportional to the pixel count, so the scale that
+    fits the budget is estimated from the size of the previous encode, instead
+    of repeatedly shrinking by a fixed step. A spare encode is used to scale
+    back up (below the last scale that didn't fit) when the estimate left much
+    of the budget unused. Images are not scaled below MIN_SIDE on their longest
+    side, and at most max_encodes encodes are made.
+    """
+    max_bytes = max_size_kb * 1024
+    width, height = image.size
+    min_scale = min(1.0, MIN_SIDE / max(width, height))
 
-        # Check size constraint in KB
-        size_kb = buffer.tell() / 1024
-        logger.info(f"Compressed image size: {size_kb}")
-        if size_kb <= max_size_kb or (width < 200 and height < 200):
+    scale, too_big_scale = 1.0, 1.0
+    best = None
+    output = _encode(image, output_format, compress_level, quality)
+    for attempt in range(1, max_encodes + 1):
+        logger.info(
+            f"Encoded {output_format} image at {scale:.0%} scale: "
+            f"{len(output) / 1024:.1f} KB",
+        )
+        fits = len(output) <= max_bytes
+        if fits:
+            best = output
+            if scale == 1.0 or len(output) >= FILL_RATIO * max_bytes:
+                break
+        else:
+            too_big_scale = scale
+            if scale <= min_scale:
+                break
+        if attempt == max_encodes:
             break
 
-        # Scale down by 90% and try again
-        width = int(width * 0.9)
-        height = int(height * 0.9)
-        image = image.resize((width, height), Image.Resampling.LANCZOS)
+        estimate = scale * math.sqrt(max_bytes / len(output)) * SCALE_MARGIN
+        if fits:
+            # Never go back to a scale already known to be over the budget
+            estimate = min(estimate, (scale + too_big_scale) / 2)
+        scale = max(min_scale, estimate)
+        resized = image.resize(
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            Image.Resampling.LANCZOS,
+            reducing_gap=3.0,
+        )
+        output = _encode(resized, output_format, compress_level, quality)
 
-    return buffer.getvalue()
+    if best is None:
+        logger.warning(
+            f"Encoded image is {len(output) / 1024:.1f} KB, over the "
+            f"{max_size_kb} KB budget",
+        )
+        return output
+    return best
+
+
+async def pil_to_bytes(
+    image: Image.Image,
+    output_format: OutputFormat = "png",
+    max_size_kb: int = 500,
+) -> bytes:
+    """Encodes a PIL Image to fit under max_size_kb, off the event loop."""
+    return await asyncio.to_thread(
+        encode_image,
+        image,
+        output_format,
+        max_size_kb,
+    )
@@ -1,49 +1,92 @@
 import cv2
 import numpy as np
+from numpy.typing import NDArray
 from PIL import Image
-from tensorflow.keras.applications.resnet50 import (  # type: ignore
-    ResNet50,  # type: ignore
-    decode_predictions,
-    preprocess_input,
+
+from server.config.settings import settings
+from server.services.process_image.classifiers import (
+    ClassifierBackend,
+    KerasClassifier,
+    OnnxClassifier,
 )
-from tensorflow.keras.preprocessing import image  # type: ignore
+from server.services.process_image.model_registry import model_registry
 
-# Load the pre-trained ResNet50 model
-model = ResNet50(weights="imagenet")
+# Input size expected by ResNet50
+IMAGE_SIZE = 224
 
+# ImageNet channel means subtracted by ResNet50's "caffe" style preprocessing
+IMAGENET_MEAN = np.array([103.939, 116.779, 123.68], dtype=np.float32)
 
-# Function to process PIL.Image
-def predict_class(pil_img: Image.Image) -> str:
-    """Classify an image using a classification model"""
-    # Convert PIL image to OpenCV format (BGR)
-    img = np.array(pil_img)
-    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+# Registry names of the classifier for each backend
+CLASSIFIERS = {
+    "keras": "resnet50-keras",
+    "onnx": "resnet50-onnx",
+}
 
-    # Get original dimensions
-    h, w, _ = img.shape
+model_registry.register(CLASSIFIERS["keras"], KerasClassifier)
+model_registry.register(
+    CLASSIFIERS["onnx"],
+    lambda: OnnxClassifier(
+        settings.onnx_model_path,
+        settings.onnx_class_index_path,
+        intra_op_threads=settings.onnx_intra_op_threads,
+        inter_op_threads=settings.onnx_inter_op_threads,
+    ),
+)
+
+
+def get_classifier() -> ClassifierBackend:
+    """Returns the configured classifier, loading it if this is the first use."""
+    return model_registry.get(CLASSIFIERS[settings.classification_backend])
+
+
+def _letterbox_into(pil_img: Image.Image, canvas: NDArray[np.float32]) -> None:
+    """Resizes an image to fit the square canvas (in place), keeping aspect ratio.
+
+    The image is centered on the canvas, with black padding filling the rest.
+    """
+    img = np.array(pil_img.convert("RGB"))
 
     # Compute new dimensions while maintaining aspect ratio
-    scale = 224 / max(h, w)
+    h, w, _ = img.shape
+    scale = IMAGE_SIZE / max(h, w)
     new_w, new_h = int(w * scale), int(h * scale)
-
-    # Resize the image while maintaining aspect ratio
     resized = cv2.resize(img, (new_w, new_h))
 
-    # Create a black canvas (padded image) of size 224x224
-    padded = np.zeros((224, 224, 3), dtype=np.uint8)
+    # Place the resized image on the center of the padded canvas
+    x_offset = (IMAGE_SIZE - new_w) // 2
+    y_offset = (IMAGE_SIZE - new_h) // 2
+    canvas[y_offset : y_offset + new_h, x_offset : x_offset + new_w] = resized
 
-    # Compute center offset
-    x_offset = (224 - new_w) // 2
-    y_offset = (224 - new_h) // 2
 
-    # Place the resized image on the center of the padded canvas
-    padded[y_offset : y_offset + new_h, x_offset : x_offset + new_w] = resized
+def preprocess_images(images: list[Image.Image]) -> NDArray[np.float32]:
+    """Preprocesses images into one contiguous (N, 224, 224, 3) batch for ResNet50.
+
+    Equivalent to Keras' `preprocess_input` on a BGR canvas (as the model has
+    always been fed), but done in place without the channel-flip copy.
+    """
+    batch = np.zeros((len(images), IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    for i, pil_img in enumerate(images):
+        _letterbox_into(pil_img, batch[i])
+    batch -= IMAGENET_MEAN
+    return batch
 
-    # Convert to array format for Keras
-    x = image.img_to_array(padded)
-    x = np.expand_dims(x, axis=0)
-    x = preprocess_input(x)
 
-    preds = model.predict(x)
+def predict_classes(
+    images: list[Image.Image],
+    batch_size: int = settings.classification_batch_size,
+) -> list[str]:
+    """Classify a batch of images, running the model once per `batch_size` images.
 
-    return decode_predictions(preds, top=1)[0][0][1]  # Best prediction
+    Returns the best prediction for each image, in the same order as given.
+    """
+    if not images:
+        return []
+    classifier = get_classifier()
+    preds = classifier.predict(preprocess_images(images), batch_size)
+    return classifier.decode(preds)
+
+
+def predict_class(pil_img: Image.Image) -> str:
+    """Classify an image using a classification model"""
+    return predict_classes([pil_img])[0]
@@ -0,0 +1,105 @@
+"""
+@description Registry for ML models that are loaded lazily, on first use.
+    Keeps heavy frameworks (i.e. TensorFlow) and model weights out of process
+    startup, and records how long each model took to load and its memory cost.
+"""
+
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+
+class ModelStats(BaseModel):
+    """Load statistics for a registered model."""
+
+    name: str
+    loaded: bool = False
+    load_seconds: Optional[float] = None
+    rss_delta_mb: Optional[float] = None
+
+
+def current_rss_mb() -> float:
+    """Resident memory of the current process in MB."""
+    try:
+        with Path("/proc/self/statm").open() as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, IndexError):
+        # Not on Linux; fall back to peak RSS (reported in KB)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """Lazily loads registered models, at most once per process."""
+
+    def __init__(self) -> None:
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._models: dict[str, Any] = {}
+        self._stats: dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """Registers a function that builds the model the first time it's needed."""
+        self._loaders[name] = loader
+        self._stats.setdefault(name, ModelStats(name=name))
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether a model has already been loaded into this process."""
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        """Returns a model, loading it first if this is the first use."""
+        if name in self._models:
+            return self._models[name]
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if name in self._models:
+                return self._models[name]
+
+            loader = self._loaders[name]
+            logger.info(f"Loading model: {name}")
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            rss_delta_mb = current_rss_mb() - rss_before
+
+            self._models[name] = model
+            self._stats[name] = ModelStats(
+                name=name,
+                loaded=True,
+                load_seconds=round(load_seconds, 3),
+                rss_delta_mb=round(rss_delta_mb, 1),
+            )
+            logger.info(
+                f"Loaded model {name} in {load_seconds:.2f}s (+{rss_delta_mb:.1f} MB)",
+            )
+            return model
+
+    def warmup(self, names: Optional[list[str]] = None) -> threading.Thread:
+        """Loads models in a background thread so the first request doesn't wait."""
+
+        def load_all() -> None:
+            for name in names or list(self._loaders):
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"Failed to warm up model {name}: {e}")
+
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> list[ModelStats]:
+        """Load statistics for all registered models."""
+        return list(self._stats.values())
+
+
+model_registry = ModelRegistry()
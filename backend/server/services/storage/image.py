@@ -3,6 +3,7 @@
 @requirements FR-20, FR-28, FR-31
 """
 
+import asyncio
 import io
 import uuid
 
@@ -10,64 +11,134 @@ from fastapi import UploadFile
 from loguru import logger
 from PIL import Image
 
+from server.config.settings import settings
 from server.services import db
+from server.services.storage.url_cache import signed_url_cache
+
+
+async def upload_image_content(content: bytes, content_type: str | None) -> str:
+    """Uploads image bytes to Supabase Storage API. Returns path in /images bucket."""
+    path = str(uuid.uuid4())
+    response = await db.async_supabase.storage.from_("images").upload(
+        file=content,
+        path=path,
+        file_options={"content-type": content_type or "application/octet-stream"},
+    )
+    return response.path
 
 
 async def upload_image(file: UploadFile) -> str:
     """Uploads an image to Supabase Storage API. Returns path in /images bucket."""
-    path = str(uuid.uuid4())
     image_content = await file.read()
     await file.seek(0)
-    response = db.supabase.storage.from_("images").upload(
-        file=image_content,
-        path=path,
-        file_options={"content-type": file.content_type},
+    return await upload_image_content(image_content, file.content_type)
+
+
+async def upload_images(
+    files: list[UploadFile],
+    concurrency: int = settings.storage_upload_concurrency,
+) -> list[tuple[str, bytes]]:
+    """Uploads images concurrently, with at most `concurrency` uploads at a time.
+
+    Each file is read once; its bytes are returned with its path in the /images
+    bucket (in the same order as given), so callers can reuse them. If any
+    upload fails, the images that were uploaded are deleted and the error raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(file: UploadFile) -> tuple[str, bytes]:
+        content = await file.read()
+        async with semaphore:
+            path = await upload_image_content(content, file.content_type)
+        return path, content
+
+    results = await asyncio.gather(
+        *(upload(file) for file in files),
+        return_exceptions=True,
     )
-    return response.path
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        uploaded = [result[0] for result in results if isinstance(result, tuple)]
+        if uploaded:
+            await delete_images(uploaded)
+        logger.error(f"Failed {len(errors)}/{len(files)} image uploads")
+        raise errors[0]
+    return results  # type: ignore[return-value]
 
 
-def delete_images(filenames: list[str]) -> bool:
+async def delete_images(filenames: list[str]) -> bool:
     """Uses Supabase Storage API to delete a file from /images bucket."""
-    response = db.supabase.storage.from_("images").remove(filenames)
+    signed_url_cache.invalidate(filenames)
+    response = await db.async_supabase.storage.from_("images").remove(filenames)
     return len(response) == 1
 
 
-def get_image_url(filename: str, expires_in: int = 86400) -> str:
-    """Uses Supabase Storage API to create signed url for a stored image."""
-    response = db.supabase.storage.from_("images").create_signed_url(
+async def get_image_url(filename: str, expires_in: int = 86400) -> str:
+    """Uses Supabase Storage API to create signed url for a stored image.
+
+    Reuses a cached URL for the image while it's still valid for long enough.
+    Returns an empty string if the image couldn't be signed (i.e. it's missing).
+    """
+    cached, _ = signed_url_cache.get_many([filename], expires_in)
+    if filename in cached:
+        return cached[filename]
+    response = await db.async_supabase.storage.from_("images").create_signed_url(
         filename,
         expires_in,
     )
-    return response["signedUrl"]
+    url = response["signedUrl"]
+    if url is None:
+        logger.warning(f"Failed to sign URL for image {filename}")
+        return ""
+    signed_url_cache.put_many({filename: url}, expires_in)
+    return url
 
 
-def get_bulk_image_urls(
+async def get_bulk_image_urls(
     filenames: list[str],
     expires_in: int = 86400,
 ) -> dict[str, str]:
     """Uses Supabase Storage API to create multiple signed urls in a single request.
 
-    Returns a dictionary mapping filenames to their signed URLs
+    Returns a dictionary mapping filenames to their signed URLs. Only images
+    without a cached URL (that's still valid for long enough) are signed, and
+    images that couldn't be signed (i.e. missing) are left out.
     """
-    if not filenames:
-        return {}
-    response = db.supabase.storage.from_("images").create_signed_urls(
-        filenames,
+    urls, missing = signed_url_cache.get_many(filenames, expires_in)
+    if not missing:
+        return urls
+    response = await db.async_supabase.storage.from_("images").create_signed_urls(
+        missing,
         expires_in,
     )
-    return {item["path"]: item["signedUrl"] for item in response}
-
-
-def download_images(filenames: list[str]) -> list[Image.Image]:
-    """Download multiple images from Supabase storage and return as PIL Images."""
-    images = []
-    for file in filenames:
-        try:
-            response = db.supabase.storage.from_("images").download(file)
-            image = Image.open(io.BytesIO(response)).convert("RGBA")
-            images.append(image)
-        except Exception as e:
-            logger.info(
-                f"Failed to convert image {file} from Supabase to PIL with error: {e}",
+    signed: dict[str, str] = {}
+    for item in response:
+        url = item["signedUrl"]
+        if url is None:
+            logger.warning(
+                f"Failed to sign URL for image {item['path']}: {item.get('error')}",
             )
-    return images
+            continue
+        signed[item["path"]] = url
+    signed_url_cache.put_many(signed, expires_in)
+    return urls | signed
+
+
+async def download_image(filename: str) -> Image.Image | None:
+    """Downloads an image from Supabase storage as a PIL Image (None on failure)."""
+    try:
+        response = await db.async_supabase.storage.from_("images").download(filename)
+        # Opening only reads the header; decoding happens in the conversion
+        image = Image.open(io.BytesIO(response))
+        return await asyncio.to_thread(image.convert, "RGBA")
+    except Exception as e:
+        logger.info(
+            f"Failed to convert image {filename} from Supabase to PIL with error: {e}",
+        )
+        return None
+
+
+async def download_images(filenames: list[str]) -> list[Image.Image]:
+    """Download multiple images (concurrently) from Supabase storage as PIL Images."""
+    images = await asyncio.gather(*(download_image(file) for file in filenames))
+    return [image for image in images if image is not None]
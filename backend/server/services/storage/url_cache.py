@@ -0,0 +1,137 @@
+"""
+@description In-memory cache of signed Supabase Storage URLs. Signed URLs stay
+    valid for their whole lifetime, so instead of re-signing every image on each
+    request, a URL is reused until it is close to expiring. Entries are evicted
+    least recently used first, to keep the cache under a memory budget.
+@requirements FR-20
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+from pydantic import BaseModel
+
+from server.config.settings import settings
+
+# Rough per-entry cost (in bytes) on top of the filename and URL strings: the
+# key tuple, the entry tuple and its slot in the ordered dict
+ENTRY_OVERHEAD = 300
+
+
+class CacheStats(BaseModel):
+    """Hit/miss statistics for a cache (of signed URLs, or collages)."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+    max_bytes: int = 0
+
+
+class _Entry(NamedTuple):
+    url: str
+    expires_at: float
+    size: int
+
+
+class SignedUrlCache:
+    """LRU cache of signed URLs, keyed by (filename, URL lifetime in seconds).
+
+    A URL is only returned while at least `min_remaining` seconds of it are
+    left, so clients never receive a URL about to expire. The event loop runs
+    every access to completion, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        min_remaining: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.min_remaining = min_remaining
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, int], _Entry] = OrderedDict()
+        self._expiries: set[int] = set()
+        self._size = 0
+        self._stats = CacheStats(max_bytes=max_bytes)
+
+    def get_many(
+        self,
+        filenames: list[str],
+        expires_in: int,
+    ) -> tuple[dict[str, str], list[str]]:
+        """Returns the cached URLs that are still fresh, and the filenames missing."""
+        now = self._clock()
+        found: dict[str, str] = {}
+        missing: list[str] = []
+        for filename in filenames:
+            key = (filename, expires_in)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at - now >= self.min_remaining:
+                self._entries.move_to_end(key)
+                found[filename] = entry.url
+                continue
+            if entry is not None:
+                self._remove(key)
+            missing.append(filename)
+
+        self._stats.hits += len(found)
+        self._stats.misses += len(missing)
+        return found, missing
+
+    def put_many(self, urls: dict[str, str], expires_in: int) -> None:
+        """Caches URLs that were just signed to be valid for expires_in seconds."""
+        # Only reused while min_remaining is left, so short-lived URLs never are
+        if self.max_bytes <= 0 or expires_in <= self.min_remaining:
+            return
+
+        expires_at = self._clock() + expires_in
+        self._expiries.add(expires_in)
+        for filename, url in urls.items():
+            # Files that couldn't be signed (i.e. missing) have no URL
+            if not url:
+                continue
+            key = (filename, expires_in)
+            if key in self._entries:
+                self._remove(key)
+            size = len(filename) + len(url) + ENTRY_OVERHEAD
+            self._entries[key] = _Entry(url, expires_at, size)
+            self._size += size
+
+        while self._size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self._stats.evictions += 1
+
+    def invalidate(self, filenames: list[str]) -> None:
+        """Drops the cached URLs of files, i.e. after they're deleted."""
+        for filename in filenames:
+            for expires_in in self._expiries:
+                key = (filename, expires_in)
+                if key in self._entries:
+                    self._remove(key)
+                    self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        """Drops every cached URL (statistics are kept)."""
+        self._entries.clear()
+        self._expiries.clear()
+        self._size = 0
+
+    def stats(self) -> CacheStats:
+        """Current statistics of the cache."""
+        return self._stats.model_copy(
+            update={"entries": len(self._entries), "size_bytes": self._size},
+        )
+
+    def _remove(self, key: tuple[str, int]) -> None:
+        self._size -= self._entries.pop(key).size
+
+
+signed_url_cache = SignedUrlCache(
+    max_bytes=int(settings.signed_url_cache_max_mb * 1024 * 1024),
+    min_remaining=settings.signed_url_min_remaining,
+)
@@ -0,0 +1,208 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from server.background_tasks.batch_cluster import (
+    BYTES_PER_POINT,
+    cluster_all_users,
+    iter_user_ids,
+)
+from server.services.cluster_memento.hdbscan import MementoPoints
+from server.services.cluster_memento.incremental import (
+    ClusteringModel,
+    ClusteringModelStore,
+)
+from tests.fixtures.hdbscan import make_points
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool recording the most fits it ran at once."""
+
+    def __init__(self) -> None:
+        super().__init__(4)
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Any:
+        """Runs fn in the pool, counting how many run at the same time."""
+
+        def counted() -> Any:
+            with self._lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                time.sleep(0.01)
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        return super().submit(counted)
+
+
+@pytest.mark.asyncio
+async def test_iter_user_ids_pages() -> None:
+    """Test users are fetched a page at a time, after the last of the previous page."""
+    # Given
+    user_ids = [uuid.UUID(int=i) for i in range(1, 6)]
+    get_user_ids = AsyncMock(side_effect=[user_ids[:2], user_ids[2:4], user_ids[4:]])
+
+    with patch("server.background_tasks.batch_cluster.get_user_ids", get_user_ids):
+        # When
+        result = [user_id async for user_id in iter_user_ids(page_size=2)]
+
+    # Then
+    assert result == user_ids
+    assert [c.kwargs["after_id"] for c in get_user_ids.call_args_list] == [
+        None,
+        user_ids[1],
+        user_ids[3],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cluster_all_users(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test every user with enough mementos gets a persisted model."""
+    # Given
+    user_ids = [uuid.uuid4() for _ in range(3)]
+    points = {
+        user_ids[0]: two_city_points,
+        user_ids[1]: make_points(1, 37.77, -122.42, 2),
+        user_ids[2]: two_city_points,
+    }
+    store = ClusteringModelStore(directory=tmp_path)
+    executor = ThreadPoolExecutor(2)
+
+    with patch(
+        "server.background_tasks.batch_cluster.get_user_ids",
+        AsyncMock(return_value=user_ids),
+    ), patch(
+        "server.background_tasks.batch_cluster.get_mementos_for_clustering",
+        AsyncMock(side_effect=lambda user_id: points[user_id]),
+    ), patch(
+        "server.background_tasks.batch_cluster.model_store",
+        store,
+    ), executor:
+        # When
+        report = await cluster_all_users(executor, page_size=10)
+
+    # Then
+    assert (report.clustered, report.skipped, report.failed) == (2, 1, 0)
+    assert report.mementos == 20
+    assert report.throughput > 0
+    assert 0 < report.p50_ms <= report.p99_ms <= report.max_ms
+    model = store.load(user_ids[0])
+    assert model is not None
+    assert sorted(model.clusters().values()) == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
+    assert store.load(user_ids[1]) is None
+
+
+@pytest.mark.asyncio
+async def test_cluster_all_users_edited_while_fitting(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test a model isn't saved if the API invalidated it in the middle of its fit."""
+    # Given
+    user_id = uuid.uuid4()
+    store = ClusteringModelStore(directory=tmp_path, max_cached=0)
+    api_store = ClusteringModelStore(directory=tmp_path)
+
+    def fit_while_edited(points: MementoPoints, min_cluster_size: int) -> Any:
+        model = ClusteringModel(points, min_cluster_size)
+        api_store.invalidate(user_id)
+        return model
+
+    executor = ThreadPoolExecutor(1)
+    with patch(
+        "server.background_tasks.batch_cluster.get_user_ids",
+        AsyncMock(return_value=[user_id]),
+    ), patch(
+        "server.background_tasks.batch_cluster.get_mementos_for_clustering",
+        AsyncMock(return_value=two_city_points),
+    ), patch(
+        "server.background_tasks.batch_cluster.model_store",
+        store,
+    ), patch(
+        "server.background_tasks.batch_cluster.ClusteringModel",
+        fit_while_edited,
+    ), executor:
+        # When
+        report = await cluster_all_users(executor, page_size=10)
+
+    # Then
+    assert (report.clustered, report.invalidated, report.failed) == (0, 1, 0)
+    assert api_store.load(user_id) is None
+    assert store.load(user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_cluster_all_users_memory_ceiling(
+    two_city_points: MementoPoints,
+) -> None:
+    """Test users are fit one at a time when two would go over the memory ceiling."""
+    # Given
+    user_ids = [uuid.uuid4() for _ in range(4)]
+    executor = CountingExecutor()
+    fit_mb = len(two_city_points.ids) * BYTES_PER_POINT / 1024 / 1024
+
+    with patch(
+        "server.background_tasks.batch_cluster.get_user_ids",
+        AsyncMock(return_value=user_ids),
+    ), patch(
+        "server.background_tasks.batch_cluster.get_mementos_for_clustering",
+        AsyncMock(return_value=two_city_points),
+    ), patch(
+        "server.background_tasks.batch_cluster.fit_user_model",
+        lambda *_: 0.0,
+    ), executor:
+        # When
+        report = await cluster_all_users(
+            executor,
+            page_size=10,
+            max_memory_mb=fit_mb * 1.5,
+        )
+
+    # Then
+    assert report.clustered == 4
+    assert executor.max_running == 1
+
+
+@pytest.mark.asyncio
+async def test_cluster_all_users_failure(two_city_points: MementoPoints) -> None:
+    """Test a failing user is counted, without stopping the others."""
+    # Given
+    user_ids = [uuid.uuid4() for _ in range(2)]
+
+    def fit(user_id: uuid.UUID, _: MementoPoints, __: int) -> float:
+        if user_id == user_ids[0]:
+            raise RuntimeError("Disk full")
+        return 0.5
+
+    executor = ThreadPoolExecutor(2)
+    with patch(
+        "server.background_tasks.batch_cluster.get_user_ids",
+        AsyncMock(return_value=user_ids),
+    ), patch(
+        "server.background_tasks.batch_cluster.get_mementos_for_clustering",
+        AsyncMock(return_value=two_city_points),
+    ), patch(
+        "server.background_tasks.batch_cluster.fit_user_model",
+        fit,
+    ), executor:
+        # When
+        report = await cluster_all_users(executor, page_size=10)
+
+    # Then
+    assert (report.clustered, report.failed) == (1, 1)
+    assert report.max_ms == 500
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from server.background_tasks.process_image import (
+    ImageProcessingWorker,
+    load_classifier,
+)
+
+
+@pytest.mark.asyncio
+async def test_worker_batches_jobs(mock_pil_image: MagicMock) -> None:
+    """Test that queued images are classified in batches and results stored."""
+    # Given
+    worker = ImageProcessingWorker(batch_size=2, batch_wait=0.1)
+    jobs = [(mock_pil_image, f"image{i}") for i in range(3)]
+
+    with patch(
+        "server.background_tasks.process_image.extract_text",
+        return_value="some text",
+    ), patch(
+        "server.background_tasks.process_image.predict_classes",
+        side_effect=lambda images: ["dog"] * len(images),
+    ) as mock_classify, patch(
+        "server.background_tasks.process_image.update_images_bulk",
+    ) as mock_update:
+        worker.start(executor=ThreadPoolExecutor(max_workers=2))
+
+        # When
+        await worker.enqueue(jobs)
+        await worker.join()
+        await worker.stop()
+
+    # Then
+    assert [len(c.args[0]) for c in mock_classify.call_args_list] == [2, 1]
+    # One DB request per batch
+    updates = {"detected_text": "some text", "image_label": "dog"}
+    mock_update.assert_has_calls(
+        [
+            call({"image0": updates, "image1": updates}),
+            call({"image2": updates}),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_ocr_failure_keeps_label(mock_pil_image: MagicMock) -> None:
+    """Test that a failed OCR task still stores the predicted label."""
+    # Given
+    worker = ImageProcessingWorker(batch_size=4, batch_wait=0)
+
+    with patch(
+        "server.background_tasks.process_image.extract_text",
+        side_effect=Exception("tesseract not found"),
+    ), patch(
+        "server.background_tasks.process_image.predict_classes",
+        return_value=["cat"],
+    ), patch(
+        "server.background_tasks.process_image.update_images_bulk",
+    ) as mock_update:
+        worker.start(executor=ThreadPoolExecutor(max_workers=1))
+
+        # When
+        await worker.enqueue([(mock_pil_image, "image")])
+        await worker.join()
+        await worker.stop()
+
+    # Then
+    mock_update.assert_called_once_with({"image": {"image_label": "cat"}})
+
+
+@pytest.mark.asyncio
+async def test_worker_stop() -> None:
+    """Test stopping the worker cancels the dispatcher and releases the pool."""
+    # Given
+    worker = ImageProcessingWorker()
+    executor = MagicMock()
+    worker.start(executor=executor)
+    assert worker.running
+
+    # When
+    await worker.stop()
+
+    # Then
+    assert not worker.running
+    executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("warmup", [True, False])
+async def test_worker_pool_warmup(warmup: bool) -> None:
+    """Test pool processes load the classifier as they start, if warming up."""
+    # Given
+    worker = ImageProcessingWorker(processes=3)
+
+    with patch(
+        "server.background_tasks.process_image.settings.warmup_models",
+        warmup,
+    ), patch(
+        "server.background_tasks.process_image.ProcessPoolExecutor",
+    ) as mock_pool:
+        # When
+        worker.start()
+        await worker.stop()
+
+    # Then
+    initializer = mock_pool.call_args.kwargs["initializer"]
+    submitted = mock_pool.return_value.submit.call_args_list
+    if warmup:
+        assert initializer is load_classifier
+        # Every process spawned upfront
+        assert submitted == [call(load_classifier)] * 3
+    else:
+        assert initializer is None
+        assert submitted == []
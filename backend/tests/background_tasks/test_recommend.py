@@ -0,0 +1,248 @@
+import asyncio
+import uuid
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from server.background_tasks.recommend import (
+    RecommendationScheduler,
+    cluster_user_mementos,
+)
+from server.services.cluster_memento.hdbscan import MementoPoints
+from server.services.cluster_memento.incremental import ClusteringModelStore
+from tests.fixtures.hdbscan import USER_ID, make_points
+
+
+@pytest.mark.asyncio
+async def test_cluster_user_mementos_incremental(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test the first run fits a model, and later runs only fetch new mementos."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+    new_points = make_points(11, 37.771, -122.421, 1)
+    no_points = make_points(12, 0, 0, 0)
+    fetch = AsyncMock(side_effect=[two_city_points, new_points, no_points])
+
+    with patch(
+        "server.background_tasks.recommend.clustering_models",
+        store,
+    ), patch(
+        "server.background_tasks.recommend.get_mementos_for_clustering",
+        fetch,
+    ):
+        # When
+        first = await cluster_user_mementos(USER_ID)
+        second = await cluster_user_mementos(USER_ID)
+        third = await cluster_user_mementos(USER_ID)
+
+    # Then
+    assert sorted(first.values()) == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
+    assert sorted(second.values()) == [[1, 2, 3, 4, 5, 11], [6, 7, 8, 9, 10]]
+    assert third == second
+    assert [c.kwargs for c in fetch.call_args_list] == [
+        {},
+        {"after_id": 10},
+        {"after_id": 11},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cluster_user_mementos_refit(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test new mementos outside every cluster lead to a full refit."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+    tokyo = make_points(11, 35.68, 139.69, 5)
+    all_points = MementoPoints(
+        *(np.concatenate(columns) for columns in zip(two_city_points, tokyo)),
+    )
+    fetch = AsyncMock(side_effect=[two_city_points, tokyo, all_points])
+
+    with patch(
+        "server.background_tasks.recommend.clustering_models",
+        store,
+    ), patch(
+        "server.background_tasks.recommend.get_mementos_for_clustering",
+        fetch,
+    ):
+        # When
+        await cluster_user_mementos(USER_ID)
+        result = await cluster_user_mementos(USER_ID)
+
+    # Then
+    assert fetch.call_count == 3
+    assert [11, 12, 13, 14, 15] in result.values()
+    model = store.load(USER_ID)
+    assert model is not None
+    assert model.new_count == 0
+
+
+@pytest.mark.asyncio
+async def test_cluster_user_mementos_edited_while_clustering(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test a model fit from mementos edited meanwhile isn't saved."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+
+    def fetch_then_edit(*_: object, **__: object) -> MementoPoints:
+        store.invalidate(USER_ID)
+        return two_city_points
+
+    with patch(
+        "server.background_tasks.recommend.clustering_models",
+        store,
+    ), patch(
+        "server.background_tasks.recommend.get_mementos_for_clustering",
+        AsyncMock(side_effect=fetch_then_edit),
+    ):
+        # When
+        result = await cluster_user_mementos(USER_ID)
+
+    # Then
+    assert sorted(result.values()) == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
+    assert store.load(USER_ID) is None
+
+
+@pytest.mark.asyncio
+async def test_cluster_user_mementos_too_few(tmp_path: Path) -> None:
+    """Test no model is kept for users with fewer mementos than a cluster."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+
+    with patch(
+        "server.background_tasks.recommend.clustering_models",
+        store,
+    ), patch(
+        "server.background_tasks.recommend.get_mementos_for_clustering",
+        AsyncMock(return_value=make_points(1, 37.77, -122.42, 2)),
+    ):
+        # When
+        result = await cluster_user_mementos(USER_ID)
+
+    # Then
+    assert result == {}
+    assert store.load(USER_ID) is None
+
+
+@pytest.mark.asyncio
+async def test_scheduler_coalesces_requests() -> None:
+    """Test a burst of requests from a user runs a single job, after the window."""
+    # Given
+    job = AsyncMock()
+    scheduler = RecommendationScheduler(job, debounce=0.05, max_delay=1)
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+
+    # When
+    for _ in range(10):
+        scheduler.schedule(user_id)
+    scheduler.schedule(other_user_id)
+
+    # Then (nothing runs during the debounce window)
+    stats = scheduler.stats()
+    assert stats.queued == 2
+    assert stats.requested == 11
+    assert stats.coalesced == 9
+    job.assert_not_awaited()
+
+    # When
+    await scheduler.join()
+
+    # Then
+    assert sorted(c.args[0] for c in job.await_args_list) == sorted(
+        [user_id, other_user_id],
+    )
+    stats = scheduler.stats()
+    assert (stats.queued, stats.running, stats.completed) == (0, 0, 2)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_one_job_per_user() -> None:
+    """Test requests during a user's job run one follow-up job, not a concurrent one."""
+    # Given
+    running = 0
+    max_running = 0
+
+    async def job(_: uuid.UUID) -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    scheduler = RecommendationScheduler(job, debounce=0, max_delay=0)
+    user_id = uuid.uuid4()
+
+    # When
+    scheduler.schedule(user_id)
+    await asyncio.sleep(0.01)  # first job is running
+    assert scheduler.stats().running == 1
+    scheduler.schedule(user_id)
+    scheduler.schedule(user_id)
+    await scheduler.join()
+
+    # Then
+    assert max_running == 1
+    stats = scheduler.stats()
+    assert stats.completed == 2
+    assert stats.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_max_delay() -> None:
+    """Test a steady stream of requests can't postpone a job past max_delay."""
+    # Given
+    job = AsyncMock()
+    scheduler = RecommendationScheduler(job, debounce=0.05, max_delay=0.1)
+    user_id = uuid.uuid4()
+
+    # When (requests keep arriving within the debounce window)
+    for _ in range(8):
+        scheduler.schedule(user_id)
+        await asyncio.sleep(0.03)
+
+    # Then
+    assert job.await_count >= 1
+    await scheduler.join()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_job_failure() -> None:
+    """Test a failed job is counted, and doesn't stop later jobs for the user."""
+    # Given
+    job = AsyncMock(side_effect=[RuntimeError("boom"), None])
+    scheduler = RecommendationScheduler(job, debounce=0, max_delay=0)
+    user_id = uuid.uuid4()
+
+    # When
+    scheduler.schedule(user_id)
+    await scheduler.join()
+    scheduler.schedule(user_id)
+    await scheduler.join()
+
+    # Then
+    stats = scheduler.stats()
+    assert (stats.failed, stats.completed) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stop() -> None:
+    """Test stopping cancels queued jobs."""
+    # Given
+    job = AsyncMock()
+    scheduler = RecommendationScheduler(job, debounce=10, max_delay=10)
+    scheduler.schedule(uuid.uuid4())
+
+    # When
+    await scheduler.stop()
+
+    # Then
+    job.assert_not_awaited()
+    assert scheduler.stats().queued == 0
@@ -2,9 +2,10 @@ import uuid
 from unittest.mock import MagicMock, patch
 
 import numpy as np
+import pytest
 
 from server.api.memento.models import MementoWithCoordinates
-from server.services.cluster_memento.hdbscan import cluster_mementos
+from server.services.cluster_memento.hdbscan import MementoPoints, cluster_mementos
 from server.services.db.models.gis import Coordinates
 
 
@@ -125,3 +126,87 @@ def test_cluster_mementos_logging(
     # Then
     # Verify debug logs were called
     assert mock_logger.debug.call_count == 3
+
+
+def test_cluster_mementos_haversine(
+    sample_mementos: list[MementoWithCoordinates],
+) -> None:
+    """Test clustering by great-circle distance finds the same nearby groups."""
+    # When
+    result = cluster_mementos(sample_mementos, min_cluster_size=2, metric="haversine")
+
+    # Then
+    assert [1, 2, 3] in result.values()
+    assert all(6 not in memento_ids for memento_ids in result.values())
+
+
+@patch("server.services.cluster_memento.hdbscan.HDBSCAN")
+def test_cluster_mementos_haversine_parameters(
+    mock_hdbscan: MagicMock,
+    sample_mementos: list[MementoWithCoordinates],
+) -> None:
+    """Test the haversine mode uses a BallTree, on radians, with a km threshold."""
+    # Given
+    mock_hdbscan.return_value.fit_predict.return_value = np.zeros(6, dtype=int)
+
+    # When
+    cluster_mementos(
+        sample_mementos,
+        min_cluster_size=2,
+        metric="haversine",
+        cluster_selection_km=100,
+    )
+
+    # Then
+    kwargs = mock_hdbscan.call_args.kwargs
+    assert kwargs["metric"] == "haversine"
+    assert kwargs["algorithm"] == "boruvka_balltree"
+    assert kwargs["cluster_selection_epsilon"] == pytest.approx(100 / 6371.0088)
+    (coordinates,) = mock_hdbscan.return_value.fit_predict.call_args.args
+    assert coordinates[0] == pytest.approx(np.radians([37.7749, -122.4194]))
+
+
+def test_cluster_mementos_selection_km_needs_haversine(
+    sample_mementos: list[MementoWithCoordinates],
+) -> None:
+    """Test a km threshold is rejected for standardized (unitless) coordinates."""
+    with pytest.raises(ValueError, match="haversine"):
+        cluster_mementos(sample_mementos, min_cluster_size=2, cluster_selection_km=5)
+
+
+def test_cluster_mementos_haversine_merges_within_km(
+    sample_mementos: list[MementoWithCoordinates],
+) -> None:
+    """Test clusters closer than cluster_selection_km are merged."""
+    # Given (a second group ~10 km from the San Francisco one)
+    nearby = [
+        MementoWithCoordinates(
+            id=10 + i,
+            user_id=uuid.UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8"),
+            coordinates=Coordinates(lat=37.8649 + i * 1e-4, long=-122.4194),
+        )
+        for i in range(3)
+    ]
+    mementos = sample_mementos[:3] + nearby + sample_mementos[3:]
+
+    # When
+    apart = cluster_mementos(mementos, min_cluster_size=2, metric="haversine")
+    merged = cluster_mementos(
+        mementos,
+        min_cluster_size=2,
+        metric="haversine",
+        cluster_selection_km=50,
+    )
+
+    # Then
+    assert [1, 2, 3] in apart.values()
+    assert [1, 2, 3, 10, 11, 12] in merged.values()
+
+
+def test_cluster_mementos_points(two_city_points: MementoPoints) -> None:
+    """Test mementos can be clustered from columns of IDs and coordinates."""
+    # When
+    result = cluster_mementos(two_city_points, min_cluster_size=3)
+
+    # Then
+    assert sorted(result.values()) == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
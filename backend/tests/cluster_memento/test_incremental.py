@@ -0,0 +1,180 @@
+import uuid
+from pathlib import Path
+
+from server.services.cluster_memento.hdbscan import MementoPoints
+from server.services.cluster_memento.incremental import (
+    ClusteringModel,
+    ClusteringModelStore,
+)
+from tests.fixtures.hdbscan import USER_ID, make_points
+
+
+def test_fit(two_city_points: MementoPoints) -> None:
+    """Test fitting finds the clusters of the given mementos."""
+    # When
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # Then
+    clusters = sorted(model.clusters().values())
+    assert clusters == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]]
+    assert model.last_memento_id == 10
+    assert not model.needs_refit()
+
+
+def test_add_places_into_clusters(
+    two_city_points: MementoPoints,
+) -> None:
+    """Test new mementos join the existing cluster they're near, without a refit."""
+    # Given
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # When
+    added = model.add(make_points(11, 37.771, -122.421, 2))
+
+    # Then
+    assert added
+    san_francisco = next(ids for ids in model.clusters().values() if 1 in ids)
+    assert {11, 12} <= set(san_francisco)
+    assert model.last_memento_id == 12
+    assert model.new_count == 2
+    assert model.new_noise_count == 0
+
+
+def test_add_skips_known_mementos(
+    two_city_points: MementoPoints,
+) -> None:
+    """Test mementos the model already has aren't added again."""
+    # Given
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # When
+    added = model.add(
+        MementoPoints(two_city_points.ids[-2:], two_city_points.coordinates[-2:]),
+    )
+
+    # Then
+    assert not added
+    assert model.new_count == 0
+    assert len(model.memento_ids) == 10
+
+
+def test_needs_refit_after_new_points(
+    two_city_points: MementoPoints,
+) -> None:
+    """Test a refit is needed once enough mementos were added since the fit."""
+    # Given
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # When
+    model.add(make_points(11, 37.771, -122.421, 4))
+
+    # Then
+    assert not model.needs_refit(refit_points=5)
+    assert model.needs_refit(refit_points=4)
+
+
+def test_needs_refit_on_drift(
+    two_city_points: MementoPoints,
+) -> None:
+    """Test a refit is needed once new mementos fall outside every cluster."""
+    # Given
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # When (a new group of mementos in Tokyo)
+    model.add(make_points(11, 35.68, 139.69, 3))
+
+    # Then
+    assert model.new_noise_count == 3
+    assert model.needs_refit(refit_points=100, drift_noise_ratio=0.5)
+
+
+def test_store_round_trip(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test saved models are loaded back, from memory while the file is unchanged."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # Then
+    assert store.load(USER_ID) is None
+
+    # When
+    store.save(USER_ID, model)
+
+    # Then
+    assert store.load(USER_ID) is model
+
+    # When (loaded by another process)
+    loaded = ClusteringModelStore(directory=tmp_path).load(USER_ID)
+
+    # Then
+    assert loaded is not None
+    assert loaded.clusters() == model.clusters()
+    assert loaded.add(make_points(11, 37.771, -122.421, 1))
+
+
+def test_store_invalidate(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test invalidated models are gone for every process."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+    store.save(USER_ID, ClusteringModel(two_city_points, min_cluster_size=3))
+
+    # When
+    store.invalidate(USER_ID)
+
+    # Then
+    assert store.load(USER_ID) is None
+    assert [path.name for path in tmp_path.iterdir()] == [f"{USER_ID}.generation"]
+
+
+def test_store_save_after_invalidate(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test a model fit before any worker invalidated the user's model isn't saved."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path)
+    other_worker = ClusteringModelStore(directory=tmp_path)
+    generation = store.generation(USER_ID)
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+
+    # When (mementos edited in another worker while the model was being fit)
+    other_worker.invalidate(USER_ID)
+    saved = store.save(USER_ID, model, generation)
+
+    # Then
+    assert not saved
+    assert store.load(USER_ID) is None
+    assert [path.name for path in tmp_path.iterdir()] == [f"{USER_ID}.generation"]
+
+    # When (fit again, after the edit)
+    saved = store.save(USER_ID, model, store.generation(USER_ID))
+
+    # Then
+    assert saved
+    assert store.load(USER_ID) is model
+
+
+def test_store_cache_bounded(
+    tmp_path: Path,
+    two_city_points: MementoPoints,
+) -> None:
+    """Test only the most recently used models are kept in memory."""
+    # Given
+    store = ClusteringModelStore(directory=tmp_path, max_cached=1)
+    model = ClusteringModel(two_city_points, min_cluster_size=3)
+    other_user = uuid.uuid4()
+
+    # When
+    store.save(USER_ID, model)
+    store.save(other_user, model)
+
+    # Then (the first model is reloaded from disk)
+    reloaded = store.load(USER_ID)
+    assert reloaded is not None
+    assert reloaded is not model
@@ -0,0 +1,19 @@
+import pytest
+from pydantic import ValidationError
+
+from server.config.settings import Settings
+
+
+def test_clustering_selection_km_needs_haversine() -> None:
+    """Test a km selection threshold with the euclidean metric fails at startup."""
+    with pytest.raises(ValidationError, match="CLUSTERING_METRIC=haversine"):
+        Settings(clustering_metric="euclidean", clustering_selection_km=20)
+
+
+def test_clustering_selection_km_haversine() -> None:
+    """Test a km selection threshold is accepted with the haversine metric."""
+    # When
+    settings = Settings(clustering_metric="haversine", clustering_selection_km=20)
+
+    # Then
+    assert settings.clustering_selection_km == 20
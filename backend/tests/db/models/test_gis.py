@@ -2,6 +2,7 @@ import binascii
 from typing import Any
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 from shapely.geometry import Point
 
@@ -9,6 +10,7 @@ from server.services.db.models.gis import (
     BaseWithCoordinates,
     Coordinates,
     CoordinatesInsert,
+    points_from_postgis_binary,
 )
 
 
@@ -181,3 +183,30 @@ class TestCoordinatesInsert:
         assert "coordinates" in result
         assert result["coordinates"] == {"lat": 1, "long": 2}
         assert result["name"] == "test"
+
+
+class TestPointsFromPostgisBinary:
+    """Test suite for decoding PostGIS binary hex strings as columns."""
+
+    def test_matches_coordinates(self, postgis_hex: str) -> None:
+        """Test each point is decoded the same as Coordinates.from_postgis_binary."""
+        coords = Coordinates.from_postgis_binary(postgis_hex)
+
+        result = points_from_postgis_binary([postgis_hex, postgis_hex])
+
+        assert result.shape == (2, 2)
+        assert result.dtype == np.float64
+        np.testing.assert_array_equal(result[0], [coords.lat, coords.long])
+
+    def test_invalid_values_are_nan(self, postgis_hex: str) -> None:
+        """Test values that aren't valid points decode to NaN rows."""
+        line = Point(0, 0).buffer(1).exterior.wkb_hex
+
+        result = points_from_postgis_binary([None, "invalid_hex", line, postgis_hex])
+
+        assert np.isnan(result[:3]).all()
+        assert not np.isnan(result[3]).any()
+
+    def test_empty(self) -> None:
+        """Test no values decode to an empty (0, 2) array."""
+        assert points_from_postgis_binary([]).shape == (0, 2)
@@ -0,0 +1,53 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from server.services import db
+
+
+@pytest.mark.asyncio
+async def test_create_http_client() -> None:
+    """Test the connection pool is configured from settings."""
+    # Given
+    with patch.multiple(
+        "server.services.db.settings",
+        supabase_max_connections=7,
+        supabase_max_keepalive_connections=3,
+        supabase_keepalive_expiry=5,
+        supabase_timeout=12,
+    ):
+        # When
+        client = db.create_http_client()
+
+    # Then
+    assert isinstance(client, httpx.AsyncClient)
+    pool = client._transport._pool  # noqa: SLF001
+    assert pool._max_connections == 7  # noqa: SLF001
+    assert pool._max_keepalive_connections == 3  # noqa: SLF001
+    assert pool._keepalive_expiry == 5  # noqa: SLF001
+    assert client.timeout == httpx.Timeout(12)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_close() -> None:
+    """Test closing the async client closes its connection pool."""
+    # Given
+    mock_client = MagicMock()
+    mock_client.options.httpx_client.aclose = AsyncMock()
+
+    with patch("server.services.db.async_supabase", mock_client):
+        # When
+        await db.close()
+
+    # Then
+    mock_client.options.httpx_client.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_close_without_client() -> None:
+    """Test closing is a no-op when there is no client (i.e. no credentials)."""
+    with patch("server.services.db.async_supabase", None):
+        # When / Then
+        await db.close()
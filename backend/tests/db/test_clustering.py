@@ -1,46 +1,46 @@
 from uuid import UUID
 
-from server.api.memento.models import MementoWithCoordinates
+import numpy as np
+import pytest
+from shapely.geometry import Point
+
+from server.services.cluster_memento.hdbscan import MementoPoints
+from server.services.db.models.gis import Coordinates
 from server.services.db.models.schema_public_latest import (
     RejectedRecommendations,
     RejectedRecommendationsInsert,
 )
 from server.services.db.queries.clustering import (
     create_rejected_collection,
+    filter_rejected_collections,
     get_mementos_for_clustering,
     is_collection_rejected,
 )
 from tests.fixtures.supabase import MockSupabase
 
 
-def test_get_mementos_for_clustering(mock_supabase: MockSupabase) -> None:
-    """Test retrieving mementos with coordinates for a specific user ID."""
+@pytest.mark.asyncio
+async def test_get_mementos_for_clustering(
+    mock_supabase: MockSupabase,
+    postgis_hex: str,
+) -> None:
+    """Test retrieving the IDs and coordinates of a user's mementos as columns."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
     # Given
     user_id = UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8")
-    mock_memento_data = [
-        {
-            "user_id": str(user_id),
-            "id": 1,
-            "coordinates": {"lat": 37.7749, "long": -122.4194},
-        },
-        {
-            "user_id": str(user_id),
-            "id": 2,
-            "coordinates": {"lat": 40.7128, "long": -74.0060},
-        },
+    new_york = Point(-74.0060, 40.7128).wkb_hex
+    mock_query_response.data = [
+        {"id": 1, "coordinates": postgis_hex},
+        {"id": 2, "coordinates": new_york},
     ]
-    mock_query_response.data = mock_memento_data
 
     # When
-    result = get_mementos_for_clustering(user_id)
+    result = await get_mementos_for_clustering(user_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("memento")
-    mock_supabase_client.table().select.assert_called_once_with(
-        "user_id, id, coordinates",
-    )
+    mock_supabase_client.table().select.assert_called_once_with("id, coordinates")
     mock_supabase_client.table().select().eq.assert_called_once_with(
         "user_id",
         str(user_id),
@@ -50,17 +50,41 @@ def test_get_mementos_for_clustering(mock_supabase: MockSupabase) -> None:
         None,
     )
 
-    assert len(result) == 2
-    assert all(isinstance(item, MementoWithCoordinates) for item in result)
-    assert result[0].id == 1
-    assert result[0].coordinates.lat == 37.7749
-    assert result[0].coordinates.long == -122.4194
-    assert result[1].id == 2
-    assert result[1].coordinates.lat == 40.7128
-    assert result[1].coordinates.long == -74.0060
+    assert isinstance(result, MementoPoints)
+    assert result.ids.tolist() == [1, 2]
+    coordinates = Coordinates.from_postgis_binary(postgis_hex)
+    np.testing.assert_allclose(
+        result.coordinates,
+        [[coordinates.lat, coordinates.long], [40.7128, -74.0060]],
+    )
 
 
-def test_create_rejected_collection(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_get_mementos_for_clustering_skips_invalid(
+    mock_supabase: MockSupabase,
+    postgis_hex: str,
+) -> None:
+    """Test mementos whose coordinates can't be decoded are left out."""
+    _, mock_query_response, _ = mock_supabase
+
+    # Given
+    mock_query_response.data = [
+        {"id": 1, "coordinates": "invalid_hex"},
+        {"id": 2, "coordinates": postgis_hex},
+    ]
+
+    # When
+    result = await get_mementos_for_clustering(
+        UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8"),
+    )
+
+    # Then
+    assert result.ids.tolist() == [2]
+    assert result.coordinates.shape == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_create_rejected_collection(mock_supabase: MockSupabase) -> None:
     """Test creating a rejected collection in the database."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
@@ -81,7 +105,7 @@ def test_create_rejected_collection(mock_supabase: MockSupabase) -> None:
     mock_query_response.data = [expected_response]
 
     # When
-    result = create_rejected_collection(user_id, rejected_recommendation)
+    result = await create_rejected_collection(user_id, rejected_recommendation)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("rejected_recommendations")
@@ -98,7 +122,8 @@ def test_create_rejected_collection(mock_supabase: MockSupabase) -> None:
     assert result.memento_ids == memento_ids
 
 
-def test_is_collection_rejected_true(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_is_collection_rejected_true(mock_supabase: MockSupabase) -> None:
     """Test checking if a collection has been rejected (true case)."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
@@ -110,7 +135,7 @@ def test_is_collection_rejected_true(mock_supabase: MockSupabase) -> None:
     mock_query_response.data = [{"id": 1}]
 
     # When
-    result = is_collection_rejected(user_id, memento_ids)
+    result = await is_collection_rejected(user_id, memento_ids)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("rejected_recommendations")
@@ -126,7 +151,8 @@ def test_is_collection_rejected_true(mock_supabase: MockSupabase) -> None:
     assert result is True
 
 
-def test_is_collection_rejected_false(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_is_collection_rejected_false(mock_supabase: MockSupabase) -> None:
     """Test checking if a collection has been rejected (false case)."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
@@ -138,7 +164,7 @@ def test_is_collection_rejected_false(mock_supabase: MockSupabase) -> None:
     mock_query_response.data = []
 
     # When
-    result = is_collection_rejected(user_id, memento_ids)
+    result = await is_collection_rejected(user_id, memento_ids)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("rejected_recommendations")
@@ -152,3 +178,44 @@ def test_is_collection_rejected_false(mock_supabase: MockSupabase) -> None:
     assert ("user_id", "eq", str(user_id)) in filter_calls
     assert ("memento_ids", "cs", pg_array) in filter_calls
     assert result is False
+
+
+@pytest.mark.asyncio
+async def test_filter_rejected_collections(mock_supabase: MockSupabase) -> None:
+    """Test every candidate collection is checked against rejections in one query."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    user_id = UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8")
+    collections = [[1, 2, 3], [4, 5], [6, 7, 8]]
+
+    # Rejections sharing a memento with a candidate
+    mock_query_response.data = [
+        {"memento_ids": [0, 1, 2, 3]},  # contains all of [1, 2, 3]
+        {"memento_ids": [4, 9]},  # only part of [4, 5]
+    ]
+
+    # When
+    result = await filter_rejected_collections(user_id, collections)
+
+    # Then
+    mock_supabase_client.table.assert_called_once_with("rejected_recommendations")
+    query = mock_supabase_client.table().select()
+    query.execute.assert_awaited_once()
+    filter_calls = [call[0] for call in query.filter.call_args_list]
+    assert ("user_id", "eq", str(user_id)) in filter_calls
+    assert ("memento_ids", "ov", "{1,2,3,4,5,6,7,8}") in filter_calls
+    assert result == [[4, 5], [6, 7, 8]]
+
+
+@pytest.mark.asyncio
+async def test_filter_rejected_collections_empty(mock_supabase: MockSupabase) -> None:
+    """Test no query is made without candidate collections."""
+    mock_supabase_client, _, _ = mock_supabase
+
+    # When
+    result = await filter_rejected_collections(UUID(int=0), [])
+
+    # Then
+    mock_supabase_client.table.assert_not_called()
+    assert result == []
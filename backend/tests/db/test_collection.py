@@ -1,4 +1,6 @@
-from unittest.mock import call
+from unittest.mock import AsyncMock, call
+
+import pytest
 
 from server.api.collection.models import NewCollection, UpdateCollection
 from server.services.db.models.schema_public_latest import (
@@ -22,7 +24,8 @@ from server.services.db.queries.collection import (
 from tests.fixtures.supabase import MockSupabase
 
 
-def test_create_collection(
+@pytest.mark.asyncio
+async def test_create_collection(
     mock_supabase: MockSupabase,
     collection_data: dict,
     expected_collection_data: dict,
@@ -35,7 +38,7 @@ def test_create_collection(
     mock_query_response.data = [expected_collection_data]
 
     # When
-    result = create_collection(mock_collection, collection_data["user_id"])
+    result = await create_collection(mock_collection, collection_data["user_id"])
 
     # Then
     mock_supabase_client.table.assert_called_once_with("collection")
@@ -47,7 +50,8 @@ def test_create_collection(
     assert result.user_id == collection_data["user_id"]
 
 
-def test_update_collection(
+@pytest.mark.asyncio
+async def test_update_collection(
     mock_supabase: MockSupabase,
     collection_data: dict,
     expected_collection_data: dict,
@@ -70,7 +74,7 @@ def test_update_collection(
     mock_query_response.data = [updated_expected]
 
     # When
-    result = update_collection(collection_data["id"], mock_collection)
+    result = await update_collection(collection_data["id"], mock_collection)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("collection")
@@ -82,7 +86,8 @@ def test_update_collection(
     assert result.user_id == mock_collection.user_id
 
 
-def test_get_collection(
+@pytest.mark.asyncio
+async def test_get_collection(
     mock_supabase: MockSupabase,
     expected_collection_data: dict,
 ) -> None:
@@ -98,10 +103,10 @@ def test_get_collection(
     mock_supabase_client.select.return_value = mock_supabase_client
     mock_supabase_client.eq.return_value = mock_supabase_client
     mock_supabase_client.single.return_value = mock_supabase_client
-    mock_supabase_client.execute.return_value = mock_query_response
+    mock_supabase_client.execute = AsyncMock(return_value=mock_query_response)
 
     # When
-    result = get_collection(collection_id)
+    result = await get_collection(collection_id)
 
     # Then
     mock_supabase_client.from_.assert_called_once_with("collection")
@@ -112,7 +117,8 @@ def test_get_collection(
     assert result.title == expected_collection_data["title"]
 
 
-def test_get_collections(
+@pytest.mark.asyncio
+async def test_get_collections(
     mock_supabase: MockSupabase,
     collection_data: dict,
     collections_with_mementos_data: list[dict],
@@ -125,7 +131,7 @@ def test_get_collections(
     mock_query_response.data = collections_with_mementos_data
 
     # When
-    result = get_collections(user_id)
+    result = await get_collections(user_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("collection")
@@ -145,7 +151,8 @@ def test_get_collections(
     assert len(result[1].mementos) == 1
 
 
-def test_get_has_mementos(
+@pytest.mark.asyncio
+async def test_get_has_mementos(
     mock_supabase: MockSupabase,
     collection_data: dict,
     associated_memento_ids: list[dict],
@@ -158,7 +165,7 @@ def test_get_has_mementos(
     mock_query_response.data = associated_memento_ids
 
     # When
-    result = get_has_mementos(collection_id)
+    result = await get_has_mementos(collection_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("has_memento")
@@ -171,7 +178,8 @@ def test_get_has_mementos(
     assert result == [1, 2, 3]
 
 
-def test_db_delete_has_memento(
+@pytest.mark.asyncio
+async def test_db_delete_has_memento(
     mock_supabase: MockSupabase,
     has_memento_data: dict,
 ) -> None:
@@ -184,7 +192,7 @@ def test_db_delete_has_memento(
     mock_query_response.data = [has_memento_data]
 
     # When
-    result = db_delete_has_memento(collection_id, memento_id)
+    result = await db_delete_has_memento(collection_id, memento_id)
 
     # Then
     calls = [
@@ -200,7 +208,8 @@ def test_db_delete_has_memento(
     assert result.memento_id == memento_id
 
 
-def test_db_delete_collection(
+@pytest.mark.asyncio
+async def test_db_delete_collection(
     mock_supabase: MockSupabase,
     expected_collection_data: dict,
 ) -> None:
@@ -212,7 +221,7 @@ def test_db_delete_collection(
     mock_query_response.data = [expected_collection_data]
 
     # When
-    result = db_delete_collection(collection_id)
+    result = await db_delete_collection(collection_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("collection")
@@ -226,7 +235,8 @@ def test_db_delete_collection(
     assert result.title == expected_collection_data["title"]
 
 
-def test_associate_memento(
+@pytest.mark.asyncio
+async def test_associate_memento(
     mock_supabase: MockSupabase,
     has_memento_data: dict,
 ) -> None:
@@ -238,7 +248,7 @@ def test_associate_memento(
     mock_query_response.data = [has_memento_data]
 
     # When
-    result = associate_memento(mock_has_memento)
+    result = await associate_memento(mock_has_memento)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("has_memento")
@@ -248,7 +258,8 @@ def test_associate_memento(
     assert result.memento_id == has_memento_data["memento_id"]
 
 
-def test_associate_memento_failure(
+@pytest.mark.asyncio
+async def test_associate_memento_failure(
     mock_supabase: MockSupabase,
     has_memento_data: dict,
 ) -> None:
@@ -261,7 +272,7 @@ def test_associate_memento_failure(
 
     # When/Then
     try:
-        associate_memento(mock_has_memento)
+        await associate_memento(mock_has_memento)
         raise AssertionError("Expected ValueError but no exception was raised")
     except ValueError as e:
         assert str(e) == "Failed to associate memento with collection"
@@ -270,7 +281,8 @@ def test_associate_memento_failure(
     mock_supabase_client.table().insert.assert_called_once()
 
 
-def test_update_associate_memento(
+@pytest.mark.asyncio
+async def test_update_associate_memento(
     mock_supabase: MockSupabase,
     has_memento_data: dict,
 ) -> None:
@@ -287,7 +299,7 @@ def test_update_associate_memento(
     mock_query_response.data = [updated_has_memento_data]
 
     # When
-    result = update_associate_memento(mock_has_memento)
+    result = await update_associate_memento(mock_has_memento)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("has_memento")
@@ -298,7 +310,8 @@ def test_update_associate_memento(
     assert result.memento_id == updated_has_memento_data["memento_id"]
 
 
-def test_get_collection_image_filenames(
+@pytest.mark.asyncio
+async def test_get_collection_image_filenames(
     mock_supabase: MockSupabase,
     collection_data: dict,
 ) -> None:
@@ -324,15 +337,15 @@ def test_get_collection_image_filenames(
     mock_supabase_client.from_.return_value = mock_supabase_client
     mock_supabase_client.select.return_value = mock_supabase_client
     mock_supabase_client.eq.return_value = mock_supabase_client
-    mock_supabase_client.execute.return_value = mock_query_response
+    mock_supabase_client.execute = AsyncMock(return_value=mock_query_response)
 
     # When
-    result = get_collection_image_filenames(collection_id)
+    result = await get_collection_image_filenames(collection_id)
 
     # Then
     mock_supabase_client.from_.assert_called_once_with("has_memento")
     mock_supabase_client.select.assert_called_once_with(
-        "memento:memento_id(images:image(filename))",
+        "memento_id, memento:memento_id(images:image(filename, order_index))",
     )
     mock_supabase_client.eq.assert_called_once_with("collection_id", collection_id)
 
@@ -340,7 +353,44 @@ def test_get_collection_image_filenames(
     assert result == ["image1.jpg", "image2.jpg", "image3.jpg"]
 
 
-def test_get_collection_image_filenames_empty(
+@pytest.mark.asyncio
+async def test_get_collection_image_filenames_ordered(
+    mock_supabase: MockSupabase,
+    collection_data: dict,
+) -> None:
+    """Test image filenames are ordered by memento, then image order."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given (rows in no particular order)
+    mock_query_response.data = [
+        {
+            "memento_id": 9,
+            "memento": {"images": [{"filename": "c.jpg", "order_index": 0}]},
+        },
+        {
+            "memento_id": 4,
+            "memento": {
+                "images": [
+                    {"filename": "b.jpg", "order_index": 1},
+                    {"filename": "a.jpg", "order_index": 0},
+                ],
+            },
+        },
+    ]
+    mock_supabase_client.from_.return_value = mock_supabase_client
+    mock_supabase_client.select.return_value = mock_supabase_client
+    mock_supabase_client.eq.return_value = mock_supabase_client
+    mock_supabase_client.execute = AsyncMock(return_value=mock_query_response)
+
+    # When
+    result = await get_collection_image_filenames(collection_data["id"])
+
+    # Then
+    assert result == ["a.jpg", "b.jpg", "c.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_get_collection_image_filenames_empty(
     mock_supabase: MockSupabase,
     collection_data: dict,
 ) -> None:
@@ -357,15 +407,15 @@ def test_get_collection_image_filenames_empty(
     mock_supabase_client.from_.return_value = mock_supabase_client
     mock_supabase_client.select.return_value = mock_supabase_client
     mock_supabase_client.eq.return_value = mock_supabase_client
-    mock_supabase_client.execute.return_value = mock_query_response
+    mock_supabase_client.execute = AsyncMock(return_value=mock_query_response)
 
     # When
-    result = get_collection_image_filenames(collection_id)
+    result = await get_collection_image_filenames(collection_id)
 
     # Then
     mock_supabase_client.from_.assert_called_once_with("has_memento")
     mock_supabase_client.select.assert_called_once_with(
-        "memento:memento_id(images:image(filename))",
+        "memento_id, memento:memento_id(images:image(filename, order_index))",
     )
     mock_supabase_client.eq.assert_called_once_with("collection_id", collection_id)
 
@@ -1,15 +1,21 @@
+import pytest
+
 from server.api.memento.models import NewImageMetadata
 from server.services.db.models.joins import ImageWithUrl
 from server.services.db.queries.image import (
     create_image_metadata,
+    create_image_metadata_bulk,
     delete_image_metadata,
+    delete_image_metadata_bulk,
     get_images_for_memento,
     update_image,
+    update_images_bulk,
 )
 from tests.fixtures.supabase import MockSupabase
 
 
-def test_create_image_metadata(
+@pytest.mark.asyncio
+async def test_create_image_metadata(
     mock_supabase: MockSupabase,
     image_data: dict,
     expected_image_data: dict,
@@ -23,7 +29,7 @@ def test_create_image_metadata(
     mock_query_response.data = [expected_image_data]
 
     # When
-    result = create_image_metadata(mock_image, memento_id)
+    result = await create_image_metadata(mock_image, memento_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("image")
@@ -31,7 +37,49 @@ def test_create_image_metadata(
     assert result is True
 
 
-def test_get_images_for_memento(
+@pytest.mark.asyncio
+async def test_create_image_metadata_bulk(
+    mock_supabase: MockSupabase,
+    image_data: dict,
+    expected_image_data: dict,
+) -> None:
+    """Test creating the metadata records for several images in one insert."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    metadata = [
+        NewImageMetadata(**{**image_data, "filename": f"image{i}", "order_index": i})
+        for i in range(3)
+    ]
+    mock_query_response.data = [expected_image_data] * 3
+
+    # When
+    result = await create_image_metadata_bulk(metadata, 2)
+
+    # Then
+    mock_supabase_client.table.assert_called_once_with("image")
+    mock_supabase_client.table().insert.assert_called_once()
+    rows = mock_supabase_client.table().insert.call_args.args[0]
+    assert [row["filename"] for row in rows] == ["image0", "image1", "image2"]
+    assert all(row["memento_id"] == 2 for row in rows)
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_create_image_metadata_bulk_empty(mock_supabase: MockSupabase) -> None:
+    """Test no insert is made when there are no images."""
+    mock_supabase_client, _, _ = mock_supabase
+
+    # When
+    result = await create_image_metadata_bulk([], 2)
+
+    # Then
+    mock_supabase_client.table.assert_not_called()
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_get_images_for_memento(
     mock_supabase: MockSupabase,
     expected_image_data: dict,
 ) -> None:
@@ -43,7 +91,7 @@ def test_get_images_for_memento(
     mock_query_response.data = [expected_image_data]
 
     # When
-    results = get_images_for_memento(memento_id)
+    results = await get_images_for_memento(memento_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("image")
@@ -59,7 +107,8 @@ def test_get_images_for_memento(
     assert results[0].memento_id == expected_image_data["memento_id"]
 
 
-def test_delete_image_metadata(
+@pytest.mark.asyncio
+async def test_delete_image_metadata(
     mock_supabase: MockSupabase,
     expected_image_data: dict,
 ) -> None:
@@ -71,7 +120,7 @@ def test_delete_image_metadata(
     mock_query_response.data = [expected_image_data]
 
     # When
-    result = delete_image_metadata(image_id)
+    result = await delete_image_metadata(image_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("image")
@@ -80,7 +129,8 @@ def test_delete_image_metadata(
     assert result is True
 
 
-def test_update_image(
+@pytest.mark.asyncio
+async def test_update_image(
     mock_supabase: MockSupabase,
     expected_image_data: dict,
 ) -> None:
@@ -97,7 +147,7 @@ def test_update_image(
     mock_query_response.data = [expected_image_data]
 
     # When
-    result = update_image(filename, updated_fields)
+    result = await update_image(filename, updated_fields)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("image")
@@ -107,3 +157,69 @@ def test_update_image(
         filename,
     )
     assert result is True
+
+
+@pytest.mark.asyncio
+async def test_update_images_bulk(mock_supabase: MockSupabase) -> None:
+    """Test updating several images, keyed by filename, in one request."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    updates: dict[str, dict[str, str | int]] = {
+        "image1": {"order_index": 1},
+        "image2": {"image_label": "cat", "detected_text": "blah blah"},
+    }
+    mock_query_response.data = [{"id": 1}, {"id": 2}]
+
+    # When
+    result = await update_images_bulk(updates)
+
+    # Then
+    mock_supabase_client.rpc.assert_called_once_with(
+        "update_images",
+        {
+            "updates": [
+                {"filename": "image1", "order_index": 1},
+                {
+                    "filename": "image2",
+                    "image_label": "cat",
+                    "detected_text": "blah blah",
+                },
+            ],
+        },
+    )
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_update_images_bulk_empty(mock_supabase: MockSupabase) -> None:
+    """Test no request is made when there is nothing to update."""
+    mock_supabase_client, _, _ = mock_supabase
+
+    # When
+    result = await update_images_bulk({})
+
+    # Then
+    mock_supabase_client.rpc.assert_not_called()
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_delete_image_metadata_bulk(
+    mock_supabase: MockSupabase,
+    expected_image_data: dict,
+) -> None:
+    """Test deleting several image metadata records in one request."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    ids = [1, 2]
+    mock_query_response.data = [expected_image_data] * 2
+
+    # When
+    result = await delete_image_metadata_bulk(ids)
+
+    # Then
+    mock_supabase_client.table.assert_called_once_with("image")
+    mock_supabase_client.table().delete().in_.assert_called_once_with("id", ids)
+    assert result is True
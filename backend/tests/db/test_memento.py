@@ -1,21 +1,31 @@
 import uuid
 from datetime import date
-from unittest.mock import MagicMock, call
+from unittest.mock import call
 
-from server.api.memento.models import MementoFilterParams, NewMemento, UpdateMemento
+import pytest
+
+from server.api.memento.models import (
+    MementoCursor,
+    MementoFilterParams,
+    NewMemento,
+    UpdateMemento,
+)
 from server.services.db.models.joins import MementoWithImages
 from server.services.db.models.schema_public_latest import Memento
 from server.services.db.queries.memento import (
     create_memento,
     db_delete_memento,
     get_image_labels,
+    get_memento_collection_ids,
     get_mementos,
+    get_mementos_page,
     update_memento,
 )
 from tests.fixtures.supabase import MockSupabase
 
 
-def test_create_memento(
+@pytest.mark.asyncio
+async def test_create_memento(
     mock_supabase: MockSupabase,
     memento_data: dict,
     expected_memento_data: dict,
@@ -28,7 +38,7 @@ def test_create_memento(
     mock_query_response.data = [expected_memento_data]
 
     # When
-    result = create_memento(mock_memento, memento_data["user_id"])
+    result = await create_memento(mock_memento, memento_data["user_id"])
 
     # Then
     mock_supabase_client.table.assert_called_once_with("memento")
@@ -40,7 +50,8 @@ def test_create_memento(
     assert result.date == mock_memento.date
 
 
-def test_update_memento(
+@pytest.mark.asyncio
+async def test_update_memento(
     mock_supabase: MockSupabase,
     memento_data: dict,
     expected_memento_data: dict,
@@ -53,7 +64,7 @@ def test_update_memento(
     mock_query_response.data = [expected_memento_data]
 
     # When
-    result = update_memento(memento_data["id"], mock_memento)
+    result = await update_memento(memento_data["id"], mock_memento)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("memento")
@@ -65,7 +76,8 @@ def test_update_memento(
     assert result.date == mock_memento.date
 
 
-def test_db_delete_memento(
+@pytest.mark.asyncio
+async def test_db_delete_memento(
     mock_supabase: MockSupabase,
     expected_memento_data: dict,
 ) -> None:
@@ -77,7 +89,7 @@ def test_db_delete_memento(
     mock_query_response.data = [expected_memento_data]
 
     # When
-    result = db_delete_memento(memento_id)
+    result = await db_delete_memento(memento_id)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("memento")
@@ -88,7 +100,30 @@ def test_db_delete_memento(
     assert result.caption == expected_memento_data["caption"]
 
 
-def test_get_mementos_no_filter(
+@pytest.mark.asyncio
+async def test_get_memento_collection_ids(mock_supabase: MockSupabase) -> None:
+    """Test getting the IDs of the collections a memento belongs to."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    memento_id = 7
+    mock_query_response.data = [{"collection_id": 1}, {"collection_id": 4}]
+
+    # When
+    result = await get_memento_collection_ids(memento_id)
+
+    # Then
+    mock_supabase_client.table.assert_called_once_with("has_memento")
+    mock_supabase_client.table().select.assert_called_once_with("collection_id")
+    mock_supabase_client.table().select().eq.assert_called_once_with(
+        "memento_id",
+        memento_id,
+    )
+    assert result == [1, 4]
+
+
+@pytest.mark.asyncio
+async def test_get_mementos_no_filter(
     mock_supabase: MockSupabase,
     memento_with_images_data: dict,
 ) -> None:
@@ -100,7 +135,7 @@ def test_get_mementos_no_filter(
     mock_query_response.data = [memento_with_images_data]
 
     # When
-    result = get_mementos(user_id, None)
+    result = await get_mementos(user_id, None)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("memento")
@@ -119,7 +154,8 @@ def test_get_mementos_no_filter(
     assert result[0].images[0].image_label == "Mountain View"  # Formatted by validator
 
 
-def test_get_mementos_date_filter(
+@pytest.mark.asyncio
+async def test_get_mementos_date_filter(
     mock_supabase: MockSupabase,
     multiple_mementos_with_images_data: list[dict],
 ) -> None:
@@ -138,29 +174,27 @@ def test_get_mementos_date_filter(
     filter_params = MementoFilterParams(start_date=start_date, end_date=end_date)
 
     # When
-    result = get_mementos(user_id, filter_params)
+    result = await get_mementos(user_id, filter_params)
 
     # Then
-    mock_supabase_client.table.assert_called_once_with("memento")
-    mock_supabase_client.table().select().eq.assert_called_once_with(
-        "user_id",
-        str(user_id),
-    )
-    mock_supabase_client.table().select().eq().gte.assert_called_once_with(
-        "date",
-        start_date.isoformat(),
-    )
-    mock_supabase_client.table().select().eq().gte().lte.assert_called_once_with(
-        "date",
-        end_date.isoformat(),
+    mock_supabase_client.table.assert_not_called()
+    mock_supabase_client.rpc.assert_called_once_with(
+        "search_mementos",
+        {
+            "user_id": str(user_id),
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        },
     )
+    mock_supabase_client.rpc().select.assert_called_once_with("*, images:image(*)")
 
     assert len(result) == 2
     assert result[0].date == date(2023, 1, 1)
     assert result[1].date == date(2023, 1, 31)
 
 
-def test_get_mementos_text_search(
+@pytest.mark.asyncio
+async def test_get_mementos_text_search(
     mock_supabase: MockSupabase,
     multiple_mementos_with_images_data: list[dict],
 ) -> None:
@@ -177,63 +211,45 @@ def test_get_mementos_text_search(
     filter_params = MementoFilterParams(text="mountain hiking")
 
     # When
-    result = get_mementos(user_id, filter_params)
+    result = await get_mementos(user_id, filter_params)
 
     # Then
-    mock_supabase_client.table.assert_called_once_with("memento")
-    mock_supabase_client.table().select().eq.assert_called_once_with(
-        "user_id",
-        str(user_id),
-    )
-    mock_supabase_client.table().select().eq().text_search.assert_called_once_with(
-        "memento_searchable_content",
-        "mountain:* & hiking:*",
+    mock_supabase_client.rpc.assert_called_once_with(
+        "search_mementos",
+        {"user_id": str(user_id), "search_text": "mountain:* & hiking:*"},
     )
 
     assert len(result) == 1
     assert "Mountain" in result[0].caption
 
 
-def test_get_mementos_image_label_filter(
+@pytest.mark.asyncio
+async def test_get_mementos_image_label_filter(
     mock_supabase: MockSupabase,
     multiple_mementos_with_images_data: list[dict],
 ) -> None:
-    """Test getting mementos with image label filter."""
-    mock_supabase_client, mock_db_response, _ = mock_supabase
+    """Test getting mementos with image label filter, in a single query."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
 
     # Given
     user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
-    beach_memento_id = multiple_mementos_with_images_data[1]["id"]
-
-    # We need to handle two separate queries:
-    # 1. First query to get memento_ids from the image table
-    # 2. Second query to get the actual mementos
-
-    # Set up mocks for a sequence of responses
-    image_query_response = MagicMock()
-    image_query_response.data = [{"memento_id": beach_memento_id}]
-
-    memento_query_response = MagicMock()
-    memento_query_response.data = [
+    mock_query_response.data = [
         multiple_mementos_with_images_data[1],
     ]  # Only the beach memento
 
-    # Set up a side effect to return different responses
-    execute_side_effects = [image_query_response, memento_query_response]
-
-    # Create a patched version of the fixture's chain builder
-    original_chain_builder = mock_supabase_client.table.return_value
-    original_chain_builder.execute.side_effect = execute_side_effects
-
     # Create filter with image label
     filter_params = MementoFilterParams(image_label="beach")
 
     # When
-    result = get_mementos(user_id, filter_params)
+    result = await get_mementos(user_id, filter_params)
 
     # Then
-    expected_table_calls = [call("memento"), call("image")]
-    assert mock_supabase_client.table.call_args_list == expected_table_calls
+    mock_supabase_client.table.assert_not_called()
+    mock_supabase_client.rpc.assert_called_once_with(
+        "search_mementos",
+        {"user_id": str(user_id), "image_label": "beach"},
+    )
+    mock_supabase_client.rpc().execute.assert_awaited_once()
 
     # Check result
     assert len(result) == 1
@@ -242,21 +258,17 @@ def test_get_mementos_image_label_filter(
     assert any(img.image_label == "Beach" for img in result[0].images)
 
 
-def test_get_mementos_bounding_box_filter_with_results(
+@pytest.mark.asyncio
+async def test_get_mementos_bounding_box_filter(
     mock_supabase: MockSupabase,
     multiple_mementos_with_images_data: list[dict],
 ) -> None:
-    """Test getting mementos with bounding box filter that returns results."""
+    """Test getting mementos with bounding box filter."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
     # Given
     user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
 
-    # Set up RPC response for mementos_in_bounds
-    rpc_response = MagicMock()
-    rpc_response.data = [{"id": 1}, {"id": 3}]  # IDs 1 and 3 are within bounds
-    mock_supabase_client.rpc().execute.return_value = rpc_response
-
     # Set filtered mementos response
     mock_query_response.data = [
         multiple_mementos_with_images_data[0],  # Mountain (id=1)
@@ -272,80 +284,37 @@ def test_get_mementos_bounding_box_filter_with_results(
     )
 
     # When
-    result = get_mementos(user_id, filter_params)
+    result = await get_mementos(user_id, filter_params)
 
     # Then
-    calls = [
-        call(),
-        call(
-            "mementos_in_bounds",
-            {
-                "min_lat": 40.0,
-                "min_long": -90.0,
-                "max_lat": 50.0,
-                "max_long": -70.0,
-            },
-        ),
-        call().execute(),
-    ]
-    mock_supabase_client.rpc.assert_has_calls(calls)
-    mock_supabase_client.table().select().eq().in_.assert_called_once_with("id", [1, 3])
+    mock_supabase_client.rpc.assert_called_once_with(
+        "search_mementos",
+        {
+            "user_id": str(user_id),
+            "min_lat": 40.0,
+            "min_long": -90.0,
+            "max_lat": 50.0,
+            "max_long": -70.0,
+        },
+    )
+    mock_supabase_client.rpc().execute.assert_awaited_once()
 
     assert len(result) == 2
     assert result[0].id == 1  # Mountain
     assert result[1].id == 3  # City
 
 
-def test_get_mementos_bounding_box_filter_empty_results(
+@pytest.mark.asyncio
+async def test_get_mementos_combined_filters(
     mock_supabase: MockSupabase,
     multiple_mementos_with_images_data: list[dict],
 ) -> None:
-    """Test getting mementos with bounding box filter that returns no results."""
-    mock_supabase_client, _, _ = mock_supabase
-
-    # Given
-    user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
-
-    # Set up RPC response for mementos_in_bounds - empty results
-    rpc_response = MagicMock()
-    rpc_response.data = []  # No IDs in bounds
-    mock_supabase_client.rpc().execute.return_value = rpc_response
-    mock_supabase_client.rpc.reset_mock()
-
-    # Create filter with bounding box coordinates (far away from any data)
-    filter_params = MementoFilterParams(
-        min_lat=1.0,
-        min_long=1.0,
-        max_lat=10.0,
-        max_long=10.0,
-    )
-
-    # When
-    result = get_mementos(user_id, filter_params)
-
-    # Then
-    mock_supabase_client.rpc.assert_called_once()
-    # The function should return early without querying
-    mock_supabase_client.table().select().eq().in_.assert_not_called()
-
-    assert len(result) == 0
-
-
-def test_get_mementos_combined_filters(
-    mock_supabase: MockSupabase,
-    multiple_mementos_with_images_data: list[dict],
-) -> None:
-    """Test getting mementos with multiple combined filters."""
+    """Test getting mementos with multiple combined filters, in a single query."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
     # Given
     user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
 
-    # Set up RPC response for mementos_in_bounds
-    rpc_response = MagicMock()
-    rpc_response.data = [{"id": 1}, {"id": 2}]  # IDs 1 and 2 are within bounds
-    mock_supabase_client.rpc().execute.return_value = rpc_response
-
     # Set filtered mementos response - only Beach day
     mock_query_response.data = [multiple_mementos_with_images_data[1]]
 
@@ -358,67 +327,101 @@ def test_get_mementos_combined_filters(
         min_long=-90.0,
         max_lat=35.0,
         max_long=-80.0,
+        image_label="beach",
     )
 
     # When
-    result = get_mementos(user_id, filter_params)
+    result = await get_mementos(user_id, filter_params)
 
     # Then
-    # Check that all filter methods were called
-    mock_supabase_client.table().select().eq().gte.assert_called_once()
-    mock_supabase_client.table().select().eq().gte().lte.assert_called_once()
-    mock_supabase_client.table().select().eq().gte().lte().text_search.assert_called_once()
-    mock_supabase_client.table().select().eq().gte().lte().text_search().in_.assert_called_once_with(
-        "id",
-        [1, 2],
+    mock_supabase_client.table.assert_not_called()
+    mock_supabase_client.rpc.assert_called_once_with(
+        "search_mementos",
+        {
+            "user_id": str(user_id),
+            "start_date": "2023-01-15",
+            "end_date": "2023-02-15",
+            "search_text": "beach:* & sunny:*",
+            "min_lat": 25.0,
+            "min_long": -90.0,
+            "max_lat": 35.0,
+            "max_long": -80.0,
+            "image_label": "beach",
+        },
     )
+    mock_supabase_client.rpc().execute.assert_awaited_once()
 
     assert len(result) == 1
     assert "Beach" in result[0].caption
     assert result[0].date == date(2023, 1, 31)
 
 
-def test_get_image_labels(
+@pytest.mark.asyncio
+async def test_get_mementos_page_filtered(mock_supabase: MockSupabase) -> None:
+    """Test filtered pages are ordered and paged on top of the search function."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    user_id = uuid.uuid4()
+    mock_query_response.data = []
+    cursor = MementoCursor(date=date(2023, 1, 31), id=2)
+
+    # When
+    await get_mementos_page(
+        user_id,
+        MementoFilterParams(image_label="beach"),
+        cursor=cursor,
+        limit=10,
+    )
+
+    # Then
+    mock_supabase_client.rpc.assert_called_once_with(
+        "search_mementos",
+        {"user_id": str(user_id), "image_label": "beach"},
+    )
+    query = mock_supabase_client.rpc()
+    query.or_.assert_called_once()
+    query.limit.assert_called_once_with(11)
+
+
+@pytest.mark.asyncio
+async def test_get_image_labels(
     mock_supabase: MockSupabase,
     multiple_mementos_with_images_data: list[dict],
 ) -> None:
-    """Test getting all image labels for a user."""
+    """Test getting all image labels for a user, with their counts."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
     # Given
     user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
 
-    # Prepare response data in the format returned by Supabase
-    response_data = [
-        {"user_id": user_id, "images": [{"image_label": "mountain_view"}]},
-        {
-            "user_id": user_id,
-            "images": [{"image_label": "beach"}, {"image_label": "sunset"}],
-        },
-        {"user_id": user_id, "images": [{"image_label": "cityscape"}]},
+    # Counts maintained in the DB, already sorted by the query
+    mock_query_response.data = [
+        {"image_label": "beach", "count": 2},
+        {"image_label": "cityscape", "count": 1},
+        {"image_label": "mountain_view", "count": 5},
+        {"image_label": "sunset", "count": 1},
     ]
-    mock_query_response.data = response_data
 
     # When
-    result = get_image_labels(user_id)
+    result = await get_image_labels(user_id)
 
     # Then
-    calls = [call("image.image_label", None), call("image.image_label", "")]
-    mock_supabase_client.table.assert_called_once_with("memento")
-    mock_supabase_client.table().select.assert_called_once_with(
-        "user_id, images:image(image_label)",
-    )
-    mock_supabase_client.table().select().eq.assert_called_once_with(
-        "user_id",
-        str(user_id),
-    )
-    mock_supabase_client.table().select().eq().neq.assert_has_calls(calls)
+    mock_supabase_client.table.assert_called_once_with("image_label_count")
+    query = mock_supabase_client.table()
+    query.select.assert_called_once_with("image_label, count")
+    query.eq.assert_called_once_with("user_id", str(user_id))
+    # Labels whose images were all deleted are left out
+    query.gt.assert_called_once_with("count", 0)
+    query.order.assert_called_once_with("image_label")
 
     # Check that all labels are returned in alphabetical order
-    assert result == ["beach", "cityscape", "mountain_view", "sunset"]
+    assert list(result) == ["beach", "cityscape", "mountain_view", "sunset"]
+    assert result["mountain_view"] == 5
 
 
-def test_get_image_labels_empty(
+@pytest.mark.asyncio
+async def test_get_image_labels_empty(
     mock_supabase: MockSupabase,
 ) -> None:
     """Test getting image labels when there are none."""
@@ -426,38 +429,122 @@ def test_get_image_labels_empty(
 
     # Given
     user_id = uuid.UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8")
-    mock_query_response.data = []  # No mementos or image labels
+    mock_query_response.data = []  # No labelled images
 
     # When
-    result = get_image_labels(user_id)
+    result = await get_image_labels(user_id)
 
     # Then
-    mock_supabase_client.table.assert_called_once_with("memento")
-    assert result == []
+    mock_supabase_client.table.assert_called_once_with("image_label_count")
+    assert result == {}
 
 
-def test_get_image_labels_with_empty_values(
+@pytest.mark.asyncio
+async def test_get_mementos_page_first(
     mock_supabase: MockSupabase,
+    multiple_mementos_with_images_data: list[dict],
 ) -> None:
-    """Test getting image labels when some are empty or None."""
+    """Test the first page returns the newest mementos, and a cursor to the next."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given (newest first, one more row than the page size)
+    user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
+    mock_query_response.data = multiple_mementos_with_images_data[::-1]
+
+    # When
+    result = await get_mementos_page(user_id, limit=2)
+
+    # Then
+    query = mock_supabase_client.table()
+    query.select.assert_called_once_with("*, images:image(*)")
+    query.or_.assert_not_called()
+    query.order.assert_has_calls(
+        [call("date", desc=True, nullsfirst=False), call("id", desc=True)],
+    )
+    query.limit.assert_called_once_with(3)
+    assert [memento.id for memento in result.mementos] == [3, 2]
+    assert result.next_cursor is not None
+    assert MementoCursor.decode(result.next_cursor) == MementoCursor(
+        date=date(2023, 1, 31),
+        id=2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_mementos_page_last(
+    mock_supabase: MockSupabase,
+    multiple_mementos_with_images_data: list[dict],
+) -> None:
+    """Test a page after a cursor only has mementos after it, and no next cursor."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
     # Given
-    user_id = uuid.UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8")
+    user_id = uuid.UUID(multiple_mementos_with_images_data[0]["user_id"])
+    cursor = MementoCursor(date=date(2023, 1, 31), id=2)
+    mock_query_response.data = multiple_mementos_with_images_data[:1]
 
-    # Response with some empty labels that should be filtered out
-    mock_query_response.data = [
-        {
-            "user_id": user_id,
-            "images": [{"image_label": None}, {"image_label": "mountain_view"}],
-        },
-        {"user_id": user_id, "images": [{"image_label": ""}, {"image_label": "beach"}]},
-    ]
+    # When
+    result = await get_mementos_page(user_id, cursor=cursor, limit=2)
+
+    # Then
+    mock_supabase_client.table().or_.assert_called_once_with(
+        "date.lt.2023-01-31,and(date.eq.2023-01-31,id.lt.2),date.is.null",
+    )
+    assert [memento.id for memento in result.mementos] == [1]
+    assert result.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_get_mementos_page_undated_cursor(mock_supabase: MockSupabase) -> None:
+    """Test paging past an undated memento only continues through undated ones."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    mock_query_response.data = []
+
+    # When
+    await get_mementos_page(uuid.uuid4(), cursor=MementoCursor(date=None, id=9))
+
+    # Then
+    mock_supabase_client.table().or_.assert_called_once_with(
+        "and(date.is.null,id.lt.9)",
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_mementos_page_compact(
+    mock_supabase: MockSupabase,
+    memento_with_images_data: dict,
+) -> None:
+    """Test the compact projection leaves out images' detected text."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    del memento_with_images_data["images"][0]["detected_text"]
+    mock_query_response.data = [memento_with_images_data]
 
     # When
-    result = get_image_labels(user_id)
+    result = await get_mementos_page(uuid.uuid4(), compact=True)
 
     # Then
-    # The function will filter out None and empty values by the Supabase query
-    # Only non-empty labels should be returned
-    assert sorted(result) == ["beach", "mountain_view"]
+    (select,) = mock_supabase_client.table().select.call_args.args
+    assert "detected_text" not in select
+    assert "filename" in select
+    image = result.mementos[0].images[0]
+    assert "detected_text" not in image.model_dump(exclude_unset=True)
+
+
+def test_memento_cursor_round_trip() -> None:
+    """Test cursors decode to the position they were encoded from."""
+    # Given
+    cursor = MementoCursor(date=date(2024, 2, 29), id=42)
+
+    # When / Then
+    assert MementoCursor.decode(cursor.encode()) == cursor
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "e30=", "eyJpZCI6ICJ4In0="])
+def test_memento_cursor_invalid(cursor: str) -> None:
+    """Test malformed cursors are rejected with a ValueError."""
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        MementoCursor.decode(cursor)
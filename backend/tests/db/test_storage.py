@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -10,7 +11,9 @@ from server.services.storage.image import (
     get_bulk_image_urls,
     get_image_url,
     upload_image,
+    upload_images,
 )
+from server.services.storage.url_cache import signed_url_cache
 from tests.fixtures.supabase import MockSupabase
 
 
@@ -42,7 +45,71 @@ async def test_upload_image(mock_supabase: MockSupabase) -> None:
     assert actual_path == expected_path
 
 
-def test_delete_images(mock_supabase: MockSupabase) -> None:
+def make_upload_file(content: bytes) -> AsyncMock:
+    """Creates a mock UploadFile with the given content."""
+    mock_file = AsyncMock(spec=UploadFile)
+    mock_file.content_type = "image/jpeg"
+    mock_file.read.return_value = content
+    return mock_file
+
+
+@pytest.mark.asyncio
+async def test_upload_images_concurrently() -> None:
+    """Test uploads run concurrently up to the limit, keeping the file order."""
+    # Given
+    files = [make_upload_file(f"image{i}".encode()) for i in range(6)]
+    active, max_active = 0, 0
+
+    async def mock_upload(content: bytes, _: str) -> str:
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f"path-{content.decode()}"
+
+    with patch(
+        "server.services.storage.image.upload_image_content",
+        side_effect=mock_upload,
+    ):
+        # When
+        result = await upload_images(files, concurrency=2)
+
+    # Then
+    assert result == [(f"path-image{i}", f"image{i}".encode()) for i in range(6)]
+    assert max_active == 2
+    for file in files:
+        file.read.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_upload_images_failure_cleans_up() -> None:
+    """Test a failed upload deletes the images that were uploaded, then raises."""
+    # Given
+    files = [make_upload_file(b"ok"), make_upload_file(b"fail")]
+
+    async def mock_upload(content: bytes, _: str) -> str:
+        if content == b"fail":
+            raise RuntimeError("upload failed")
+        return "uploaded-path"
+
+    with patch(
+        "server.services.storage.image.upload_image_content",
+        side_effect=mock_upload,
+    ), patch(
+        "server.services.storage.image.delete_images",
+    ) as mock_delete, pytest.raises(
+        RuntimeError,
+        match="upload failed",
+    ):
+        # When / Then
+        await upload_images(files)
+
+    mock_delete.assert_called_once_with(["uploaded-path"])
+
+
+@pytest.mark.asyncio
+async def test_delete_images(mock_supabase: MockSupabase) -> None:
     """Test deleting images from Supabase storage."""
     mock_supabase_client, _, mock_storage_response = mock_supabase
 
@@ -51,7 +118,7 @@ def test_delete_images(mock_supabase: MockSupabase) -> None:
     mock_storage_response.__len__.return_value = 1
 
     # When
-    result = delete_images(test_filenames)
+    result = await delete_images(test_filenames)
 
     # Then
     mock_supabase_client.storage.from_.assert_called_once_with("images")
@@ -59,7 +126,8 @@ def test_delete_images(mock_supabase: MockSupabase) -> None:
     assert result is True
 
 
-def test_get_image_url(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_get_image_url(mock_supabase: MockSupabase) -> None:
     """Test getting a signed URL for a single image."""
     mock_supabase_client, _, mock_storage_response = mock_supabase
 
@@ -69,7 +137,7 @@ def test_get_image_url(mock_supabase: MockSupabase) -> None:
     mock_storage_response.__getitem__.return_value = expected_url
 
     # When
-    result = get_image_url(test_filename)
+    result = await get_image_url(test_filename)
 
     # Then
     mock_supabase_client.storage.from_.assert_called_once_with("images")
@@ -80,7 +148,8 @@ def test_get_image_url(mock_supabase: MockSupabase) -> None:
     assert result == expected_url
 
 
-def test_get_bulk_image_urls(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_get_bulk_image_urls(mock_supabase: MockSupabase) -> None:
     """Test getting signed URLs for multiple images."""
     mock_supabase_client, _, mock_storage_response = mock_supabase
 
@@ -93,7 +162,7 @@ def test_get_bulk_image_urls(mock_supabase: MockSupabase) -> None:
     mock_storage_response.__iter__.return_value = iter(mock_response)
 
     # When
-    result = get_bulk_image_urls(test_filenames)
+    result = await get_bulk_image_urls(test_filenames)
 
     # Then
     mock_supabase_client.storage.from_.assert_called_once_with("images")
@@ -107,7 +176,8 @@ def test_get_bulk_image_urls(mock_supabase: MockSupabase) -> None:
     }
 
 
-def test_get_bulk_image_urls_empty(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_get_bulk_image_urls_empty(mock_supabase: MockSupabase) -> None:
     """Test getting signed URLs with empty filenames list."""
     mock_supabase_client, _, _ = mock_supabase
 
@@ -115,14 +185,15 @@ def test_get_bulk_image_urls_empty(mock_supabase: MockSupabase) -> None:
     test_filenames = []
 
     # When
-    result = get_bulk_image_urls(test_filenames)
+    result = await get_bulk_image_urls(test_filenames)
 
     # Then
     mock_supabase_client.storage.from_.assert_not_called()
     assert result == {}
 
 
-def test_download_images(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_download_images(mock_supabase: MockSupabase) -> None:
     """Test downloading images from Supabase storage."""
     mock_supabase_client, _, mock_storage_response = mock_supabase
 
@@ -137,7 +208,7 @@ def test_download_images(mock_supabase: MockSupabase) -> None:
         mock_image.convert.return_value = mock_image
 
         # When
-        result = download_images(test_filenames)
+        result = await download_images(test_filenames)
 
     # Then
     assert mock_supabase_client.storage.from_.call_count == 2
@@ -146,7 +217,8 @@ def test_download_images(mock_supabase: MockSupabase) -> None:
     assert all(isinstance(img, MagicMock) for img in result)
 
 
-def test_download_images_with_error(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_download_images_with_error(mock_supabase: MockSupabase) -> None:
     """Test downloading images with one failing."""
     mock_supabase_client, _, _ = mock_supabase
 
@@ -167,8 +239,81 @@ def test_download_images_with_error(mock_supabase: MockSupabase) -> None:
         mock_image.convert.return_value = mock_image
 
         # When
-        result = download_images(test_filenames)
+        result = await download_images(test_filenames)
 
     # Then
     assert mock_supabase_client.storage.from_().download.call_count == 2
     assert len(result) == 1  # Two download calls, but only one image returned
+
+
+@pytest.mark.asyncio
+async def test_get_bulk_image_urls_cached(mock_supabase: MockSupabase) -> None:
+    """Test only images without a cached signed URL are signed."""
+    mock_supabase_client, _, mock_storage_response = mock_supabase
+
+    # Given
+    mock_storage_response.__iter__.side_effect = [
+        iter([{"path": "image1.jpg", "signedUrl": "https://example.com/1"}]),
+        iter([{"path": "image2.jpg", "signedUrl": "https://example.com/2"}]),
+    ]
+    await get_bulk_image_urls(["image1.jpg"])
+
+    # When
+    result = await get_bulk_image_urls(["image1.jpg", "image2.jpg"])
+
+    # Then
+    create_signed_urls = mock_supabase_client.storage.from_().create_signed_urls
+    create_signed_urls.assert_called_with(["image2.jpg"], 86400)
+    assert result == {
+        "image1.jpg": "https://example.com/1",
+        "image2.jpg": "https://example.com/2",
+    }
+
+    # When (every URL is cached)
+    create_signed_urls.reset_mock()
+    result = await get_bulk_image_urls(["image2.jpg", "image1.jpg"])
+
+    # Then
+    create_signed_urls.assert_not_called()
+    assert len(result) == 2
+
+
+@pytest.mark.asyncio
+async def test_delete_images_invalidates_urls(mock_supabase: MockSupabase) -> None:
+    """Test deleted images aren't served from the signed URL cache."""
+    mock_supabase_client, _, mock_storage_response = mock_supabase
+
+    # Given
+    mock_storage_response.__getitem__.return_value = "https://example.com/1"
+    await get_image_url("image1.jpg")
+
+    # When
+    await delete_images(["image1.jpg"])
+    await get_image_url("image1.jpg")
+
+    # Then
+    create_signed_url = mock_supabase_client.storage.from_().create_signed_url
+    assert create_signed_url.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_bulk_image_urls_unsigned(mock_supabase: MockSupabase) -> None:
+    """Test images that couldn't be signed are left out, and not cached."""
+    _, _, mock_storage_response = mock_supabase
+
+    # Given
+    mock_storage_response.__iter__.return_value = iter(
+        [
+            {"path": "image1.jpg", "signedUrl": "https://example.com/1"},
+            {"path": "missing.jpg", "signedUrl": None, "error": "Object not found"},
+        ],
+    )
+
+    # When
+    result = await get_bulk_image_urls(["image1.jpg", "missing.jpg"])
+    found, missing = signed_url_cache.get_many(["image1.jpg", "missing.jpg"], 86400)
+
+    # Then
+    assert result == {"image1.jpg": "https://example.com/1"}
+    assert list(found) == ["image1.jpg"]
+    assert missing == ["missing.jpg"]
@@ -0,0 +1,115 @@
+from server.services.storage.url_cache import ENTRY_OVERHEAD, SignedUrlCache
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Current (fake) time."""
+        return self.now
+
+
+def test_get_many_hit_and_miss() -> None:
+    """Test cached URLs are returned, and the rest reported missing."""
+    # Given
+    cache = SignedUrlCache(max_bytes=10_000, min_remaining=60)
+    cache.put_many({"a.png": "https://url/a"}, expires_in=3600)
+
+    # When
+    found, missing = cache.get_many(["a.png", "b.png"], expires_in=3600)
+
+    # Then
+    assert found == {"a.png": "https://url/a"}
+    assert missing == ["b.png"]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+
+
+def test_get_many_keyed_by_expiry() -> None:
+    """Test URLs signed for one lifetime aren't reused for another."""
+    # Given
+    cache = SignedUrlCache(max_bytes=10_000, min_remaining=60)
+    cache.put_many({"a.png": "https://url/a"}, expires_in=3600)
+
+    # When
+    found, missing = cache.get_many(["a.png"], expires_in=7200)
+
+    # Then
+    assert found == {}
+    assert missing == ["a.png"]
+
+
+def test_get_many_near_expiry() -> None:
+    """Test URLs are re-signed once less than min_remaining of them is left."""
+    # Given
+    clock = FakeClock()
+    cache = SignedUrlCache(max_bytes=10_000, min_remaining=600, clock=clock)
+    cache.put_many({"a.png": "https://url/a"}, expires_in=3600)
+
+    # When
+    clock.now = 3000
+    found, _ = cache.get_many(["a.png"], expires_in=3600)
+
+    # Then
+    assert found == {"a.png": "https://url/a"}
+
+    # When
+    clock.now = 3001
+    found, missing = cache.get_many(["a.png"], expires_in=3600)
+
+    # Then
+    assert found == {}
+    assert missing == ["a.png"]
+    assert cache.stats().entries == 0
+
+
+def test_put_many_short_lived() -> None:
+    """Test URLs that would never be reused aren't cached."""
+    # Given
+    cache = SignedUrlCache(max_bytes=10_000, min_remaining=600)
+
+    # When
+    cache.put_many({"a.png": "https://url/a"}, expires_in=600)
+
+    # Then
+    assert cache.stats().entries == 0
+
+
+def test_put_many_evicts_least_recently_used() -> None:
+    """Test the least recently used URLs are evicted to stay under max_bytes."""
+    # Given
+    entry_size = len("a.png") + len("https://url/a") + ENTRY_OVERHEAD
+    cache = SignedUrlCache(max_bytes=2 * entry_size, min_remaining=60)
+    cache.put_many({"a.png": "https://url/a", "b.png": "https://url/b"}, 3600)
+    cache.get_many(["a.png"], 3600)
+
+    # When
+    cache.put_many({"c.png": "https://url/c"}, 3600)
+
+    # Then
+    found, missing = cache.get_many(["a.png", "b.png", "c.png"], 3600)
+    assert set(found) == {"a.png", "c.png"}
+    assert missing == ["b.png"]
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.size_bytes == 2 * entry_size <= stats.max_bytes
+
+
+def test_invalidate() -> None:
+    """Test invalidating a file drops its URLs for every lifetime."""
+    # Given
+    cache = SignedUrlCache(max_bytes=10_000, min_remaining=60)
+    cache.put_many({"a.png": "https://url/a", "b.png": "https://url/b"}, 3600)
+    cache.put_many({"a.png": "https://url/a2"}, 7200)
+
+    # When
+    cache.invalidate(["a.png"])
+
+    # Then
+    assert cache.get_many(["a.png"], 3600)[0] == {}
+    assert cache.get_many(["a.png"], 7200)[0] == {}
+    assert cache.get_many(["b.png"], 3600)[0] == {"b.png": "https://url/b"}
+    assert cache.stats().invalidations == 2
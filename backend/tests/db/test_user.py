@@ -1,12 +1,19 @@
 from datetime import date
 from uuid import UUID
 
+import pytest
+
 from server.services.db.models.schema_public_latest import UserInfo, UserInfoInsert
-from server.services.db.queries.user import create_user_info, get_user_info
+from server.services.db.queries.user import (
+    create_user_info,
+    get_user_ids,
+    get_user_info,
+)
 from tests.fixtures.supabase import MockSupabase
 
 
-def test_get_user_info(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_get_user_info(mock_supabase: MockSupabase) -> None:
     """Test retrieving user information for a specific user ID."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
@@ -19,7 +26,7 @@ def test_get_user_info(mock_supabase: MockSupabase) -> None:
     mock_query_response.data = [expected_user_data]
 
     # When
-    result = get_user_info(uuid)
+    result = await get_user_info(uuid)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("user_info")
@@ -30,7 +37,8 @@ def test_get_user_info(mock_supabase: MockSupabase) -> None:
     assert result.birthday == date.fromisoformat(expected_user_data["birthday"])
 
 
-def test_create_user_info(mock_supabase: MockSupabase) -> None:
+@pytest.mark.asyncio
+async def test_create_user_info(mock_supabase: MockSupabase) -> None:
     """Test creating user information record."""
     mock_supabase_client, mock_query_response, _ = mock_supabase
 
@@ -48,7 +56,7 @@ def test_create_user_info(mock_supabase: MockSupabase) -> None:
     mock_query_response.data = [expected_response]
 
     # When
-    result = create_user_info(user_info_insert)
+    result = await create_user_info(user_info_insert)
 
     # Then
     mock_supabase_client.table.assert_called_once_with("user_info")
@@ -62,3 +70,25 @@ def test_create_user_info(mock_supabase: MockSupabase) -> None:
     assert isinstance(result, UserInfo)
     assert result.id == user_id
     assert result.birthday == birthday
+
+
+@pytest.mark.asyncio
+async def test_get_user_ids(mock_supabase: MockSupabase) -> None:
+    """Test retrieving a page of user IDs, after the previous page."""
+    mock_supabase_client, mock_query_response, _ = mock_supabase
+
+    # Given
+    after_id = UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8")
+    next_id = UUID("45b25fe2-08cc-42f6-902c-9eec499d04e8")
+    mock_query_response.data = [{"id": str(next_id)}]
+
+    # When
+    result = await get_user_ids(after_id=after_id, limit=100)
+
+    # Then
+    mock_supabase_client.table.assert_called_once_with("user_info")
+    query = mock_supabase_client.table().select("id")
+    query.order.assert_called_once_with("id")
+    query.order().limit.assert_called_once_with(100)
+    query.order().limit().gt.assert_called_once_with("id", str(after_id))
+    assert result == [next_id]
@@ -3,8 +3,46 @@ import uuid
 import pytest
 
 from server.api.memento.models import MementoWithCoordinates
+from server.services.cluster_memento.hdbscan import MementoPoints
 from server.services.db.models.gis import Coordinates
 
+# User the generated mementos belong to
+USER_ID = uuid.UUID("35b25fe2-08cc-42f6-902c-9eec499d04e8")
+
+
+def make_mementos(
+    start_id: int,
+    lat: float,
+    long: float,
+    count: int,
+) -> list[MementoWithCoordinates]:
+    """Mementos with consecutive ids, scattered slightly around a point."""
+    return [
+        MementoWithCoordinates(
+            id=start_id + i,
+            user_id=USER_ID,
+            coordinates=Coordinates(lat=lat + i * 1e-3, long=long - i * 1e-3),
+        )
+        for i in range(count)
+    ]
+
+
+def make_points(start_id: int, lat: float, long: float, count: int) -> MementoPoints:
+    """The same mementos as make_mementos, as columns."""
+    return MementoPoints.from_mementos(make_mementos(start_id, lat, long, count))
+
+
+@pytest.fixture
+def two_city_mementos() -> list[MementoWithCoordinates]:
+    """Two tight groups of mementos: San Francisco (ids 1-5) and New York (6-10)."""
+    return make_mementos(1, 37.77, -122.42, 5) + make_mementos(6, 40.71, -74.0, 5)
+
+
+@pytest.fixture
+def two_city_points(two_city_mementos: list[MementoWithCoordinates]) -> MementoPoints:
+    """The two_city_mementos, as columns."""
+    return MementoPoints.from_mementos(two_city_mementos)
+
 
 @pytest.fixture
 def sample_mementos() -> list[MementoWithCoordinates]:
@@ -15,3 +15,13 @@ def keras_prediction() -> np.ndarray:
     Format: [[(node_id, class_name, probability)]]
     """
     return np.array([[("n01234567", "dog", 0.95)]])
+
+
+@pytest.fixture
+def class_index() -> dict[str, list[str]]:
+    """Create a mock ImageNet class index in the Keras JSON format."""
+    return {
+        "0": ["n01234567", "dog"],
+        "1": ["n01234568", "cat"],
+        "2": ["n01234569", "bird"],
+    }
@@ -1,8 +1,10 @@
 from typing import Generator
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from server.services.storage.url_cache import signed_url_cache
+
 # Create a more explicit type for the mock return value
 MockSupabase = tuple[MagicMock, MagicMock, MagicMock]
 
@@ -10,11 +12,13 @@ MockSupabase = tuple[MagicMock, MagicMock, MagicMock]
 @pytest.fixture
 def mock_supabase() -> Generator[MockSupabase, None, None]:
     """
-    Create a mock Supabase DB client, along with mocks for DB/Storage responses.
+    Create a mock async Supabase DB client, along with mocks for DB/Storage responses.
+
+    Queries (`.execute()`) and Storage calls are awaitable, returning the responses.
 
     Example usage:
     ```python
-        def test_create_memento(mock_supa: MockSupabase) -> None:
+        async def test_create_memento(mock_supa: MockSupabase) -> None:
             mock_supabase_client, mock_db_response, mock_storage_response = mock_supa
 
             # Set DB response data
@@ -28,7 +32,7 @@ def mock_supabase() -> Generator[MockSupabase, None, None]:
             mock_supabase_client.table.assert_called_once_with("memento")
     ```
     """
-    with patch("server.services.db.supabase") as mock_supabase:
+    with patch("server.services.db.async_supabase") as mock_supabase:
         # Create separate response objects for DB and storage operations
         mock_db_response = MagicMock()
         mock_storage_response = MagicMock()
@@ -36,7 +40,7 @@ def mock_supabase() -> Generator[MockSupabase, None, None]:
         # Create mock chain builders for DB operations
         def create_db_chain_builder() -> MagicMock:
             chain_builder = MagicMock()
-            chain_builder.execute.return_value = mock_db_response
+            chain_builder.execute = AsyncMock(return_value=mock_db_response)
             chain_methods = [
                 "select",
                 "insert",
@@ -56,6 +60,9 @@ def mock_supabase() -> Generator[MockSupabase, None, None]:
                 "not_",
                 "or_",
                 "filter",
+                "single",
+                "order",
+                "limit",
             ]
             for method in chain_methods:
                 getattr(chain_builder, method).return_value = chain_builder
@@ -66,11 +73,18 @@ def mock_supabase() -> Generator[MockSupabase, None, None]:
             chain_builder = MagicMock()
 
             # Set up return values for storage methods
-            chain_builder.upload.return_value = mock_storage_response
-            chain_builder.create_signed_url.return_value = mock_storage_response
-            chain_builder.create_signed_urls.return_value = mock_storage_response
-            chain_builder.remove.return_value = mock_storage_response
-            chain_builder.download.return_value = mock_storage_response
+            for method in [
+                "upload",
+                "create_signed_url",
+                "create_signed_urls",
+                "remove",
+                "download",
+            ]:
+                setattr(
+                    chain_builder,
+                    method,
+                    AsyncMock(return_value=mock_storage_response),
+                )
 
             return chain_builder
 
@@ -84,4 +98,7 @@ def mock_supabase() -> Generator[MockSupabase, None, None]:
         mock_storage_bucket = create_storage_chain_builder()
         mock_supabase.storage.from_.return_value = mock_storage_bucket
 
+        # Signed URLs cached by earlier tests would skip the mocked Storage calls
+        signed_url_cache.clear()
+
         yield mock_supabase, mock_db_response, mock_storage_response
@@ -3,7 +3,11 @@ from unittest.mock import MagicMock, patch
 import pytest
 from PIL import Image
 
-from server.services.process_image.background import remove_background
+from server.services.process_image.background import (
+    BackgroundRemovalError,
+    load_session,
+    remove_background,
+)
 
 
 @pytest.mark.asyncio
@@ -13,17 +17,21 @@ async def test_remove_background(mock_pil_image: MagicMock) -> None:
     mock_removed_image = MagicMock(spec=Image.Image)
     mock_converted_image = MagicMock(spec=Image.Image)
     mock_cropped_image = MagicMock(spec=Image.Image)
+    mock_session = MagicMock()
 
     # Setup chain of image operations
     mock_removed_image.convert.return_value = mock_converted_image
     mock_converted_image.crop.return_value = mock_cropped_image
-    with patch("server.services.process_image.background.remove") as mock_remove:
+    with patch("rembg.remove") as mock_remove, patch(
+        "server.services.process_image.background.get_session",
+        return_value=mock_session,
+    ):
         mock_remove.return_value = mock_removed_image
         # When
         result = await remove_background(mock_pil_image)
 
     # Then
-    mock_remove.assert_called_once_with(mock_pil_image)
+    mock_remove.assert_called_once_with(mock_pil_image, session=mock_session)
     mock_removed_image.convert.assert_called_once()
     mock_converted_image.crop.assert_called_once()
     assert result == mock_cropped_image
@@ -34,12 +42,93 @@ async def test_remove_background_exception_thrown(mock_pil_image: MagicMock) ->
     """Test error handling when background removal fails."""
     # Given
     error_msg = "Failed to remove background from image"
-    with patch("server.services.process_image.background.remove") as mock_remove:
+    with patch("rembg.remove") as mock_remove, patch(
+        "server.services.process_image.background.get_session",
+    ):
         mock_remove.side_effect = Exception(error_msg)
 
         # When
-        with pytest.raises(Exception) as exc_info:
+        with pytest.raises(BackgroundRemovalError) as exc_info:
             await remove_background(mock_pil_image)
 
     # Then
     assert str(exc_info.value) == error_msg
+
+
+def test_load_session() -> None:
+    """Test a session is created for the named model with the thread setting."""
+    # Given
+    mock_session_class = MagicMock()
+    mock_session_class.name.return_value = "u2netp"
+
+    with patch("rembg.sessions.sessions_class", [mock_session_class]):
+        # When
+        session = load_session("u2netp", threads=2)
+
+    # Then
+    model_name, options = mock_session_class.call_args.args
+    assert model_name == "u2netp"
+    assert options.intra_op_num_threads == 2
+    assert session == mock_session_class.return_value
+
+
+def test_load_session_unknown_model() -> None:
+    """Test an unknown model name raises an error."""
+    with patch("rembg.sessions.sessions_class", []), pytest.raises(ValueError):
+        load_session("not-a-model")
+
+
+@pytest.mark.asyncio
+async def test_remove_background_downscaled() -> None:
+    """Test large images are segmented on a bounded copy and masked at full size."""
+    # Given
+    image = Image.new("RGB", (4000, 2000), (255, 0, 0))
+
+    def mock_mask(small: Image.Image, **_: object) -> Image.Image:
+        # Foreground is the left half of the image
+        mask = Image.new("L", small.size, 0)
+        mask.paste(255, (0, 0, small.width // 2, small.height))
+        return mask
+
+    with patch("rembg.remove", side_effect=mock_mask) as mock_remove, patch(
+        "server.services.process_image.background.get_session",
+    ), patch(
+        "server.services.process_image.background.settings.rembg_max_side",
+        1000,
+    ):
+        # When
+        result = await remove_background(image)
+
+    # Then
+    small = mock_remove.call_args.args[0]
+    assert small.size == (1000, 500)
+    assert mock_remove.call_args.kwargs["only_mask"] is True
+    # Cropped to the foreground at full resolution, give or take the soft edge
+    # left by upsampling the mask
+    assert abs(result.width - 2000) <= 4
+    assert result.height == 2000
+    assert result.mode == "RGBA"
+    assert result.getpixel((0, 0)) == (255, 0, 0, 255)
+
+
+@pytest.mark.asyncio
+async def test_remove_background_small_image_not_downscaled() -> None:
+    """Test images within the size threshold are segmented at full size."""
+    # Given
+    image = Image.new("RGB", (800, 600))
+
+    with patch("rembg.remove") as mock_remove, patch(
+        "server.services.process_image.background.get_session",
+    ), patch(
+        "server.services.process_image.background.settings.rembg_max_side",
+        1000,
+    ):
+        mock_remove.return_value = Image.new("RGBA", (800, 600), (0, 0, 0, 255))
+
+        # When
+        result = await remove_background(image)
+
+    # Then
+    assert mock_remove.call_args.args[0] is image
+    assert "only_mask" not in mock_remove.call_args.kwargs
+    assert result.size == (800, 600)
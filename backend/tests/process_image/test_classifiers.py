@@ -0,0 +1,141 @@
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from server.config.settings import settings
+from server.services.process_image.classifiers import (
+    KerasClassifier,
+    OnnxClassifier,
+    export_onnx,
+)
+from server.services.process_image.image_class import preprocess_images
+
+
+def create_onnx_classifier(
+    tmp_path: Path,
+    class_index: dict[str, list[str]],
+    model_path: Path | None = None,
+) -> OnnxClassifier:
+    """Creates an ONNX classifier for a graph, with a class index file."""
+    class_index_path = tmp_path / "imagenet_class_index.json"
+    class_index_path.write_text(json.dumps(class_index))
+    return OnnxClassifier(
+        model_path or tmp_path / "resnet50.onnx",
+        class_index_path,
+        intra_op_threads=2,
+        inter_op_threads=1,
+    )
+
+
+def test_onnx_classifier_session_options(
+    tmp_path: Path,
+    class_index: dict[str, list[str]],
+) -> None:
+    """Test the inference session is created with the configured thread counts."""
+    with patch("onnxruntime.InferenceSession") as mock_session:
+        mock_session.return_value.get_inputs.return_value = [MagicMock()]
+
+        # When
+        create_onnx_classifier(tmp_path, class_index)
+
+    # Then
+    options = mock_session.call_args.args[1]
+    assert options.intra_op_num_threads == 2
+    assert options.inter_op_num_threads == 1
+    assert mock_session.call_args.kwargs["providers"] == ["CPUExecutionProvider"]
+
+
+def test_onnx_classifier_predict_and_decode(
+    tmp_path: Path,
+    class_index: dict[str, list[str]],
+) -> None:
+    """Test batches are run in chunks and decoded to the top ImageNet label."""
+    with patch("onnxruntime.InferenceSession") as mock_session:
+        session = mock_session.return_value
+        session.get_inputs.return_value = [MagicMock()]
+        session.get_inputs.return_value[0].name = "input"
+        # One-hot predictions for classes 2, 0, 1 across two chunks
+        session.run.side_effect = [
+            [np.array([[0, 0, 1], [1, 0, 0]], dtype=np.float32)],
+            [np.array([[0, 1, 0]], dtype=np.float32)],
+        ]
+        classifier = create_onnx_classifier(tmp_path, class_index)
+        batch = np.zeros((3, 224, 224, 3), dtype=np.float32)
+
+        # When
+        preds = classifier.predict(batch, batch_size=2)
+        labels = classifier.decode(preds)
+
+    # Then
+    assert session.run.call_count == 2
+    assert session.run.call_args_list[0].args[1]["input"].shape == (2, 224, 224, 3)
+    assert session.run.call_args_list[1].args[1]["input"].shape == (1, 224, 224, 3)
+    assert preds.shape == (3, 3)
+    assert labels == ["bird", "dog", "cat"]
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_onnx_parity_with_keras(tmp_path: Path) -> None:
+    """Test an exported ONNX graph gives the same predictions as the Keras model.
+
+    Uses a small 1000-class model, as exporting ResNet50 itself takes several GB
+    of memory. Skipped unless the optional `tf2onnx` package is installed.
+    """
+    pytest.importorskip("tf2onnx")
+    import keras
+
+    # Given
+    keras.utils.set_random_seed(0)
+    model = keras.Sequential(
+        [
+            keras.Input((224, 224, 3)),
+            keras.layers.Conv2D(8, 7, strides=4, activation="relu"),
+            keras.layers.GlobalAveragePooling2D(),
+            keras.layers.Dense(1000, activation="softmax"),
+        ],
+    )
+    keras_classifier = KerasClassifier(model)
+    export_onnx(model, tmp_path / "resnet50.onnx")
+    class_index = {str(i): [f"n{i:08d}", f"class_{i}"] for i in range(1000)}
+    onnx_classifier = create_onnx_classifier(tmp_path, class_index)
+    batch = np.random.default_rng(0).normal(0, 60, (8, 224, 224, 3))
+    batch = batch.astype(np.float32)
+
+    # When
+    keras_preds = keras_classifier.predict(batch, batch_size=8)
+    onnx_preds = onnx_classifier.predict(batch, batch_size=3)
+
+    # Then
+    np.testing.assert_allclose(keras_preds, onnx_preds, atol=1e-6)
+    assert onnx_classifier.decode(keras_preds) == onnx_classifier.decode(onnx_preds)
+
+
+@pytest.mark.skipif(
+    not settings.onnx_model_path.exists(),
+    reason="No exported ResNet50 graph (run `poetry run export-onnx`)",
+)
+def test_resnet50_onnx_top1_matches_keras() -> None:
+    """Test the exported ResNet50 graph gives the same top-1 labels as Keras."""
+    # Given
+    rng = np.random.default_rng(0)
+    images = [
+        Image.fromarray(rng.integers(0, 255, (h, w, 3), dtype=np.uint8))
+        for h, w in [(480, 640), (224, 224), (300, 120), (1000, 800)]
+    ]
+    batch = preprocess_images(images)
+    keras_classifier = KerasClassifier()
+    onnx_classifier = OnnxClassifier(
+        settings.onnx_model_path,
+        settings.onnx_class_index_path,
+    )
+
+    # When
+    keras_labels = keras_classifier.decode(keras_classifier.predict(batch, 4))
+    onnx_labels = onnx_classifier.decode(onnx_classifier.predict(batch, 4))
+
+    # Then
+    assert keras_labels == onnx_labels
@@ -0,0 +1,130 @@
+from server.services.db.models.schema_public_latest import Collection
+from server.services.process_image.collage.cache import (
+    CollageCache,
+    collage_etag,
+    etag_matches,
+)
+from server.services.process_image.collage.generator import CollageGenerator
+
+
+def test_etag_changes_with_inputs(collection: Collection) -> None:
+    """Test the ETag is stable, but changes with anything the collage shows."""
+    # Given
+    generator = CollageGenerator()
+    etag = collage_etag(collection, ["a.png", "b.png"], generator, "png")
+
+    # When
+    same = collage_etag(collection, ["a.png", "b.png"], CollageGenerator(), "png")
+    changed = [
+        collage_etag(
+            collection.model_copy(update={"title": "Renamed"}),
+            ["a.png", "b.png"],
+            generator,
+            "png",
+        ),
+        collage_etag(collection, ["b.png", "a.png"], generator, "png"),
+        collage_etag(collection, ["a.png"], generator, "png"),
+        collage_etag(collection, ["a.png", "b.png"], generator, "webp"),
+        collage_etag(
+            collection,
+            ["a.png", "b.png"],
+            CollageGenerator(canvas_size=(600, 800)),
+            "png",
+        ),
+    ]
+
+    # Then
+    assert same == etag
+    assert etag not in changed
+    assert len(set(changed)) == len(changed)
+
+
+def test_etag_matches() -> None:
+    """Test If-None-Match headers are matched against the ETag."""
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_get_hit_and_miss() -> None:
+    """Test collages are only returned for the ETag they were rendered with."""
+    # Given
+    cache = CollageCache(max_bytes=1000)
+    cache.put(1, "png", '"v1"', b"collage")
+
+    # When
+    hit = cache.get(1, "png", '"v1"')
+    stale = cache.get(1, "png", '"v2"')
+    other_format = cache.get(1, "webp", '"v1"')
+
+    # Then
+    assert hit == b"collage"
+    assert (stale, other_format) == (None, None)
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 2, 1)
+
+
+def test_put_replaces_older_render() -> None:
+    """Test only the latest render of a collection is kept."""
+    # Given
+    cache = CollageCache(max_bytes=1000)
+    cache.put(1, "png", '"v1"', b"old")
+
+    # When
+    cache.put(1, "png", '"v2"', b"newer")
+
+    # Then
+    assert cache.get(1, "png", '"v1"') is None
+    assert cache.get(1, "png", '"v2"') == b"newer"
+    assert cache.stats().size_bytes == len(b"newer")
+
+
+def test_evicts_least_recently_used() -> None:
+    """Test the least recently used collages are evicted to stay under budget."""
+    # Given
+    cache = CollageCache(max_bytes=20)
+    cache.put(1, "png", '"a"', b"x" * 8)
+    cache.put(2, "png", '"b"', b"x" * 8)
+    cache.get(1, "png", '"a"')
+
+    # When
+    cache.put(3, "png", '"c"', b"x" * 8)
+
+    # Then
+    assert cache.get(1, "png", '"a"') is not None
+    assert cache.get(2, "png", '"b"') is None
+    assert cache.get(3, "png", '"c"') is not None
+    assert cache.stats().evictions == 1
+
+
+def test_oversized_collage_not_cached() -> None:
+    """Test a collage larger than the whole budget isn't cached."""
+    # Given
+    cache = CollageCache(max_bytes=4)
+
+    # When
+    cache.put(1, "png", '"a"', b"too large")
+
+    # Then
+    assert cache.get(1, "png", '"a"') is None
+    assert cache.stats().entries == 0
+
+
+def test_invalidate() -> None:
+    """Test every format of an edited collection's collage is dropped."""
+    # Given
+    cache = CollageCache(max_bytes=1000)
+    cache.put(1, "png", '"a"', b"png")
+    cache.put(1, "webp", '"a"', b"webp")
+    cache.put(2, "png", '"b"', b"other")
+
+    # When
+    cache.invalidate([1])
+
+    # Then
+    assert cache.get(1, "png", '"a"') is None
+    assert cache.get(1, "webp", '"a"') is None
+    assert cache.get(2, "png", '"b"') == b"other"
+    assert cache.stats().invalidations == 2
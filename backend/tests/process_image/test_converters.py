@@ -1,15 +1,24 @@
 from io import BytesIO
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
 import pytest
 from PIL import Image
 
 from server.services.process_image.converters import (
-    pil_to_png_bytes,
+    encode_image,
+    pil_to_bytes,
     upload_file_to_pil,
 )
 
 
+@pytest.fixture
+def noisy_image() -> Image.Image:
+    """A 1600x1200 image that compresses poorly (about 5.5 MB as PNG)."""
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 255, (1200, 1600, 3), dtype=np.uint8))
+
+
 @pytest.mark.asyncio
 async def test_upload_file_to_pil(
     mock_upload_file: AsyncMock,
@@ -34,65 +43,93 @@ async def test_upload_file_to_pil(
     assert result == mock_pil_image
 
 
-@pytest.mark.asyncio
-async def test_pil_to_png_bytes_no_resize(mock_pil_image: MagicMock) -> None:
-    """Test converting PIL image to PNG bytes without needing to resize."""
+def test_encode_image_fits_without_resize() -> None:
+    """Test an image already under the budget is encoded once, at full size."""
     # Given
-    mock_buffer = MagicMock(spec=BytesIO)
-    mock_buffer.tell.return_value = 300 * 1024  # below 500KB threshold
-    expected_bytes = b"test png data"
-    mock_buffer.getvalue.return_value = expected_bytes
+    image = Image.new("RGB", (800, 600), (255, 0, 0))
 
-    with patch(
-        "server.services.process_image.converters.BytesIO",
-    ) as mock_bytesio, patch(
-        "server.services.process_image.converters.logger",
-    ) as mock_logger:
-        mock_bytesio.return_value = mock_buffer
+    with patch.object(Image.Image, "resize") as mock_resize:
         # When
-        result = await pil_to_png_bytes(mock_pil_image)
+        result = encode_image(image)
 
     # Then
-    mock_bytesio.assert_called_once()
-    mock_pil_image.save.assert_called_once_with(
-        mock_buffer,
-        format="PNG",
-        compress_level=6,
-    )
-    mock_buffer.tell.assert_called_once()
-    mock_logger.info.assert_called_once()
-    assert result == expected_bytes
+    mock_resize.assert_not_called()
+    output = Image.open(BytesIO(result))
+    assert output.format == "PNG"
+    assert output.size == (800, 600)
 
 
-@pytest.mark.asyncio
-async def test_pil_to_png_bytes_with_resize(mock_pil_image: MagicMock) -> None:
-    """Test converting PIL image to PNG bytes with resizing for large images.
+@pytest.mark.parametrize(
+    ("output_format", "expected_format"),
+    [("png", "PNG"), ("png8", "PNG"), ("webp", "WEBP")],
+)
+def test_encode_image_fits_budget(
+    noisy_image: Image.Image,
+    output_format: str,
+    expected_format: str,
+) -> None:
+    """Test a large image is scaled to fit the budget in at most three encodes."""
+    # Given
+    with patch.object(
+        Image.Image,
+        "save",
+        autospec=True,
+        side_effect=Image.Image.save,
+    ) as mock_save:
+        # When
+        result = encode_image(noisy_image, output_format, max_size_kb=200)
+
+    # Then
+    assert len(result) <= 200 * 1024
+    assert mock_save.call_count <= 3
+    output = Image.open(BytesIO(result))
+    assert output.format == expected_format
+    assert output.width < 1600
+    # Aspect ratio is kept
+    assert abs(output.width / output.height - 4 / 3) < 0.01
 
-    First call over size limit, second call under limit
-    """
+
+def test_encode_image_min_side(noisy_image: Image.Image) -> None:
+    """Test images are never scaled below the minimum size, even over budget."""
+    # When
+    result = encode_image(noisy_image, max_size_kb=1)
+
+    # Then
+    output = Image.open(BytesIO(result))
+    assert output.size == (200, 150)
+    assert len(result) > 1024
+
+
+def test_encode_image_png8_keeps_transparency() -> None:
+    """Test palette PNGs keep the alpha channel of the image."""
     # Given
-    mock_buffer = MagicMock(spec=BytesIO)
-    mock_buffer.tell.side_effect = [600 * 1024, 450 * 1024]
-    expected_bytes = b"test png data resized"
-    mock_buffer.getvalue.return_value = expected_bytes
+    image = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+    image.paste((255, 0, 0, 255), (25, 25, 75, 75))
+
+    # When
+    result = encode_image(image, "png8")
 
-    resized_image = MagicMock(spec=Image.Image)
-    mock_pil_image.resize.return_value = resized_image
+    # Then
+    output = Image.open(BytesIO(result))
+    assert output.mode == "P"
+    rgba = output.convert("RGBA")
+    assert rgba.getpixel((0, 0))[3] == 0
+    assert rgba.getpixel((50, 50)) == (255, 0, 0, 255)
+
+
+@pytest.mark.asyncio
+async def test_pil_to_bytes() -> None:
+    """Test encoding runs with the given format and size budget."""
+    # Given
+    image = Image.new("RGB", (10, 10))
 
     with patch(
-        "server.services.process_image.converters.BytesIO",
-    ) as mock_bytesio, patch(
-        "server.services.process_image.converters.logger",
-    ) as mock_logger:
-        mock_bytesio.return_value = mock_buffer
+        "server.services.process_image.converters.encode_image",
+        return_value=b"encoded",
+    ) as mock_encode_image:
         # When
-        result = await pil_to_png_bytes(mock_pil_image)
+        result = await pil_to_bytes(image, "webp", max_size_kb=100)
 
     # Then
-    assert mock_bytesio.call_count == 1
-    assert mock_buffer.tell.call_count == 2
-    assert mock_logger.info.call_count == 2
-    mock_pil_image.resize.assert_called_once()
-    assert mock_pil_image.save.call_count == 1
-    assert resized_image.save.call_count == 1
-    assert result == expected_bytes
+    mock_encode_image.assert_called_once_with(image, "webp", 100)
+    assert result == b"encoded"
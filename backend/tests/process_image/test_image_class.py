@@ -1,179 +1,136 @@
 from unittest.mock import MagicMock, patch
 
 import numpy as np
+from PIL import Image
 
-from server.services.process_image.image_class import predict_class
+from server.services.process_image.image_class import (
+    CLASSIFIERS,
+    predict_class,
+    predict_classes,
+    preprocess_images,
+)
+from server.services.process_image.model_registry import model_registry
 
 
 class TestImageClassification:
     """Test suite for image classification functions."""
 
-    def test_predict_class(
-        self,
-        numpy_image: np.ndarray,
-        mock_pil_image: MagicMock,
-    ) -> None:
-        """Test predict_class function with a valid image."""
-        numpy_image = np.zeros((224, 224, 3), dtype=np.uint8)
-
-        # Mock the necessary components
-        with patch("cv2.cvtColor", return_value=numpy_image) as mock_cvtcolor, patch(
-            "cv2.resize",
-            return_value=numpy_image,
-        ) as mock_resize, patch(
-            "server.services.process_image.image_class.image.img_to_array",
-            return_value=np.zeros((224, 224, 3)),
-        ) as mock_img_to_array, patch(
-            "numpy.expand_dims",
-            return_value=np.zeros((1, 224, 224, 3)),
-        ) as mock_expand_dims, patch(
-            "server.services.process_image.image_class.preprocess_input",
-        ) as mock_preprocess, patch(
-            "server.services.process_image.image_class.decode_predictions",
-        ) as mock_decode:
-
-            # Create a mock model with a predict function
-            mock_model = MagicMock()
-            mock_model.predict.return_value = np.array(
-                [[0.8] + [0.1] * 999],
-            )  # Shape (1, 1000)
-
-            # Mock the model in the actual function
-            with patch("server.services.process_image.image_class.model", mock_model):
-                # Set up mocks
-                mock_pil_image.size = (300, 200)
-                mock_pil_image.mode = "RGB"
-                mock_pil_image.convert.return_value = mock_pil_image
-
-                # Convert PIL to numpy array
-                np_arr = np.array(numpy_image)
-
-                # Create a properly sized padded image for the test
-                padded_image = np.zeros((224, 224, 3), dtype=np.uint8)
-
-                with patch("numpy.array", return_value=np_arr), patch(
-                    "numpy.zeros",
-                    return_value=padded_image,
-                ):
-                    # Mock prediction results
-                    mock_decode.return_value = [[("n01234567", "dog", 0.8)]]
-
-                    # Call the function
-                    result = predict_class(mock_pil_image)
-
-                    # Assert
-                    mock_cvtcolor.assert_called_once()
-                    mock_resize.assert_called_once()
-                    mock_img_to_array.assert_called_once()
-                    mock_expand_dims.assert_called_once()
-                    mock_preprocess.assert_called_once()
-                    mock_model.predict.assert_called_once()
-                    mock_decode.assert_called_once()
-                    assert result == "dog"
-
-    def test_predict_class_wide_image(
-        self,
-        numpy_image: np.ndarray,
-        mock_pil_image: MagicMock,
-    ) -> None:
-        """Test predict_class function with a wide image."""
-        numpy_image = np.zeros((224, 224, 3), dtype=np.uint8)
-
-        # Mock the necessary components
-        with patch("cv2.cvtColor", return_value=numpy_image) as _, patch(
-            "cv2.resize",
-            return_value=numpy_image,
-        ) as mock_resize, patch(
-            "server.services.process_image.image_class.image.img_to_array",
-            return_value=np.zeros((224, 224, 3)),
-        ) as _, patch(
-            "numpy.expand_dims",
-            return_value=np.zeros((1, 224, 224, 3)),
-        ) as _, patch(
-            "server.services.process_image.image_class.preprocess_input",
-        ) as _, patch(
-            "server.services.process_image.image_class.decode_predictions",
-        ) as mock_decode:
-
-            # Create a mock model with a predict function
-            mock_model = MagicMock()
-            mock_model.predict.return_value = np.array(
-                [[0.7] + [0.2] * 999],
-            )  # Shape (1, 1000)
-
-            # Mock the model in the actual function
-            with patch("server.services.process_image.image_class.model", mock_model):
-                # Set up mocks for wide image
-                mock_pil_image.size = (400, 100)  # Wide image
-                np_arr = np.array(numpy_image)
-
-                # Create a properly sized padded image for the test
-                padded_image = np.zeros((224, 224, 3), dtype=np.uint8)
-
-                with patch("numpy.array", return_value=np_arr), patch(
-                    "numpy.zeros",
-                    return_value=padded_image,
-                ):
-                    # Mock prediction results
-                    mock_decode.return_value = [[("n01234568", "cat", 0.7)]]
-
-                    # Call the function
-                    result = predict_class(mock_pil_image)
-
-                    # Verify resize was called with correct parameters
-                    # (maintaining aspect ratio)
-                    mock_resize.assert_called_once()
-                    assert result == "cat"
-
-    def test_predict_class_tall_image(
-        self,
-        numpy_image: np.ndarray,
-        mock_pil_image: MagicMock,
-    ) -> None:
-        """Test predict_class function with a tall image."""
-        numpy_image = np.zeros((224, 224, 3), dtype=np.uint8)
-
-        # Mock the necessary components
-        with patch("cv2.cvtColor", return_value=numpy_image) as _, patch(
-            "cv2.resize",
-            return_value=numpy_image,
-        ) as mock_resize, patch(
-            "server.services.process_image.image_class.image.img_to_array",
-            return_value=np.zeros((224, 224, 3)),
-        ) as _, patch(
-            "numpy.expand_dims",
-            return_value=np.zeros((1, 224, 224, 3)),
-        ) as _, patch(
-            "server.services.process_image.image_class.preprocess_input",
-        ) as _, patch(
-            "server.services.process_image.image_class.decode_predictions",
-        ) as mock_decode:
-
-            # Create a mock model with a predict function
-            mock_model = MagicMock()
-            mock_model.predict.return_value = np.array(
-                [[0.9] + [0.05] * 999],
-            )  # Shape (1, 1000)
-
-            with patch("server.services.process_image.image_class.model", mock_model):
-                # Set up mocks for tall image
-                mock_pil_image.size = (100, 400)  # Tall image
-                np_arr = np.array(numpy_image)
-
-                # Create a properly sized padded image for the test
-                padded_image = np.zeros((224, 224, 3), dtype=np.uint8)
-
-                with patch("numpy.array", return_value=np_arr), patch(
-                    "numpy.zeros",
-                    return_value=padded_image,
-                ):
-                    # Mock prediction results
-                    mock_decode.return_value = [[("n01234569", "bird", 0.9)]]
-
-                    # Call the function
-                    result = predict_class(mock_pil_image)
-
-                    # Verify resize was called with correct parameters
-                    # (maintaining aspect ratio)
-                    mock_resize.assert_called_once()
-                    assert result == "bird"
+    def test_preprocess_images_shape(self) -> None:
+        """Test images of different sizes are stacked into one contiguous batch."""
+        # Given
+        images = [
+            Image.new("RGB", (300, 200)),
+            Image.new("RGBA", (50, 50)),
+            Image.new("L", (10, 40)),
+        ]
+
+        # When
+        batch = preprocess_images(images)
+
+        # Then
+        assert batch.shape == (3, 224, 224, 3)
+        assert batch.dtype == np.float32
+        assert batch.flags["C_CONTIGUOUS"]
+
+    def test_preprocess_images_wide_image(self) -> None:
+        """Test a wide image is centered with padding above and below."""
+        # Given
+        wide_image = Image.new("RGB", (400, 100), (255, 255, 255))
+
+        # When
+        batch = preprocess_images([wide_image])
+
+        # Then
+        # 400x100 -> 224x56, centered vertically with 84 rows of padding each side
+        padding, content = batch[0, 0], batch[0, 112]
+        assert not np.array_equal(padding, content)
+        assert np.array_equal(batch[0, 0], batch[0, 83])
+        assert np.array_equal(batch[0, 84], batch[0, 139])
+        assert np.array_equal(batch[0, 0], batch[0, 140])
+
+    def test_preprocess_images_tall_image(self) -> None:
+        """Test a tall image is centered with padding left and right."""
+        # Given
+        tall_image = Image.new("RGB", (100, 400), (255, 255, 255))
+
+        # When
+        batch = preprocess_images([tall_image])
+
+        # Then
+        assert not np.array_equal(batch[0, :, 0], batch[0, :, 112])
+        assert np.array_equal(batch[0, :, 0], batch[0, :, 223])
+
+    def test_preprocess_images_matches_single_image(self) -> None:
+        """Test batch preprocessing gives the same input as one image at a time."""
+        # Given
+        rng = np.random.default_rng(0)
+        images = [
+            Image.fromarray(rng.integers(0, 255, (h, w, 3), dtype=np.uint8))
+            for h, w in [(120, 80), (64, 300), (224, 224)]
+        ]
+
+        # When
+        batch = preprocess_images(images)
+
+        # Then
+        for i, image in enumerate(images):
+            assert np.array_equal(batch[i], preprocess_images([image])[0])
+
+    def test_predict_classes(self) -> None:
+        """Test classifying a batch uses one forward pass and keeps image order."""
+        # Given
+        images = [Image.new("RGB", (300, 200)) for _ in range(3)]
+        mock_classifier = MagicMock()
+        mock_classifier.predict.return_value = np.zeros((3, 1000))
+        mock_classifier.decode.return_value = ["dog", "cat", "bird"]
+
+        with patch(
+            "server.services.process_image.image_class.get_classifier",
+            return_value=mock_classifier,
+        ):
+            # When
+            result = predict_classes(images, batch_size=16)
+
+        # Then
+        mock_classifier.predict.assert_called_once()
+        batch, batch_size = mock_classifier.predict.call_args.args
+        assert batch.shape == (3, 224, 224, 3)
+        assert batch_size == 16
+        mock_classifier.decode.assert_called_once_with(
+            mock_classifier.predict.return_value,
+        )
+        assert result == ["dog", "cat", "bird"]
+
+    def test_predict_classes_empty(self) -> None:
+        """Test classifying no images skips loading the model entirely."""
+        with patch(
+            "server.services.process_image.image_class.get_classifier",
+        ) as mock_get_classifier:
+            # When
+            result = predict_classes([])
+
+        # Then
+        mock_get_classifier.assert_not_called()
+        assert result == []
+
+    def test_model_not_loaded_on_import(self) -> None:
+        """Test importing the module does not build any classifier."""
+        # Then
+        for name in CLASSIFIERS.values():
+            assert not model_registry.is_loaded(name)
+
+    def test_predict_class(self) -> None:
+        """Test predict_class is the single-image case of predict_classes."""
+        # Given
+        image = Image.new("RGB", (300, 200))
+
+        with patch(
+            "server.services.process_image.image_class.predict_classes",
+            return_value=["dog"],
+        ) as mock_predict_classes:
+            # When
+            result = predict_class(image)
+
+        # Then
+        mock_predict_classes.assert_called_once_with([image])
+        assert result == "dog"
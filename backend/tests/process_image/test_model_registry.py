@@ -0,0 +1,112 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from server.application import warmup_models
+from server.services.process_image.background import REMBG_SESSION
+from server.services.process_image.image_class import CLASSIFIERS
+from server.services.process_image.model_registry import ModelRegistry
+
+
+def test_get_loads_model_once() -> None:
+    """Test a model is only built on first use, and reused afterwards."""
+    # Given
+    registry = ModelRegistry()
+    loader = MagicMock(return_value="model")
+    registry.register("test", loader)
+
+    # Then
+    loader.assert_not_called()
+    assert not registry.is_loaded("test")
+
+    # When
+    first = registry.get("test")
+    second = registry.get("test")
+
+    # Then
+    loader.assert_called_once()
+    assert first == second == "model"
+    assert registry.is_loaded("test")
+
+
+def test_get_concurrent_first_use() -> None:
+    """Test concurrent first uses of a model only load it once."""
+    # Given
+    registry = ModelRegistry()
+    loader = MagicMock(return_value="model")
+    registry.register("test", loader)
+
+    # When
+    threads = [threading.Thread(target=registry.get, args=("test",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    loader.assert_called_once()
+
+
+def test_get_unregistered_model() -> None:
+    """Test requesting an unknown model raises an error."""
+    registry = ModelRegistry()
+
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_stats() -> None:
+    """Test load statistics are reported before and after loading."""
+    # Given
+    registry = ModelRegistry()
+    registry.register("test", lambda: "model")
+
+    # When
+    before = registry.stats()
+    registry.get("test")
+    after = registry.stats()
+
+    # Then
+    assert before[0].name == "test"
+    assert before[0].loaded is False
+    assert before[0].load_seconds is None
+    assert after[0].loaded is True
+    assert after[0].load_seconds is not None
+    assert after[0].rss_delta_mb is not None
+
+
+def test_warmup() -> None:
+    """Test warmup loads models in the background, tolerating failures."""
+    # Given
+    registry = ModelRegistry()
+    registry.register("broken", MagicMock(side_effect=Exception("no weights")))
+    registry.register("test", lambda: "model")
+
+    # When
+    registry.warmup().join()
+
+    # Then
+    assert not registry.is_loaded("broken")
+    assert registry.is_loaded("test")
+
+
+@pytest.mark.parametrize(("backend", "other"), [("onnx", "keras"), ("keras", "onnx")])
+def test_warmup_models_configured_backend(backend: str, other: str) -> None:
+    """Test app warmup only loads the configured classifier backend."""
+    # Given
+    registry = ModelRegistry()
+    for name in [*CLASSIFIERS.values(), REMBG_SESSION]:
+        registry.register(name, MagicMock(return_value=name))
+
+    # When
+    with (
+        patch("server.application.model_registry", registry),
+        patch("server.application.settings.classification_backend", backend),
+    ):
+        warmup_models().join()
+
+    # Then
+    assert registry.is_loaded(CLASSIFIERS[backend])
+    assert registry.is_loaded(REMBG_SESSION)
+    assert not registry.is_loaded(CLASSIFIERS[other])
@@ -0,0 +1,186 @@
+import asyncio
+import tempfile
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator
+
+import pytest
+import pytest_asyncio
+from pydantic import UUID4
+
+from server.api.websocket.broker import InMemoryBroker, UnixSocketBroker
+
+
+class Inbox:
+    """Collects the messages handed to a worker by its broker."""
+
+    def __init__(self) -> None:
+        self.messages: asyncio.Queue[tuple[UUID4, str]] = asyncio.Queue()
+
+    async def __call__(self, user_id: UUID4, data: str) -> None:
+        """Receives a message."""
+        await self.messages.put((user_id, data))
+
+    async def next(self) -> tuple[UUID4, str]:
+        """The next message received (failing if none arrives)."""
+        return await asyncio.wait_for(self.messages.get(), timeout=2)
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 2) -> None:
+    """Waits for a condition to hold (failing if it doesn't in time)."""
+
+    async def poll() -> None:
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.fixture
+def socket_path() -> Iterator[str]:
+    """A path for the broker's socket (short, as Unix socket paths must be)."""
+    with tempfile.TemporaryDirectory(dir="/tmp") as directory:
+        yield str(Path(directory) / "ws.sock")
+
+
+@pytest_asyncio.fixture
+async def brokers(
+    socket_path: str,
+) -> AsyncIterator[tuple[UnixSocketBroker, UnixSocketBroker, Inbox, Inbox]]:
+    """A hub and a client broker (two workers), each with its inbox."""
+    hub, client = UnixSocketBroker(socket_path), UnixSocketBroker(socket_path)
+    hub_inbox, client_inbox = Inbox(), Inbox()
+    await hub.start(hub_inbox)
+    await wait_until(lambda: hub.is_hub)
+    await client.start(client_inbox)
+    await wait_until(lambda: client._hub is not None)  # noqa: SLF001
+    yield hub, client, hub_inbox, client_inbox
+    await client.stop()
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_broker() -> None:
+    """Test messages are only handed over for subscribed users."""
+    # Given
+    broker, inbox = InMemoryBroker(), Inbox()
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    await broker.start(inbox)
+    await broker.subscribe(user_id)
+
+    # When
+    await broker.publish(other_user_id, '"ignored"')
+    await broker.publish(user_id, '"hello"')
+
+    # Then
+    assert await inbox.next() == (user_id, '"hello"')
+    assert inbox.messages.empty()
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_fans_out(
+    brokers: tuple[UnixSocketBroker, UnixSocketBroker, Inbox, Inbox],
+) -> None:
+    """Test messages reach the worker with the user's sessions, from any worker."""
+    hub, client, hub_inbox, client_inbox = brokers
+
+    # Given
+    hub_user, client_user = uuid.uuid4(), uuid.uuid4()
+    await hub.subscribe(hub_user)
+    await client.subscribe(client_user)
+    await wait_until(lambda: client_user in hub._routes)  # noqa: SLF001
+
+    # When
+    await hub.publish(client_user, '{"from": "hub"}')
+    await client.publish(hub_user, '{"from": "client"}')
+    await client.publish(client_user, '{"from": "client"}')
+
+    # Then
+    assert await client_inbox.next() == (client_user, '{"from": "hub"}')
+    assert await hub_inbox.next() == (hub_user, '{"from": "client"}')
+    assert await client_inbox.next() == (client_user, '{"from": "client"}')
+    assert hub_inbox.messages.empty()
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_unsubscribe(
+    brokers: tuple[UnixSocketBroker, UnixSocketBroker, Inbox, Inbox],
+) -> None:
+    """Test workers stop receiving a user's messages once their sessions are gone."""
+    hub, client, _, client_inbox = brokers
+
+    # Given
+    user_id = uuid.uuid4()
+    await client.subscribe(user_id)
+    await wait_until(lambda: user_id in hub._routes)  # noqa: SLF001
+
+    # When
+    await client.unsubscribe(user_id)
+    await wait_until(lambda: user_id not in hub._routes)  # noqa: SLF001
+    await hub.publish(user_id, '"late"')
+    await asyncio.sleep(0.05)
+
+    # Then
+    assert client_inbox.messages.empty()
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_takeover(
+    socket_path: str,
+    brokers: tuple[UnixSocketBroker, UnixSocketBroker, Inbox, Inbox],
+) -> None:
+    """Test another worker hosts the hub once its worker exits, keeping its users."""
+    hub, client, _, client_inbox = brokers
+
+    # Given
+    user_id = uuid.uuid4()
+    await client.subscribe(user_id)
+
+    # When
+    await hub.stop()
+    await wait_until(lambda: client.is_hub)
+    newcomer = UnixSocketBroker(socket_path)
+    await newcomer.start(Inbox())
+    await wait_until(lambda: newcomer._hub is not None)  # noqa: SLF001
+    await newcomer.publish(user_id, '"after takeover"')
+
+    # Then
+    assert await client_inbox.next() == (user_id, '"after takeover"')
+    await newcomer.stop()
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_replays_unacknowledged(
+    brokers: tuple[UnixSocketBroker, UnixSocketBroker, Inbox, Inbox],
+) -> None:
+    """Test the hub replays messages to a worker subscribing, until acknowledged."""
+    hub, client, _, client_inbox = brokers
+
+    # Given
+    user_id = uuid.uuid4()
+    await client.publish(user_id, '"sent offline"', "a")
+    await client.publish(user_id, '"acknowledged"', "b")
+    await wait_until(lambda: len(hub.outbox) == 2)
+
+    # When
+    await client.ack(user_id, "b")
+    await wait_until(lambda: len(hub.outbox) == 1)
+    await client.subscribe(user_id)
+
+    # Then
+    assert await client_inbox.next() == (user_id, '"sent offline"')
+    await asyncio.sleep(0.05)
+    assert client_inbox.messages.empty()
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_holds_outbox(
+    brokers: tuple[UnixSocketBroker, UnixSocketBroker, Inbox, Inbox],
+) -> None:
+    """Test only the hub's outbox is reported as the one in use."""
+    hub, client, _, _ = brokers
+
+    # Then
+    assert hub.holds_outbox
+    assert not client.holds_outbox
+    assert InMemoryBroker().holds_outbox
@@ -0,0 +1,292 @@
+import asyncio
+import uuid
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from server.api.websocket.broker import InMemoryBroker, UnixSocketBroker
+from server.api.websocket.manager import (
+    CLOSE_IDLE,
+    CLOSE_SEND_FAILED,
+    CLOSE_TOO_SLOW,
+    PING,
+    WebSocketManager,
+)
+from server.api.websocket.models import WebSocketMessage, WSMessageType
+from server.api.websocket.session import WebSocketSession
+
+MESSAGE = WebSocketMessage(type=WSMessageType.RECOMMENDATION, body=[1, 2])
+
+
+def mock_websocket() -> MagicMock:
+    """A WebSocket accepting connections and sends."""
+    return MagicMock(accept=AsyncMock(), send_text=AsyncMock(), close=AsyncMock())
+
+
+async def hang(_: str) -> None:
+    """A send that never completes (a client that stopped reading)."""
+    await asyncio.Event().wait()
+
+
+async def drain() -> None:
+    """Lets the sessions' writer tasks run."""
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_send_message_to_sessions() -> None:
+    """Test messages are sent to every session of the user, through the broker."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker())
+    await manager.start()
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    sessions = [mock_websocket() for _ in range(3)]
+    await manager.connect(user_id, uuid.uuid4(), sessions[0])
+    await manager.connect(user_id, uuid.uuid4(), sessions[1])
+    await manager.connect(other_user_id, uuid.uuid4(), sessions[2])
+
+    # When
+    await manager.send_message(user_id, MESSAGE)
+    await drain()
+
+    # Then
+    sessions[0].send_text.assert_awaited_once()
+    (data,) = sessions[0].send_text.await_args.args
+    sent = WebSocketMessage.model_validate_json(data)
+    assert (sent.type, sent.body) == (MESSAGE.type, MESSAGE.body)
+    assert sent.id is not None
+    sessions[1].send_text.assert_awaited_once_with(data)
+    sessions[2].send_text.assert_not_awaited()
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_session_does_not_block() -> None:
+    """Test a session stuck sending doesn't hold up the sender or other sessions."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker())
+    await manager.start()
+    user_id = uuid.uuid4()
+    stuck, healthy = mock_websocket(), mock_websocket()
+    stuck.send_text.side_effect = hang
+    await manager.connect(user_id, uuid.uuid4(), stuck)
+    await manager.connect(user_id, uuid.uuid4(), healthy)
+
+    # When
+    await asyncio.wait_for(manager.send_message(user_id, MESSAGE), timeout=1)
+    await drain()
+
+    # Then
+    healthy.send_text.assert_awaited_once()
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_session_is_closed() -> None:
+    """Test a session whose send fails is disconnected and closed."""
+    # Given
+    broker = InMemoryBroker()
+    manager = WebSocketManager(broker)
+    await manager.start()
+    user_id = uuid.uuid4()
+    websocket = mock_websocket()
+    websocket.send_text.side_effect = RuntimeError("Connection reset")
+    await manager.connect(user_id, uuid.uuid4(), websocket)
+
+    # When
+    await manager.send_message(user_id, MESSAGE)
+    await drain()
+
+    # Then
+    assert manager.state.connections == {}
+    assert broker.subscriptions == set()
+    websocket.close.assert_awaited_once_with(code=CLOSE_SEND_FAILED)
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_overflowing_session_is_closed() -> None:
+    """Test a session too far behind is closed, with the disconnect policy."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker())
+    await manager.start()
+    user_id = uuid.uuid4()
+    websocket = mock_websocket()
+    websocket.send_text.side_effect = hang
+
+    with patch(
+        "server.api.websocket.manager.WebSocketSession",
+        partial(WebSocketSession, queue_size=1, overflow="disconnect"),
+    ):
+        await manager.connect(user_id, uuid.uuid4(), websocket)
+
+    # When
+    for _ in range(3):
+        await manager.send_message(user_id, MESSAGE)
+        await drain()
+
+    # Then
+    assert manager.state.connections == {}
+    websocket.close.assert_awaited_once_with(code=CLOSE_TOO_SLOW)
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscriptions_follow_sessions() -> None:
+    """Test the worker subscribes to a user while it has any of their sessions."""
+    # Given
+    broker = InMemoryBroker()
+    manager = WebSocketManager(broker)
+    user_id = uuid.uuid4()
+    first, second = uuid.uuid4(), uuid.uuid4()
+
+    # When
+    await manager.connect(user_id, first, mock_websocket())
+    await manager.connect(user_id, second, mock_websocket())
+    await manager.disconnect(user_id, first)
+
+    # Then
+    assert broker.subscriptions == {user_id}
+
+    # When
+    await manager.disconnect(user_id, second)
+
+    # Then
+    assert broker.subscriptions == set()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_pings_sessions() -> None:
+    """Test heartbeats ping every session, except those with messages queued."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker(), heartbeat_interval=0.01)
+    await manager.start()
+    user_id = uuid.uuid4()
+    websocket = mock_websocket()
+    await manager.connect(user_id, uuid.uuid4(), websocket)
+
+    # When
+    await asyncio.sleep(0.05)
+
+    # Then
+    websocket.send_text.assert_awaited_with(PING)
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_reaps_idle_sessions() -> None:
+    """Test sessions not heard from within the idle timeout are closed."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker(), heartbeat_interval=0, idle_timeout=5)
+    await manager.start()
+    user_id, idle_id, alive_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    idle, alive = mock_websocket(), mock_websocket()
+    await manager.connect(user_id, idle_id, idle)
+    await manager.connect(user_id, alive_id, alive)
+    for session in manager.state.connections[user_id].sessions.values():
+        session.last_seen -= 10
+
+    # When
+    manager.touch(user_id, alive_id)
+    await manager.heartbeat()
+
+    # Then
+    idle.close.assert_awaited_once_with(code=CLOSE_IDLE)
+    alive.close.assert_not_awaited()
+    assert list(manager.state.connections[user_id].sessions) == [alive_id]
+    assert manager.stats().reaped == 1
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_stats() -> None:
+    """Test stats count connections and the messages sent to them."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker())
+    await manager.start()
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    await manager.connect(user_id, uuid.uuid4(), mock_websocket())
+    await manager.connect(user_id, uuid.uuid4(), mock_websocket())
+    await manager.connect(other_user_id, uuid.uuid4(), mock_websocket())
+
+    # When
+    await manager.send_message(user_id, MESSAGE)
+    await drain()
+    stats = manager.stats()
+
+    # Then
+    assert stats.users == 2
+    assert stats.sessions == 3
+    assert stats.messages_sent == 2
+    assert stats.send_failures == 0
+    assert 0 <= stats.send_latency_p50_ms <= stats.send_latency_max_ms
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_offline_user_gets_message_on_connecting() -> None:
+    """Test a message sent while the user is offline is replayed once they connect."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker())
+    await manager.start()
+    user_id = uuid.uuid4()
+    await manager.send_message(user_id, MESSAGE)
+
+    # When
+    websocket = mock_websocket()
+    await manager.connect(user_id, uuid.uuid4(), websocket)
+    await drain()
+
+    # Then
+    (data,) = websocket.send_text.await_args.args
+    assert WebSocketMessage.model_validate_json(data).body == MESSAGE.body
+    assert manager.stats().replayed == 1
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_acknowledged_message_is_not_replayed() -> None:
+    """Test messages are no longer replayed once a session acknowledges them."""
+    # Given
+    manager = WebSocketManager(InMemoryBroker())
+    await manager.start()
+    user_id, session_id = uuid.uuid4(), uuid.uuid4()
+    websocket = mock_websocket()
+    await manager.connect(user_id, session_id, websocket)
+    await manager.send_message(user_id, MESSAGE)
+    await drain()
+    (data,) = websocket.send_text.await_args.args
+    message_id = WebSocketMessage.model_validate_json(data).id
+
+    # When
+    await manager.receive(user_id, "pong")
+    await manager.receive(
+        user_id,
+        WebSocketMessage(type=WSMessageType.ACK, body=message_id).model_dump_json(),
+    )
+    await manager.disconnect(user_id, session_id)
+    reconnected = mock_websocket()
+    await manager.connect(user_id, uuid.uuid4(), reconnected)
+    await drain()
+
+    # Then
+    reconnected.send_text.assert_not_awaited()
+    stats = manager.stats()
+    assert (stats.acked, stats.outbox_messages) == (1, 0)
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_stats_outbox_only_where_held() -> None:
+    """Test outbox counters are left out by workers whose outbox isn't in use."""
+    # Given
+    broker = MagicMock(spec=UnixSocketBroker, holds_outbox=False)
+    manager = WebSocketManager(broker)
+
+    # When
+    stats = manager.stats()
+
+    # Then
+    assert stats.outbox_messages is None
+    assert stats.acked is None
@@ -0,0 +1,73 @@
+import uuid
+from unittest.mock import patch
+
+from server.api.websocket.outbox import Outbox
+
+
+def test_replay_oldest_first() -> None:
+    """Test a user's unacknowledged messages are replayed in the order sent."""
+    # Given
+    outbox = Outbox(max_messages=5, ttl=60)
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    outbox.add(user_id, "a", '"first"')
+    outbox.add(other_user_id, "b", '"other"')
+    outbox.add(user_id, "c", '"second"')
+
+    # When
+    messages = outbox.replay(user_id)
+
+    # Then
+    assert messages == [("a", '"first"'), ("c", '"second"')]
+    assert outbox.replayed == 2
+
+
+def test_ack() -> None:
+    """Test acknowledged messages are dropped, and unknown IDs are ignored."""
+    # Given
+    outbox = Outbox(max_messages=5, ttl=60)
+    user_id = uuid.uuid4()
+    outbox.add(user_id, "a", '"first"')
+
+    # When
+    acked = outbox.ack(user_id, "a")
+    acked_again = outbox.ack(user_id, "a")
+
+    # Then
+    assert (acked, acked_again) == (True, False)
+    assert outbox.replay(user_id) == []
+    assert (len(outbox), outbox.users) == (0, 0)
+
+
+def test_bounded_per_user() -> None:
+    """Test the oldest messages are evicted once a user's outbox is full."""
+    # Given
+    outbox = Outbox(max_messages=2, ttl=60)
+    user_id = uuid.uuid4()
+
+    # When
+    for message_id in "abc":
+        outbox.add(user_id, message_id, f'"{message_id}"')
+
+    # Then
+    assert [message_id for message_id, _ in outbox.replay(user_id)] == ["b", "c"]
+    assert outbox.evicted == 1
+
+
+def test_messages_expire() -> None:
+    """Test messages older than the TTL are no longer replayed."""
+    # Given
+    outbox = Outbox(max_messages=5, ttl=60)
+    user_id = uuid.uuid4()
+    with patch("server.api.websocket.outbox.time.monotonic", return_value=0):
+        outbox.add(user_id, "a", '"old"')
+    with patch("server.api.websocket.outbox.time.monotonic", return_value=30):
+        outbox.add(user_id, "b", '"new"')
+
+    # When
+    with patch("server.api.websocket.outbox.time.monotonic", return_value=61):
+        outbox.prune()
+        messages = outbox.replay(user_id)
+
+    # Then
+    assert messages == [("b", '"new"')]
+    assert outbox.expired == 1
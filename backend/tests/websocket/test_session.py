@@ -0,0 +1,100 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from server.api.websocket.session import WebSocketSession
+
+
+def blocked_websocket() -> tuple[MagicMock, asyncio.Event]:
+    """A WebSocket whose sends wait until the returned event is set."""
+    unblocked = asyncio.Event()
+
+    async def send_text(_: str) -> None:
+        await unblocked.wait()
+
+    websocket = MagicMock()
+    websocket.send_text = AsyncMock(side_effect=send_text)
+    return websocket, unblocked
+
+
+async def drain() -> None:
+    """Lets the writer tasks run."""
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_send_in_order() -> None:
+    """Test queued messages are sent in order by the writer task."""
+    # Given
+    websocket = MagicMock(send_text=AsyncMock())
+    session = WebSocketSession(websocket, AsyncMock())
+
+    # When
+    assert session.send("1")
+    assert session.send("2")
+    await drain()
+
+    # Then
+    assert [c.args[0] for c in websocket.send_text.await_args_list] == ["1", "2"]
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_overflow_drops_oldest() -> None:
+    """Test a full queue makes room by dropping its oldest message."""
+    # Given
+    websocket, unblocked = blocked_websocket()
+    session = WebSocketSession(websocket, AsyncMock(), queue_size=2)
+    session.send("sending")
+    await drain()
+
+    # When
+    for data in ("1", "2", "3"):
+        assert session.send(data)
+    unblocked.set()
+    await drain()
+
+    # Then
+    sent = [c.args[0] for c in websocket.send_text.await_args_list]
+    assert sent == ["sending", "2", "3"]
+    assert session.dropped == 1
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_overflow_disconnect() -> None:
+    """Test a full queue asks for a disconnect, with the disconnect policy."""
+    # Given
+    websocket, _ = blocked_websocket()
+    session = WebSocketSession(
+        websocket,
+        AsyncMock(),
+        queue_size=1,
+        overflow="disconnect",
+    )
+    session.send("sending")
+    await drain()
+
+    # When / Then
+    assert session.send("queued")
+    assert not session.send("overflow")
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_send_failure() -> None:
+    """Test a failed or timed out send is reported, and stops the writer."""
+    # Given
+    on_failure = AsyncMock()
+    websocket, _ = blocked_websocket()
+    session = WebSocketSession(websocket, on_failure, send_timeout=0.01)
+
+    # When
+    session.send("never sent")
+    await asyncio.sleep(0.05)
+
+    # Then
+    on_failure.assert_awaited_once()
+    assert "timed out" in on_failure.await_args.args[0]
+    assert session._writer.done()  # noqa: SLF001